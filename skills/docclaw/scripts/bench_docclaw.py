@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""Offline benchmarks for docclaw scripts against a local stand-in docs server.
+
+Serves synthetic ``llms.txt``, ``sitemap.xml`` and ``.md`` pages from
+127.0.0.1 and, inside this process only, routes the scripts' requests for
+https://docs.openclaw.ai there. The production scripts keep their
+trusted-host restriction; nothing here is reachable from their CLIs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import gzip
+import http.client
+import http.server
+import json
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import docs_http
+import fetch_doc_markdown as fetch
+import refresh_docs_index as refresh
+
+TRUSTED_ROOT = "https://docs.openclaw.ai"
+SCRIPTS_DIR = Path(__file__).resolve().parent
+STARTUP_MODULES = ("fetch_doc_markdown", "refresh_docs_index", "search_docs")
+DEFAULT_STARTUP_BUDGET_MS = 40.0
+SECTIONS = ["cli", "gateway", "automation", "concepts", "channels", "tools", "plugins", "install"]
+WORDS = (
+    "gateway configuration models agent session memory hooks channel plugin token auth port "
+    "sandbox browser skill node install update security provider routing cron webhook"
+).split()
+
+
+def synthetic_site(entries: int, seed: int = 7) -> dict[str, bytes]:
+    rng = random.Random(seed)
+    files: dict[str, bytes] = {}
+    llms = ["# OpenClaw", "", "## Docs", ""]
+    sitemap = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+    ]
+    for i in range(entries):
+        section = SECTIONS[i % len(SECTIONS)]
+        leaf = "-".join(rng.sample(WORDS, 2))
+        path = f"{section}/{leaf}-{i}"
+        title = f"{leaf.replace('-', ' ').title()} {i}"
+        lastmod = f"2026-{1 + i % 12:02d}-{1 + i % 28:02d}"
+        if i % 10:
+            llms.append(f"- [{title}]({TRUSTED_ROOT}/{path}.md): {' '.join(rng.choices(WORDS, k=8))}")
+        sitemap.append(f"<url><loc>{TRUSTED_ROOT}/{path}</loc><lastmod>{lastmod}</lastmod></url>")
+        body = [f"# {title}", ""]
+        for h in range(4):
+            body.append(f"## {rng.choice(WORDS).title()} {h}")
+            body.append("")
+            body.extend(" ".join(rng.choices(WORDS, k=14)) for _ in range(6))
+            body.append("")
+        files[f"/{path}.md"] = "\n".join(body).encode("utf-8")
+    sitemap.append("</urlset>")
+    files["/llms.txt"] = ("\n".join(llms) + "\n").encode("utf-8")
+    files["/sitemap.xml"] = "\n".join(sitemap).encode("utf-8")
+    return files
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, Nagle plus
+    # delayed ACKs add ~40 ms to every keep-alive response.
+    disable_nagle_algorithm = True
+    files: dict[str, bytes] = {}
+    gzipped: dict[str, bytes] = {}
+    latency = 0.0
+
+    def log_message(self, format: str, *args) -> None:
+        return
+
+    def do_GET(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        body = self.files.get(self.path.split("?", 1)[0])
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        etag = f'"{len(body):x}-{hash(body) & 0xFFFFFFFF:x}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            key = self.path.split("?", 1)[0]
+            if key not in self.gzipped:
+                self.gzipped[key] = gzip.compress(body, 6)
+            body = self.gzipped[key]
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@contextlib.contextmanager
+def stand_in_server(files: dict[str, bytes], latency: float):
+    handler = type("Handler", (StandInHandler,), {"files": files, "gzipped": {}, "latency": latency})
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server.server_address[1]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@contextlib.contextmanager
+def routed_to(port: int):
+    """Test-only override: send this process's docs requests to the stand-in server."""
+    real_open_connection = docs_http.open_connection
+    docs_http.POOL.close_all()
+    docs_http.open_connection = lambda timeout: http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        yield
+    finally:
+        docs_http.open_connection = real_open_connection
+        docs_http.POOL.close_all()
+
+
+def timed(fn, repeat: int = 1) -> dict:
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return {
+        "runs": repeat,
+        "median_ms": round(statistics.median(samples) * 1000, 3),
+        "min_ms": round(min(samples) * 1000, 3),
+        "total_ms": round(sum(samples) * 1000, 3),
+        "_result": result,
+    }
+
+
+def bench_scale(entries: int, latency: float, repeat: int, queries: int, bulk: int, workers: int) -> dict:
+    files = synthetic_site(entries)
+    rng = random.Random(entries)
+    results: dict[str, dict] = {}
+    with stand_in_server(files, latency) as port, routed_to(port), tempfile.TemporaryDirectory(
+        prefix="docclaw-bench-"
+    ) as td:
+        tmp = Path(td)
+        index_json = tmp / "index.json"
+        docs_root = refresh.normalize_docs_root(TRUSTED_ROOT)
+
+        results["build_index"] = timed(lambda: refresh.build_index(docs_root, 30.0), repeat)
+        payload = results["build_index"]["_result"]
+        index_json.write_text(json.dumps(payload, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        refresh.LookupIndex.from_entries(payload["entries"]).write(index_json)
+        refresh.write_compact(index_json, payload)
+
+        results["load_index"] = timed(lambda: fetch.load_index(index_json), repeat)
+        results["load_lookup"] = timed(lambda: fetch.LookupIndex.load(index_json), repeat)
+        entries_list = results["load_index"]["_result"]
+        lookup = results["load_lookup"]["_result"]
+
+        def cold_exact_resolve():
+            return fetch.resolve_target(entries_list[-1]["path"], fetch.load_lookup(index_json), docs_root)
+
+        results["resolve_cold"] = timed(cold_exact_resolve, repeat)
+
+        paths = [e["path"] for e in entries_list]
+        titles = [e["title"] for e in entries_list]
+        mixed = []
+        for i in range(queries):
+            kind = i % 3
+            if kind == 0:
+                mixed.append(rng.choice(paths))
+            elif kind == 1:
+                mixed.append(rng.choice(titles).split()[0])
+            else:
+                mixed.append(f"{rng.choice(SECTIONS)}/no-such-page-{i}")
+        misses = [f"{rng.choice(paths)[:-1]}x" for _ in range(max(1, queries // 10))]
+
+        results["resolve_target"] = timed(
+            lambda: [fetch.resolve_target(q, lookup, docs_root) for q in mixed], repeat
+        )
+        results["suggest_targets"] = timed(lambda: [fetch.suggest_targets(q, lookup) for q in misses], repeat)
+
+        single = rng.choice(paths)
+        results["fetch_single"] = timed(
+            lambda: fetch.fetch_page(single, lookup, docs_root, 30.0, out_path=tmp / "single.md"), repeat
+        )
+
+        bulk_targets = paths[:bulk]
+
+        def bulk_fetch() -> list[dict]:
+            cache = fetch.PageCache(Path(tempfile.mkdtemp(dir=td)))
+            return fetch.fetch_batch(bulk_targets, lookup, docs_root, 30.0, cache, workers)
+
+        results["fetch_bulk"] = timed(bulk_fetch, repeat)
+        failures = sum(1 for r in results["fetch_bulk"]["_result"] if not r["ok"])
+        results["fetch_bulk"]["pages"] = len(bulk_targets)
+        results["fetch_bulk"]["failures"] = failures
+
+    results["resolve_target"]["queries"] = len(mixed)
+    results["suggest_targets"]["queries"] = len(misses)
+    for r in results.values():
+        r.pop("_result", None)
+    return results
+
+
+def parse_importtime(stderr: str) -> dict[str, tuple[int, int]]:
+    """Map module -> (self us, cumulative us) from ``python -X importtime`` output."""
+    out: dict[str, tuple[int, int]] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+            out[name.strip()] = (int(self_us), int(cumulative_us))
+        except ValueError:
+            continue  # header row
+    return out
+
+
+def bench_import(module: str, runs: int) -> dict:
+    """Cumulative import time of ``module`` in fresh interpreters (first run discarded)."""
+    samples = []
+    rows: dict[str, tuple[int, int]] = {}
+    for i in range(runs + 1):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=SCRIPTS_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        rows = parse_importtime(proc.stderr)
+        if i:
+            samples.append(rows[module][1] / 1000.0)
+    heaviest = sorted(((us, name) for name, (us, _) in rows.items() if name != module), reverse=True)[:6]
+    return {
+        "runs": runs,
+        "median_ms": round(statistics.median(samples), 3),
+        "min_ms": round(min(samples), 3),
+        "heaviest": [f"{name} {us / 1000.0:.1f}ms" for us, name in heaviest],
+    }
+
+
+def bench_cli_hit(runs: int) -> dict:
+    """Wall time of ``fetch_doc_markdown.py <slug>`` served from a warm cache, no daemon."""
+    files = synthetic_site(200)
+    with tempfile.TemporaryDirectory(prefix="docclaw-startup-") as td:
+        tmp = Path(td)
+        index_json = tmp / "index.json"
+        with stand_in_server(files, 0.0) as port, routed_to(port):
+            payload = refresh.build_index(TRUSTED_ROOT, 30.0)
+            index_json.write_text(json.dumps(payload, ensure_ascii=False) + "\n", encoding="utf-8")
+            refresh.LookupIndex.from_entries(payload["entries"]).write(index_json)
+            refresh.write_compact(index_json, payload)
+            slug = payload["entries"][0]["path"]
+            cache = fetch.PageCache(tmp / "cache")
+            fetch.fetch_page(slug, fetch.load_lookup(index_json), TRUSTED_ROOT, 30.0, cache=cache)
+            cache.save()
+        cmd = [sys.executable, str(SCRIPTS_DIR / "fetch_doc_markdown.py"), slug, "--index", str(index_json)]
+        cmd += ["--cache-dir", str(tmp / "cache"), "--no-daemon"]
+        samples = []
+        bare = []
+        for i in range(runs + 1):
+            started = time.perf_counter()
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            elapsed = time.perf_counter() - started
+            if "Cache: hit" not in proc.stdout:
+                raise RuntimeError(f"expected a cache hit, got: {proc.stdout}{proc.stderr}")
+            started = time.perf_counter()
+            subprocess.run([sys.executable, "-c", "pass"], check=True)
+            if i:
+                samples.append(elapsed * 1000)
+                bare.append((time.perf_counter() - started) * 1000)
+    return {
+        "runs": runs,
+        "median_ms": round(statistics.median(samples), 3),
+        "min_ms": round(min(samples), 3),
+        "interpreter_ms": round(statistics.median(bare), 3),
+    }
+
+
+def bench_startup(runs: int) -> dict:
+    results = {f"import {m}": bench_import(m, runs) for m in STARTUP_MODULES}
+    results["cli cache hit"] = bench_cli_hit(runs)
+    return results
+
+
+def compare(current: dict, baseline: dict) -> list[str]:
+    lines = []
+    for scale, ops in current["scales"].items():
+        base_ops = baseline.get("scales", {}).get(scale)
+        if not base_ops:
+            continue
+        for op, stats in ops.items():
+            base = base_ops.get(op)
+            if not base or not base.get("median_ms"):
+                continue
+            ratio = stats["median_ms"] / base["median_ms"]
+            lines.append(
+                f"{scale:>7} {op:<16} {base['median_ms']:>10.2f} -> {stats['median_ms']:>10.2f} ms  x{ratio:.2f}"
+            )
+    return lines
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark docclaw scripts against a local stand-in server")
+    parser.add_argument("--entries", default="100,1000", help="Comma-separated index sizes (100..50000)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Injected per-request server latency")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement")
+    parser.add_argument("--queries", type=int, default=300, help="resolve_target queries per run")
+    parser.add_argument("--bulk", type=int, default=100, help="Pages fetched by the bulk fetch benchmark")
+    parser.add_argument("--workers", type=int, default=fetch.DEFAULT_WORKERS, help="Bulk fetch workers")
+    parser.add_argument("--json", default="", help="Write results to this JSON file")
+    parser.add_argument("--compare", default="", help="Baseline JSON from a previous run to compare against")
+    parser.add_argument(
+        "--startup", action="store_true", help="Measure interpreter startup/import cost instead (-X importtime)"
+    )
+    parser.add_argument("--startup-runs", type=int, default=7, help="Fresh interpreters per startup measurement")
+    parser.add_argument(
+        "--startup-budget-ms",
+        type=float,
+        default=DEFAULT_STARTUP_BUDGET_MS,
+        help="Fail when importing fetch_doc_markdown takes longer than this (median)",
+    )
+    args = parser.parse_args()
+
+    if args.startup:
+        startup = bench_startup(max(1, args.startup_runs))
+        for name, stats in startup.items():
+            extra = f"  (bare interpreter {stats['interpreter_ms']:.2f} ms)" if "interpreter_ms" in stats else ""
+            print(f"{name:<30} median {stats['median_ms']:>8.2f} ms  min {stats['min_ms']:>8.2f} ms{extra}")
+            if stats.get("heaviest"):
+                print(f"{'':<30} heaviest: {', '.join(stats['heaviest'])}")
+        if args.json:
+            Path(args.json).write_text(json.dumps({"startup": startup}, indent=2) + "\n", encoding="utf-8")
+            print(f"Wrote: {args.json}")
+        measured = startup["import fetch_doc_markdown"]["median_ms"]
+        if measured > args.startup_budget_ms:
+            print(f"Startup budget exceeded: {measured:.2f} ms > {args.startup_budget_ms:.2f} ms")
+            return 1
+        print(f"Startup within budget: {measured:.2f} ms <= {args.startup_budget_ms:.2f} ms")
+        return 0
+
+    scales = [int(x) for x in args.entries.split(",") if x.strip()]
+    if any(n < 1 or n > 50000 for n in scales):
+        raise SystemExit("--entries values must be between 1 and 50000")
+
+    report = {
+        "python": sys.version.split()[0],
+        "latency_ms": args.latency_ms,
+        "repeat": args.repeat,
+        "scales": {},
+    }
+    for n in scales:
+        ops = bench_scale(n, args.latency_ms / 1000.0, args.repeat, args.queries, args.bulk, args.workers)
+        report["scales"][str(n)] = ops
+        for op, stats in ops.items():
+            extra = "".join(f" {k}={stats[k]}" for k in ("queries", "pages", "failures") if k in stats)
+            print(f"{n:>7} {op:<16} median {stats['median_ms']:>10.2f} ms  min {stats['min_ms']:>10.2f} ms{extra}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"Wrote: {args.json}")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        print("\n".join(compare(report, baseline)) or "No overlapping measurements to compare.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
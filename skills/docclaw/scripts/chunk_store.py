@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Heading-level chunk index for cached markdown pages.
+
+Each cached page ``<cache-dir>/<slug>.md`` gets a sidecar
+``<cache-dir>/.chunks/<slug>.json`` listing its sections: heading path,
+anchor, byte offsets into the page and a content hash, plus the terms of each
+section's own body. Lookups read only the sidecar and then the requested byte
+range of the page.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from pathlib import Path
+
+from doc_cache import CHUNK_DIR, write_json_atomic
+
+CHUNK_VERSION = 1
+HEADING_RE = re.compile(rb"^(#{1,6})[ \t]+(.+?)[ \t]*#*[ \t]*$")
+FENCE_RE = re.compile(rb"^[ \t]{0,3}(```|~~~)")
+TERM_RE = re.compile(r"[a-z0-9_.]{3,}")
+
+
+def anchor_for(heading: str) -> str:
+    """GitHub-style anchor: lowercase, punctuation dropped, spaces to dashes."""
+    text = re.sub(r"[^\w\- ]", "", heading.strip().lower())
+    return re.sub(r" ", "-", text)
+
+
+def split_sections(data: bytes) -> list[dict]:
+    """Split markdown bytes at ATX headings (ignoring fenced code).
+
+    Every chunk spans ``[start, end)`` up to the next heading of the same or a
+    higher level, so it includes its subsections; ``body_end`` marks where its
+    own text stops. Text before the first heading becomes a level-0 chunk.
+    """
+    headings: list[tuple[int, int, str]] = []  # (offset, level, title)
+    in_fence = False
+    pos = 0
+    for line in data.splitlines(keepends=True):
+        stripped = line.rstrip(b"\r\n")
+        if FENCE_RE.match(stripped):
+            in_fence = not in_fence
+        elif not in_fence:
+            m = HEADING_RE.match(stripped)
+            if m:
+                headings.append((pos, len(m.group(1)), m.group(2).decode("utf-8", errors="replace")))
+        pos += len(line)
+
+    chunks: list[dict] = []
+    first = headings[0][0] if headings else len(data)
+    if data[:first].strip():
+        chunks.append({"level": 0, "heading": "", "path": [], "anchor": "", "start": 0, "body_end": first, "end": first})
+
+    stack: list[tuple[int, str]] = []
+    seen_anchors: dict[str, int] = {}
+    for i, (start, level, title) in enumerate(headings):
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        stack.append((level, title))
+        body_end = headings[i + 1][0] if i + 1 < len(headings) else len(data)
+        end = len(data)
+        for later_start, later_level, _ in headings[i + 1 :]:
+            if later_level <= level:
+                end = later_start
+                break
+        anchor = anchor_for(title)
+        dup = seen_anchors.get(anchor, 0)
+        seen_anchors[anchor] = dup + 1
+        if dup:
+            anchor = f"{anchor}-{dup}"
+        chunks.append(
+            {
+                "level": level,
+                "heading": title,
+                "path": [t for _, t in stack],
+                "anchor": anchor,
+                "start": start,
+                "body_end": body_end,
+                "end": end,
+            }
+        )
+
+    for chunk in chunks:
+        section = data[chunk["start"] : chunk["end"]]
+        body = data[chunk["start"] : chunk["body_end"]].decode("utf-8", errors="replace").lower()
+        chunk["hash"] = hashlib.sha256(section).hexdigest()[:16]
+        chunk["terms"] = sorted(set(TERM_RE.findall(body)))
+    return chunks
+
+
+class ChunkStore:
+    def __init__(self, cache_dir: Path) -> None:
+        self.cache_dir = cache_dir
+
+    def sidecar(self, slug: str) -> Path:
+        return self.cache_dir / CHUNK_DIR / f"{slug}.json"
+
+    def index_page(self, slug: str, page: Path, data: bytes | None = None) -> dict:
+        if data is None:
+            data = page.read_bytes()
+        st = page.stat()
+        payload = {
+            "version": CHUNK_VERSION,
+            "slug": slug,
+            "page_stat": [st.st_mtime_ns, st.st_size],
+            "chunks": split_sections(data),
+        }
+        write_json_atomic(self.sidecar(slug), payload)
+        return payload
+
+    def load(self, slug: str, page: Path) -> dict:
+        """Return the chunk index for ``page``, rebuilding it if missing or stale."""
+        try:
+            payload = json.loads(self.sidecar(slug).read_text(encoding="utf-8"))
+            st = page.stat()
+            if payload.get("version") == CHUNK_VERSION and payload.get("page_stat") == [st.st_mtime_ns, st.st_size]:
+                return payload
+        except (OSError, ValueError):
+            pass
+        return self.index_page(slug, page)
+
+    def remove(self, slug: str) -> None:
+        try:
+            self.sidecar(slug).unlink()
+        except FileNotFoundError:
+            pass
+
+    def find(self, slug: str, page: Path, query: str) -> dict | None:
+        """Match ``query`` against anchors, then headings, then section body terms."""
+        chunks = self.load(slug, page)["chunks"]
+        q = query.strip().lower().lstrip("#")
+        if not q:
+            return None
+        for chunk in chunks:
+            if chunk["anchor"] and chunk["anchor"] == anchor_for(q):
+                return chunk
+        for chunk in chunks:
+            if chunk["heading"].lower() == q:
+                return chunk
+        for chunk in chunks:
+            if q in " > ".join(chunk["path"]).lower():
+                return chunk
+        words = TERM_RE.findall(q)
+        if not words:
+            return None
+        # Deepest section whose own body mentions every keyword.
+        best = None
+        for chunk in chunks:
+            terms = chunk["terms"]
+            if all(any(w in t for t in terms) for w in words):
+                if best is None or chunk["level"] > best["level"]:
+                    best = chunk
+        return best
+
+    @staticmethod
+    def read(page: Path, chunk: dict) -> str:
+        with page.open("rb") as fh:
+            fh.seek(chunk["start"])
+            return fh.read(chunk["end"] - chunk["start"]).decode("utf-8", errors="replace")
+
+    def headings(self, slug: str, page: Path) -> list[str]:
+        return [" > ".join(c["path"]) for c in self.load(slug, page)["chunks"] if c["level"]]
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Compact, memory-mappable form of the docs index (``<index>.bin``).
+
+Layout (little-endian):
+
+- header: magic, version, entry/string counts, the index JSON's mtime/size
+  (staleness check), docs_root string id and section offsets
+- records: one fixed-width row per entry, sorted by UTF-8 path, holding
+  string ids for path, title, description, section, lastmod, source and the
+  two URLs; URL ids are ``DERIVED`` when they equal ``<docs_root>/<path>``
+  (``.md`` for markdown) and are rebuilt on demand
+- string table: ``strings + 1`` u32 offsets followed by one UTF-8 blob with
+  every distinct string stored once
+
+An exact-path lookup binary-searches the records and decodes only the strings
+of the rows it touches; nothing else is read from the map.
+"""
+
+from __future__ import annotations
+
+import mmap
+import struct
+from pathlib import Path
+
+from lookup_index import LookupIndex
+
+MAGIC = b"DCIX"
+COMPACT_VERSION = 1
+HEADER = struct.Struct("<4sHHIIqqIIII")
+RECORD = struct.Struct("<8I")
+OFFSET = struct.Struct("<I")
+DERIVED = 0xFFFFFFFF
+FIELDS = ("path", "title", "description", "section", "lastmod", "source")
+
+
+def compact_path(index_path: Path) -> Path:
+    return index_path.with_name(f"{index_path.stem}.bin")
+
+
+def write_compact(index_path: Path, payload: dict) -> Path:
+    """Write ``<index>.bin`` for ``payload``; call after the index JSON is written."""
+    docs_root = str(payload.get("docs_root") or "")
+    strings: dict[str, int] = {}
+
+    def intern(value: str) -> int:
+        sid = strings.get(value)
+        if sid is None:
+            sid = strings[value] = len(strings)
+        return sid
+
+    root_sid = intern(docs_root)
+    rows = []
+    entries = [e for e in payload.get("entries", []) if isinstance(e, dict) and e.get("path")]
+    for e in sorted(entries, key=lambda x: str(x["path"]).encode("utf-8")):
+        path = str(e["path"])
+        md_url = str(e.get("markdown_url") or "")
+        html_url = str(e.get("html_url") or "")
+        md_sid = DERIVED if md_url == f"{docs_root}/{path}.md" else intern(md_url)
+        html_sid = DERIVED if html_url == f"{docs_root}/{path}" else intern(html_url)
+        rows.append([intern(str(e.get(f) or "")) for f in FIELDS] + [md_sid, html_sid])
+
+    blob = bytearray()
+    offsets = bytearray()
+    for value in strings:  # dicts keep insertion order == sid order
+        offsets += OFFSET.pack(len(blob))
+        blob += value.encode("utf-8")
+    offsets += OFFSET.pack(len(blob))
+
+    st = index_path.stat()
+    records_pos = HEADER.size
+    offsets_pos = records_pos + RECORD.size * len(rows)
+    blob_pos = offsets_pos + len(offsets)
+    out = compact_path(index_path)
+    tmp = out.with_name(f".{out.name}.tmp")
+    with tmp.open("wb") as fh:
+        fh.write(
+            HEADER.pack(
+                MAGIC,
+                COMPACT_VERSION,
+                0,
+                len(rows),
+                len(strings),
+                st.st_mtime_ns,
+                st.st_size,
+                root_sid,
+                records_pos,
+                offsets_pos,
+                blob_pos,
+            )
+        )
+        for row in rows:
+            fh.write(RECORD.pack(*row))
+        fh.write(offsets)
+        fh.write(blob)
+    tmp.replace(out)
+    return out
+
+
+class CompactIndex:
+    def __init__(self, mm: mmap.mmap) -> None:
+        self._mm = mm
+        (_, _, _, self.count, self.string_count, _, _, root_sid, self._records, self._offsets, self._blob) = (
+            HEADER.unpack_from(mm, 0)
+        )
+        self.docs_root = self.string(root_sid)
+
+    @classmethod
+    def open(cls, index_path: Path) -> CompactIndex | None:
+        """Map ``<index>.bin``; None when missing, malformed or older than the index JSON."""
+        try:
+            st = index_path.stat()
+            with compact_path(index_path).open("rb") as fh:
+                mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            magic, version, _, _, _, mtime_ns, size, *_ = HEADER.unpack_from(mm, 0)
+        except struct.error:
+            mm.close()
+            return None
+        if magic != MAGIC or version != COMPACT_VERSION or (mtime_ns, size) != (st.st_mtime_ns, st.st_size):
+            mm.close()
+            return None
+        return cls(mm)
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def string(self, sid: int) -> str:
+        start, end = struct.unpack_from("<2I", self._mm, self._offsets + 4 * sid)
+        return self._mm[self._blob + start : self._blob + end].decode("utf-8")
+
+    def _raw_path(self, i: int) -> bytes:
+        (sid,) = OFFSET.unpack_from(self._mm, self._records + RECORD.size * i)
+        start, end = struct.unpack_from("<2I", self._mm, self._offsets + 4 * sid)
+        return self._mm[self._blob + start : self._blob + end]
+
+    def record(self, i: int) -> dict[str, str]:
+        row = RECORD.unpack_from(self._mm, self._records + RECORD.size * i)
+        entry = {f: self.string(sid) for f, sid in zip(FIELDS, row)}
+        path = entry["path"]
+        md_sid, html_sid = row[6], row[7]
+        entry["markdown_url"] = f"{self.docs_root}/{path}.md" if md_sid == DERIVED else self.string(md_sid)
+        entry["html_url"] = f"{self.docs_root}/{path}" if html_sid == DERIVED else self.string(html_sid)
+        return entry
+
+    def get(self, path: str) -> dict[str, str] | None:
+        key = path.encode("utf-8")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._raw_path(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self._raw_path(lo) == key:
+            return self.record(lo)
+        return None
+
+
+class CompactFirstLookup(LookupIndex):
+    """LookupIndex that answers exact-path lookups from the mapped compact index.
+
+    Title search, suggestions and full-row access load the regular lookup
+    structures on first use through ``loader``.
+    """
+
+    def __init__(self, compact: CompactIndex, loader) -> None:
+        self.compact = compact
+        self._loader = loader
+        self._full: LookupIndex | None = None
+
+    def full(self) -> LookupIndex:
+        if self._full is None:
+            self._full = self._loader()
+        return self._full
+
+    def __len__(self) -> int:
+        return len(self.compact)
+
+    def get(self, path: str) -> dict[str, str] | None:
+        return self.compact.get(path)
+
+    @property
+    def rows(self) -> list[list[str]]:
+        return self.full().rows
+
+    @property
+    def entries(self) -> list[dict[str, str]]:
+        return self.full().entries
+
+    def find_title(self, query: str, accept=None) -> dict[str, str] | None:
+        return self.full().find_title(query, accept)
+
+    def suggest(self, query: str, limit: int = 5, cutoff: float = 0.5) -> list[str]:
+        return self.full().suggest(query, limit, cutoff)
+
+    def write(self, index_path: Path) -> Path:
+        return self.full().write(index_path)
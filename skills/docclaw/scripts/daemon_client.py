@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Client side of the docclaw daemon protocol (see ``docclaw_daemon.py``).
+
+Kept separate so the CLIs can try the daemon without importing the server.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+SKILL_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_SOCKET = SKILL_DIR / "references" / ".docclaw.sock"
+CLIENT_TIMEOUT = 60.0
+
+
+def public_path(path: Path | str) -> Path:
+    """Absolute ``path`` with its directory resolved but not the file itself.
+
+    The index files are symlinks through the ``current`` generation; resolving
+    them would pin a path to whichever generation was current at the time.
+    """
+    path = Path(path)
+    return path.parent.resolve() / path.name
+
+
+def daemon_call(
+    request: dict, socket_path: Path = DEFAULT_SOCKET, timeout: float = CLIENT_TIMEOUT
+) -> dict | None:
+    """Send one request; return the response, or None when no daemon is listening."""
+    if not socket_path.exists():
+        return None
+    import socket
+
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(socket_path))
+            sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            with sock.makefile("rb") as reader:
+                line = reader.readline()
+    except OSError:
+        return None
+    if not line:
+        return None
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
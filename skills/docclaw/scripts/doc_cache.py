@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+"""Freshness-aware markdown page cache with a sidecar manifest.
+
+Page content is stored once per distinct body as a compressed blob,
+``<cache-dir>/.objects/<hh>/<sha256>.md.gz`` (``.md.zst`` where the standard
+library has zstd), written by atomic rename and skipped when the blob already
+exists. ``<cache-dir>/.manifest.json`` maps each slug to its content hash and
+keeps per-page metadata (fetched_at, last_access, validators, index lastmod,
+size, hits) plus aggregate counters.
+
+Readable ``<cache-dir>/<slug>.md`` views are materialized only for pages a
+caller opens (``view()``). ``<cache-dir>/.chunks/`` holds the per-page section
+indexes written by ``chunk_store.py``.
+
+Several processes (CLI runs, the daemon, API clients) may share one cache.
+``save()`` re-reads the manifest under ``<cache-dir>/.manifest.lock`` and
+merges this process's changes into it, so concurrent writers do not drop each
+other's pages. Blobs of dropped pages are deleted at that point unless the
+merged manifest still references them, and ``evict()`` periodically deletes
+blobs no page references (left behind by a process that died before saving).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import zlib
+from pathlib import Path
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:
+    zstd = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves are not serialized across processes
+    fcntl = None
+
+MANIFEST_NAME = ".manifest.json"
+LOCK_NAME = ".manifest.lock"
+CHUNK_DIR = ".chunks"
+OBJECTS_DIR = ".objects"
+BLOB_SUFFIX = ".md.zst" if zstd is not None else ".md.gz"
+DEFAULT_TTL = 24 * 3600.0
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 2000
+# Unreferenced blobs younger than this may belong to a process that has not
+# saved yet; the objects directory is scanned at most once per interval.
+ORPHAN_GRACE = 3600.0
+ORPHAN_SCAN_INTERVAL = 3600.0
+
+
+def write_json_atomic(path: Path, payload: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def write_bytes_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def compress(data: bytes) -> bytes:
+    if zstd is not None:
+        return zstd.compress(data)
+    # zlib with a gzip wrapper (zero mtime) instead of the heavier gzip module.
+    packer = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return packer.compress(data) + packer.flush()
+
+
+def read_blob(path: Path) -> bytes:
+    data = path.read_bytes()
+    if path.name.endswith(".zst"):
+        if zstd is None:
+            raise OSError(f"zstd blob needs Python 3.14+: {path}")
+        return zstd.decompress(data)
+    try:
+        return zlib.decompress(data, 16 + zlib.MAX_WBITS)
+    except zlib.error as exc:
+        raise ValueError(f"corrupt cache blob {path}: {exc}") from exc
+
+
+class PageCache:
+    """Thread-safe cache; call ``save()`` once after a batch of operations."""
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.manifest_path = cache_dir / MANIFEST_NAME
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.pages: dict[str, dict] = {}
+        # What this process changed since the last save, merged into the
+        # manifest on disk by ``_sync``.
+        self._changed: set[str] = set()
+        self._dropped: dict[str, float] = {}  # slug -> fetched_at of the dropped page
+        self._released: set[str] = set()  # blobs to delete if nothing references them
+        self.scanned_at = 0.0
+        self.counters = {
+            "hits": 0,
+            "misses": 0,
+            "revalidated": 0,
+            "evicted": 0,
+            "writes_skipped": 0,
+            "prefetched": 0,
+            "invalidated": 0,
+            "orphans": 0,
+        }
+        self._load()
+        self._saved_counters = dict(self.counters)
+
+    def _read_manifest(self) -> tuple[dict[str, dict], dict[str, int], float]:
+        """(pages, counters, scanned_at) as stored on disk; empty when missing or unreadable."""
+        try:
+            payload = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            payload = None
+        if not isinstance(payload, dict):
+            return {}, {}, 0.0
+        pages = payload.get("pages")
+        counters = payload.get("counters")
+        pages = {k: v for k, v in pages.items() if isinstance(v, dict)} if isinstance(pages, dict) else {}
+        counters = {k: int(counters.get(k, 0)) for k in self.counters} if isinstance(counters, dict) else {}
+        return pages, counters, float(payload.get("scanned_at", 0))
+
+    def _load(self) -> None:
+        self.pages, counters, self.scanned_at = self._read_manifest()
+        self.counters.update(counters)
+
+    def _touch(self, slug: str) -> None:
+        """Record that this process changed ``slug`` (lock held)."""
+        self._changed.add(slug)
+        self._dirty = True
+
+    def path_for(self, slug: str) -> Path:
+        """Readable view path; see ``view()``."""
+        return self.cache_dir / f"{slug}.md"
+
+    def blob_path(self, meta: dict) -> Path | None:
+        blob = meta.get("blob")
+        return self.cache_dir / OBJECTS_DIR / blob if blob else None
+
+    def _read(self, slug: str, meta: dict) -> str | None:
+        # Entries written before the blob store only have the plain view.
+        blob = self.blob_path(meta)
+        try:
+            data = read_blob(blob) if blob is not None else self.path_for(slug).read_bytes()
+        except (OSError, EOFError, ValueError):
+            return None
+        return data.decode("utf-8", errors="replace")
+
+    def read(self, slug: str) -> str | None:
+        with self._lock:
+            meta = self.pages.get(slug)
+            return self._read(slug, meta) if meta is not None else None
+
+    def blobs(self) -> list[tuple[str, Path]]:
+        """(slug, blob path) for every page stored in the blob store."""
+        with self._lock:
+            return [(slug, self.blob_path(m)) for slug, m in self.pages.items() if m.get("blob")]
+
+    def view(self, slug: str) -> tuple[Path, bool]:
+        """Return (path, written) for the readable ``<slug>.md``, writing it if stale."""
+        path = self.path_for(slug)
+        with self._lock:
+            meta = self.pages.get(slug)
+            if meta is None or not meta.get("blob"):
+                return path, False
+            if meta.get("view") == meta.get("hash") and path.exists():
+                return path, False
+            text = self._read(slug, meta)
+            if text is None:
+                return path, False
+            write_bytes_atomic(path, text.encode("utf-8"))
+            meta["view"] = meta["hash"]
+            self._touch(slug)
+            return path, True
+
+    def _release_blob(self, meta: dict) -> int:
+        """Schedule ``meta``'s blob for deletion on save unless another page references it.
+
+        Returns the bytes that frees (lock held). The blob stays readable
+        until ``save()`` has merged the manifest on disk, which may still
+        reference it from another process.
+        """
+        blob = meta.get("blob")
+        if not blob:
+            return int(meta.get("size", 0))
+        if any(m.get("blob") == blob for m in self.pages.values()):
+            return 0
+        self._released.add(blob)
+        return int(meta.get("stored", meta.get("size", 0)))
+
+    def _drop(self, slug: str) -> int:
+        """Remove ``slug`` with its blob, view and section index; return bytes freed (lock held)."""
+        meta = self.pages.pop(slug)
+        self._changed.discard(slug)
+        self._dropped[slug] = float(meta.get("fetched_at", 0))
+        freed = self._release_blob(meta)
+        for path in (self.path_for(slug), self.cache_dir / CHUNK_DIR / f"{slug}.json"):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        return freed
+
+    def lookup(
+        self, slug: str, lastmod: str = "", ttl: float | None = None
+    ) -> tuple[str | None, dict[str, str]]:
+        """Return (text, validators).
+
+        ``text`` is set when the cached copy can be served without the network:
+        it is younger than the TTL, or it was fetched under the same non-empty
+        index ``lastmod``. A TTL (default ``self.ttl``) of zero or less always
+        revalidates. Otherwise ``validators`` holds the stored
+        ETag/Last-Modified for a conditional GET (empty on a cold miss).
+        """
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            meta = self.pages.get(slug)
+            if meta is None:
+                return None, {}
+            if self._fresh(meta, lastmod, ttl):
+                text = self._read(slug, meta)
+                if text is None:
+                    return None, {}
+                meta["hits"] = int(meta.get("hits", 0)) + 1
+                meta["last_access"] = time.time()
+                self.counters["hits"] += 1
+                self._touch(slug)
+                return text, {}
+            blob = self.blob_path(meta)
+            if not (blob.exists() if blob is not None else self.path_for(slug).exists()):
+                return None, {}
+            validators = {k: meta[k] for k in ("etag", "last_modified") if meta.get(k)}
+            return None, validators
+
+    @staticmethod
+    def _fresh(meta: dict, lastmod: str, ttl: float) -> bool:
+        # A fetched_at in the future (clock skew, a copied cache) would never
+        # age out, so such pages are treated as stale and revalidated.
+        age = time.time() - float(meta.get("fetched_at", 0))
+        if meta.get("stale") or age < 0:
+            return False
+        same_version = ttl > 0 and bool(lastmod) and meta.get("lastmod") == lastmod
+        return age < ttl or same_version
+
+    def is_fresh(self, slug: str, lastmod: str = "") -> bool:
+        """Whether ``lookup`` would serve ``slug`` locally; touches no counters."""
+        with self._lock:
+            meta = self.pages.get(slug)
+            return meta is not None and self._fresh(meta, lastmod, self.ttl)
+
+    def revalidated(self, slug: str, lastmod: str = "") -> str:
+        """Mark a page as confirmed unchanged (HTTP 304) and return its text."""
+        with self._lock:
+            meta = self.pages[slug]
+            now = time.time()
+            meta.update(fetched_at=now, last_access=now, hits=int(meta.get("hits", 0)) + 1)
+            meta.pop("stale", None)
+            if lastmod:
+                meta["lastmod"] = lastmod
+            self.counters["revalidated"] += 1
+            self._touch(slug)
+            return self._read(slug, meta) or ""
+
+    def store(
+        self,
+        slug: str,
+        url: str,
+        text: str,
+        validators: dict[str, str],
+        lastmod: str = "",
+        prefetched: bool = False,
+    ) -> tuple[str, int]:
+        """Record a fetched page; return (content hash, size).
+
+        The blob is only written when no page with the same content is stored.
+        Prefetched pages count as ``prefetched`` rather than ``misses``.
+        """
+        import hashlib
+
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        blob = f"{digest[:2]}/{digest}{BLOB_SUFFIX}"
+        blob_path = self.cache_dir / OBJECTS_DIR / blob
+        if blob_path.exists():
+            stored = blob_path.stat().st_size
+            skipped = True
+        else:
+            packed = compress(data)
+            write_bytes_atomic(blob_path, packed)
+            stored = len(packed)
+            skipped = False
+        now = time.time()
+        with self._lock:
+            prior = self.pages.get(slug, {})
+            self.pages[slug] = {
+                "url": url,
+                "fetched_at": now,
+                "last_access": now,
+                "etag": validators.get("etag", ""),
+                "last_modified": validators.get("last_modified", ""),
+                "lastmod": lastmod,
+                "hash": digest,
+                "blob": blob,
+                "size": len(data),
+                "stored": stored,
+                "hits": int(prior.get("hits", 0)),
+            }
+            if prior.get("view") == digest:
+                self.pages[slug]["view"] = digest
+            if prior.get("blob") and prior["blob"] != blob:
+                self._release_blob(prior)
+            self.counters["prefetched" if prefetched else "misses"] += 1
+            self.counters["writes_skipped"] += int(skipped)
+            self._dropped.pop(slug, None)
+            self._touch(slug)
+        return digest, len(data)
+
+    def _stored_bytes(self) -> int:
+        blobs = {m["blob"]: int(m.get("stored", m.get("size", 0))) for m in self.pages.values() if m.get("blob")}
+        legacy = sum(int(m.get("size", 0)) for m in self.pages.values() if not m.get("blob"))
+        return sum(blobs.values()) + legacy
+
+    def _over_budget(self) -> bool:
+        return self._stored_bytes() > self.max_bytes or len(self.pages) > self.max_entries
+
+    def evict(self) -> list[str]:
+        """Drop least-recently-used pages until both budgets (on-disk bytes) are met.
+
+        The budgets apply to the manifest merged with the one on disk, so
+        pages other processes stored count too; the result is saved. Blobs no
+        page references are deleted at most once per ``ORPHAN_SCAN_INTERVAL``.
+        """
+        with self._lock:
+            scan_due = time.time() - self.scanned_at >= ORPHAN_SCAN_INTERVAL
+            scan_due = scan_due and (self.cache_dir / OBJECTS_DIR).is_dir()
+            if not (self._dirty or scan_due or self._over_budget()):
+                return []
+            fd = self._lock_manifest()
+            try:
+                self._merge_disk()
+                order = sorted(self.pages, key=lambda s: float(self.pages[s].get("last_access", 0)))
+                total = self._stored_bytes()
+                evicted: list[str] = []
+                for slug in order:
+                    if total <= self.max_bytes and len(self.pages) <= self.max_entries:
+                        break
+                    total -= self._drop(slug)
+                    evicted.append(slug)
+                self.counters["evicted"] += len(evicted)
+                if scan_due:
+                    self.counters["orphans"] += self._collect_orphans()
+                self._write()
+            finally:
+                self._unlock_manifest(fd)
+            return evicted
+
+    def _collect_orphans(self) -> int:
+        """Delete files under the objects dir that no page references; return how many (locks held).
+
+        Files younger than ``ORPHAN_GRACE`` are kept: another process may
+        have written the blob and not saved its manifest yet.
+        """
+        referenced = {m["blob"] for m in self.pages.values() if m.get("blob")}
+        cutoff = time.time() - ORPHAN_GRACE
+        removed = 0
+        try:
+            shards = [e for e in os.scandir(self.cache_dir / OBJECTS_DIR) if e.is_dir(follow_symlinks=False)]
+        except OSError:
+            shards = []
+        for shard in shards:
+            try:
+                files = list(os.scandir(shard.path))
+            except OSError:
+                continue
+            for entry in files:
+                if f"{shard.name}/{entry.name}" in referenced:
+                    continue
+                try:
+                    if entry.stat(follow_symlinks=False).st_mtime >= cutoff:
+                        continue
+                    os.unlink(entry.path)
+                except OSError:
+                    continue
+                removed += 1
+        self.scanned_at = time.time()
+        return removed
+
+    def invalidate(
+        self, removed: list[str], lastmods: dict[str, str], forced: list[str] = (), evict: bool = False
+    ) -> dict[str, list[str]]:
+        """Apply an index delta to the cache; return {"stale": [...], "removed": [...]} slugs.
+
+        Pages in ``removed`` are deleted. A cached page whose index lastmod in
+        ``lastmods`` differs from the one it was fetched under, or that is in
+        ``forced``, is marked stale so the next lookup revalidates it (deleted
+        instead with ``evict``). Applying the same delta twice is harmless.
+        """
+        stale: list[str] = []
+        dropped: list[str] = []
+        forced = set(forced)
+        with self._lock:
+            for slug in removed:
+                if slug in self.pages:
+                    self._drop(slug)
+                    dropped.append(slug)
+            for slug, lastmod in lastmods.items():
+                meta = self.pages.get(slug)
+                if meta is None or (meta.get("lastmod", "") == lastmod and slug not in forced):
+                    continue
+                if evict:
+                    self._drop(slug)
+                    dropped.append(slug)
+                elif not meta.get("stale"):
+                    meta["stale"] = True
+                    self._touch(slug)
+                    stale.append(slug)
+            if stale or dropped:
+                self.counters["invalidated"] += len(stale) + len(dropped)
+                self._dirty = True
+        return {"stale": stale, "removed": dropped}
+
+    def merge(self, pages: dict[str, dict]) -> list[str]:
+        """Adopt pages from another cache whose blobs are already in this one; return the slugs taken.
+
+        An incoming page replaces a local one only if it was fetched later.
+        Adopted pages keep their fetch time, clamped to now so a fast clock on
+        the other host cannot keep them fresh, and count as read now.
+        """
+        taken: list[str] = []
+        now = time.time()
+        with self._lock:
+            for slug, meta in pages.items():
+                prior = self.pages.get(slug)
+                incoming = min(float(meta.get("fetched_at", 0)), now)
+                if prior is not None and float(prior.get("fetched_at", 0)) >= incoming:
+                    continue
+                meta = {k: v for k, v in meta.items() if k != "view"}
+                meta.update(fetched_at=incoming, last_access=now)
+                self.pages[slug] = meta
+                self._dropped.pop(slug, None)
+                self._touch(slug)
+                if prior is not None:
+                    if prior.get("view") == meta.get("hash"):
+                        meta["view"] = prior["view"]
+                    if prior.get("blob") and prior["blob"] != meta.get("blob"):
+                        self._release_blob(prior)
+                taken.append(slug)
+            if taken:
+                self._dirty = True
+        return taken
+
+    def stale(self) -> list[str]:
+        """Slugs marked stale, most read first."""
+        with self._lock:
+            marked = [s for s, m in self.pages.items() if m.get("stale")]
+            return sorted(marked, key=lambda s: int(self.pages[s].get("hits", 0)), reverse=True)
+
+    def _lock_manifest(self) -> int | None:
+        """Take the cross-process manifest lock; None where ``fcntl`` is unavailable."""
+        if fcntl is None:
+            return None
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.cache_dir / LOCK_NAME, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        except OSError:
+            os.close(fd)
+            raise
+        return fd
+
+    @staticmethod
+    def _unlock_manifest(fd: int | None) -> None:
+        if fd is not None:
+            os.close(fd)
+
+    def _merge_disk(self) -> None:
+        """Fold this process's changes into the manifest on disk and adopt the result (locks held).
+
+        Pages this process changed or dropped win unless another process
+        fetched them later, and a stale mark on disk is kept; every other
+        page is taken from disk. Counters add
+        this process's increments since the last save to the stored ones.
+        """
+        pages, counters, scanned_at = self._read_manifest()
+        for slug, fetched_at in self._dropped.items():
+            theirs = pages.get(slug)
+            if theirs is not None and float(theirs.get("fetched_at", 0)) <= fetched_at:
+                del pages[slug]
+        for slug in self._changed:
+            mine = self.pages.get(slug)
+            if mine is None:
+                continue
+            theirs = pages.get(slug)
+            if theirs is None:
+                pages[slug] = mine
+                continue
+            theirs_at, mine_at = float(theirs.get("fetched_at", 0)), float(mine.get("fetched_at", 0))
+            if theirs_at > mine_at:
+                continue
+            if theirs.get("stale") and theirs_at == mine_at:
+                mine["stale"] = True  # invalidated by a refresh since this copy was read
+            pages[slug] = mine
+        for key, value in self.counters.items():
+            self.counters[key] = counters.get(key, 0) + value - self._saved_counters.get(key, 0)
+        self.pages = pages
+        self.scanned_at = max(self.scanned_at, scanned_at)
+        self._changed.clear()
+        self._dropped.clear()
+
+    def _write(self) -> None:
+        """Write the merged manifest and delete released blobs it no longer references (locks held)."""
+        write_json_atomic(
+            self.manifest_path,
+            {"version": 1, "counters": self.counters, "scanned_at": self.scanned_at, "pages": self.pages},
+        )
+        referenced = {m.get("blob") for m in self.pages.values()}
+        for blob in self._released - referenced:
+            try:
+                (self.cache_dir / OBJECTS_DIR / blob).unlink()
+            except FileNotFoundError:
+                pass
+        self._released.clear()
+        self._saved_counters = dict(self.counters)
+        self._dirty = False
+
+    def save(self) -> None:
+        """Merge this process's changes into the manifest on disk and write it."""
+        with self._lock:
+            if not self._dirty:
+                return
+            fd = self._lock_manifest()
+            try:
+                self._merge_disk()
+                self._write()
+            finally:
+                self._unlock_manifest(fd)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"] + self.counters["revalidated"]
+            served = self.counters["hits"] + self.counters["revalidated"]
+            return {
+                "entries": len(self.pages),
+                "bytes": sum(int(m.get("size", 0)) for m in self.pages.values()),
+                "stored_bytes": self._stored_bytes(),
+                "stale": sum(1 for m in self.pages.values() if m.get("stale")),
+                **self.counters,
+                "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""Importable docclaw API for embedding in an agent runtime.
+
+``Docs`` keeps one lookup index (reloaded when the index JSON changes on
+disk) and one page cache per process, shares the process-wide connection
+pool from ``docs_http``, and returns plain dicts instead of printing.
+
+Title resolutions, suggestions and 404s for unindexed slugs are remembered
+across processes in ``<cache-dir>/.queries.json`` until the index changes
+(see ``query_memo.py``).
+
+``AsyncDocs`` exposes the same operations as coroutines. Each call runs on a
+bounded thread pool, so an event loop can await many lookups concurrently
+without blocking. The module-level coroutines (``refresh_index``,
+``resolve``, ``fetch``, ``fetch_many``, ``suggest``) use one shared default
+client::
+
+    import docclaw_api
+
+    page = await docclaw_api.fetch("gateway/configuration", section="auth")
+    pages = await docclaw_api.fetch_many(["cli/models", "cli/agents"])
+
+The CLIs drive ``Docs`` directly: importing asyncio alone costs more than
+the whole ``fetch_doc_markdown.py`` startup path.
+
+Errors follow the scripts: ValueError for rejected input (full URLs,
+untrusted docs roots, unknown sections), RuntimeError for fetch failures.
+"""
+
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+import fetch_doc_markdown as fetch_md
+from doc_cache import DEFAULT_MAX_BYTES, DEFAULT_MAX_ENTRIES, DEFAULT_TTL, PageCache
+from index_delta import load_changes
+from query_memo import QueryMemo
+
+DEFAULT_DOCS_ROOT = fetch_md.DEFAULT_DOCS_ROOT
+DEFAULT_INDEX = fetch_md.DEFAULT_INDEX
+DEFAULT_CACHE_DIR = fetch_md.DEFAULT_CACHE_DIR
+DEFAULT_WORKERS = fetch_md.DEFAULT_WORKERS
+
+
+class Docs:
+    """Synchronous core shared by the CLIs and ``AsyncDocs``; thread-safe."""
+
+    def __init__(
+        self,
+        index_path: Path = DEFAULT_INDEX,
+        cache_dir: Path = DEFAULT_CACHE_DIR,
+        docs_root: str = DEFAULT_DOCS_ROOT,
+        timeout: float = 20.0,
+        ttl: float = DEFAULT_TTL,
+        max_cache_bytes: int = DEFAULT_MAX_BYTES,
+        max_cache_entries: int = DEFAULT_MAX_ENTRIES,
+        workers: int = DEFAULT_WORKERS,
+    ) -> None:
+        self.index_path = Path(index_path)
+        self.docs_root = fetch_md.normalize_docs_root(docs_root)
+        self.timeout = timeout
+        self.workers = workers
+        self.cache = PageCache(
+            Path(cache_dir), ttl=ttl, max_bytes=max_cache_bytes, max_entries=max_cache_entries
+        )
+        self.memo = QueryMemo(Path(cache_dir), self.index_path)
+        self._lock = threading.Lock()
+        self._index_stat: tuple[int, int] | None = None
+        self._lookup = None
+
+    def lookup(self):
+        """Return the lookup index, reloading it when the index JSON changed on disk."""
+        try:
+            st = self.index_path.stat()
+            stat = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stat = None
+        with self._lock:
+            if self._lookup is None or stat != self._index_stat:
+                reloaded = self._lookup is not None
+                self._lookup = fetch_md.load_lookup(self.index_path)
+                self._index_stat = stat
+                self.memo.sync()
+                if reloaded:
+                    # Another process refreshed the index; keep this cache's
+                    # in-memory manifest from undoing its invalidations.
+                    changes = load_changes(self.index_path)
+                    if changes is not None:
+                        fetch_md.apply_index_changes(self.cache, changes)
+            return self._lookup
+
+    def refresh_index(
+        self,
+        out_md: Path | None = None,
+        incremental: bool = True,
+        cache_policy: str = "mark",
+        **budget,
+    ) -> dict:
+        """Rebuild the index files; see ``refresh_docs_index.refresh`` for the result."""
+        import refresh_docs_index
+
+        out_md = out_md or self.index_path.with_suffix(".md")
+        report = refresh_docs_index.refresh(
+            self.index_path,
+            Path(out_md),
+            self.docs_root,
+            self.timeout,
+            incremental=incremental,
+            cache=self.cache,
+            cache_policy=cache_policy,
+            **budget,
+        )
+        with self._lock:
+            self._lookup = None
+        return report
+
+    def resolve(self, query: str) -> dict:
+        """Return ``query``, ``url``, ``slug`` and the index ``entry`` (None for a slug guess)."""
+        lookup = self.lookup()
+        try:
+            url, slug, path = fetch_md.resolve_entry(query, lookup, self.docs_root, self.memo)
+        finally:
+            self.memo.save()
+        return {"query": query, "url": url, "slug": slug, "entry": lookup.get(path) if path else None}
+
+    def fetch(
+        self,
+        target: str,
+        section: str = "",
+        refresh: bool = False,
+        text: bool = True,
+        out: Path | None = None,
+        probe: bool = False,
+    ) -> dict:
+        """Fetch one page through the cache.
+
+        Returns ``url``, ``path``, ``slug``, ``bytes`` and ``cache`` as
+        ``fetch_page`` does, plus ``text`` (the markdown, unless ``text`` is
+        false) and, with ``section``, a ``section`` dict (heading ``path``,
+        ``anchor``, ``start``, ``end``, ``text``). A slug guess that is not
+        in a fresh index is refused unless ``probe`` is set; ``refresh``
+        revalidates regardless of TTL or lastmod and implies ``probe``.
+        """
+        if section and out:
+            raise ValueError("--section reads from the page cache; drop --out.")
+        probe = probe or refresh
+        if refresh:
+            self.memo.forget(target)
+        try:
+            page = fetch_md.fetch_page(
+                target,
+                self.lookup(),
+                self.docs_root,
+                self.timeout,
+                out_path=Path(out) if out else None,
+                cache=self.cache,
+                ttl=0.0 if refresh else None,
+                memo=self.memo,
+                fresh_index=not probe and fetch_md.index_is_fresh(self.index_path),
+                probe=probe,
+            )
+        finally:
+            self.save()
+        if text:
+            page["text"] = Path(page["path"]).read_text(encoding="utf-8", errors="replace")
+        if section:
+            chunk, body = fetch_md.page_section(self.cache.cache_dir, page["slug"], Path(page["path"]), section)
+            page["section"] = {
+                "path": chunk["path"],
+                "anchor": chunk["anchor"],
+                "start": chunk["start"],
+                "end": chunk["end"],
+                "text": body,
+            }
+        return page
+
+    def fetch_many(
+        self, targets: list[str], workers: int | None = None, refresh: bool = False, probe: bool = False
+    ) -> list[dict]:
+        """Fetch pages concurrently into the cache; one result per target, never raises per page.
+
+        Each result has ``target``, ``ok``, ``error``, ``url``, ``path``
+        (empty: batch fetches store blobs only), ``bytes``, ``cache`` and
+        ``seconds``. ``probe`` and ``refresh`` work as in ``fetch``.
+        """
+        targets = list(targets)
+        probe = probe or refresh
+        if refresh:
+            for target in targets:
+                self.memo.forget(target)
+        try:
+            return fetch_md.fetch_batch(
+                targets,
+                self.lookup(),
+                self.docs_root,
+                self.timeout,
+                self.cache,
+                workers or self.workers,
+                memo=self.memo,
+                fresh_index=not probe and fetch_md.index_is_fresh(self.index_path),
+                probe=probe,
+            )
+        finally:
+            self.save()
+
+    def batch_targets(self, targets: list[str], index_section: str = "", fetch_all: bool = False) -> list[str]:
+        return fetch_md.batch_targets(targets, self.lookup(), index_section, fetch_all)
+
+    def suggest(self, query: str, limit: int = 5) -> list[str]:
+        try:
+            return fetch_md.suggest_targets(query, self.lookup(), limit, self.memo)
+        finally:
+            self.memo.save()
+
+    def cache_stats(self) -> dict:
+        return {**self.cache.stats(), "queries": self.memo.stats()}
+
+    def save(self) -> None:
+        self.cache.evict()
+        self.cache.save()
+        self.memo.save()
+
+
+class AsyncDocs:
+    """Coroutine front end for ``Docs``; at most ``concurrency`` calls run at once."""
+
+    def __init__(self, docs: Docs | None = None, concurrency: int = DEFAULT_WORKERS, **kwargs) -> None:
+        import concurrent.futures
+
+        self.docs = docs or Docs(**kwargs)
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, concurrency), thread_name_prefix="docclaw"
+        )
+
+    async def _call(self, method, *args, **kwargs):
+        import asyncio
+        import functools
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, functools.partial(method, *args, **kwargs))
+
+    async def refresh_index(self, **kwargs) -> dict:
+        return await self._call(self.docs.refresh_index, **kwargs)
+
+    async def resolve(self, query: str) -> dict:
+        return await self._call(self.docs.resolve, query)
+
+    async def fetch(self, target: str, **kwargs) -> dict:
+        return await self._call(self.docs.fetch, target, **kwargs)
+
+    async def fetch_many(self, targets: list[str], workers: int | None = None, **kwargs) -> list[dict]:
+        return await self._call(self.docs.fetch_many, targets, workers, **kwargs)
+
+    async def suggest(self, query: str, limit: int = 5) -> list[str]:
+        return await self._call(self.docs.suggest, query, limit)
+
+    async def cache_stats(self) -> dict:
+        return await self._call(self.docs.cache_stats)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+        self.docs.save()
+
+
+_default: AsyncDocs | None = None
+_default_lock = threading.Lock()
+
+
+def default_client() -> AsyncDocs:
+    """The shared ``AsyncDocs`` behind the module-level coroutines (default paths)."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = AsyncDocs()
+        return _default
+
+
+async def refresh_index(**kwargs) -> dict:
+    return await default_client().refresh_index(**kwargs)
+
+
+async def resolve(query: str) -> dict:
+    return await default_client().resolve(query)
+
+
+async def fetch(target: str, **kwargs) -> dict:
+    return await default_client().fetch(target, **kwargs)
+
+
+async def fetch_many(targets: list[str], workers: int | None = None, **kwargs) -> list[dict]:
+    return await default_client().fetch_many(targets, workers, **kwargs)
+
+
+async def suggest(query: str, limit: int = 5) -> list[str]:
+    return await default_client().suggest(query, limit)
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""Long-running DocClaw server that keeps the index, cache and connections hot.
+
+Listens on a Unix socket and answers one JSON object per line:
+
+    {"op": "ping" | "resolve" | "suggest" | "fetch" | "search" | "shutdown", ...}
+
+``fetch_doc_markdown.py`` and ``search_docs.py`` try the daemon first and fall
+back to in-process mode when no daemon is listening or when it serves a
+different index/cache than the one requested.
+"""
+
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import json
+import os
+import socketserver
+import threading
+import time
+from pathlib import Path
+
+from daemon_client import DEFAULT_SOCKET, SKILL_DIR, daemon_call, public_path
+from prefetch import DEFAULT_PREFETCH_BYTES, DEFAULT_PREFETCH_PAGES, DEFAULT_PREFETCH_WORKERS
+
+DEFAULT_INDEX = SKILL_DIR / "references" / "openclaw-docs-index.json"
+DEFAULT_CACHE_DIR = SKILL_DIR / "references" / "cache"
+SEARCH_RESCAN_SECONDS = 30.0
+
+
+class DaemonState:
+    """A ``docclaw_api.Docs`` plus the worker pool and search index shared by every connection."""
+
+    def __init__(
+        self,
+        index_path: Path,
+        cache_dir: Path,
+        docs_root: str,
+        timeout: float,
+        workers: int,
+        prefetch: dict | None = None,
+    ) -> None:
+        """``prefetch`` holds Prefetcher budgets (workers, max_pages, max_bytes); None disables it."""
+        # Heavy imports happen once here, not per query.
+        import docclaw_api
+        import fetch_doc_markdown as fetch
+        import search_docs
+
+        self.search_docs = search_docs
+        self.docs = docclaw_api.Docs(public_path(index_path), cache_dir.resolve(), docs_root, timeout)
+        self.index_path = self.docs.index_path
+        self.cache_dir = self.docs.cache.cache_dir
+        self.search_path = search_docs.DEFAULT_SEARCH_INDEX.resolve()
+        self.docs_root = self.docs.docs_root
+        # Fetches share docs_http's connection pool, so connections to the
+        # docs host stay warm across requests.
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers))
+        self.prefetcher = None
+        if prefetch is not None:
+            self.prefetcher = fetch.make_prefetcher(docs_root, timeout, self.docs.cache, self.docs.save, **prefetch)
+        # Separate from the Docs lookup lock: a search rescan walks every
+        # root and must not hold up resolves and fetches.
+        self._search_lock = threading.Lock()
+        self._search = None
+        self._search_synced = 0.0
+        self.started = time.time()
+        self.requests = 0
+
+    def search(self, query: str, limit: int) -> dict:
+        titles = self.docs.lookup()
+        with self._search_lock:
+            if self._search is None:
+                self._search = self.search_docs.SearchIndex(self.search_path)
+            if time.time() - self._search_synced > SEARCH_RESCAN_SECONDS:
+                self._search.update(self.search_docs.default_roots(self.cache_dir, True))
+                self._search.save()
+                self._search_synced = time.time()
+            results = self.search_docs.search_results(self._search, query, limit, titles, self.docs.cache)
+            indexed = len(self._search.docs)
+        self.docs.cache.save()
+        return {"results": results, "indexed": indexed}
+
+    def serves(self, request: dict) -> bool:
+        mine_by_key = (
+            ("index", self.index_path, public_path),
+            ("cache_dir", self.cache_dir, Path.resolve),
+            ("search_index", self.search_path, Path.resolve),
+        )
+        for key, mine, normalize in mine_by_key:
+            theirs = request.get(key)
+            if theirs and normalize(Path(theirs)) != mine:
+                return False
+        docs_root = request.get("docs_root")
+        return not docs_root or docs_root == self.docs_root
+
+    def dispatch(self, request: dict) -> dict:
+        op = request.get("op")
+        self.requests += 1
+        if op == "ping":
+            return {
+                "ok": True,
+                "result": {
+                    "pid": os.getpid(),
+                    "index": str(self.index_path),
+                    "cache_dir": str(self.cache_dir),
+                    "entries": len(self.docs.lookup()),
+                    "uptime": round(time.time() - self.started, 1),
+                    "requests": self.requests,
+                    "cache": self.docs.cache.stats(),
+                    "queries": self.docs.memo.stats(),
+                    "prefetch": self.prefetcher.stats() if self.prefetcher is not None else None,
+                },
+            }
+        if not self.serves(request):
+            return {"ok": False, "kind": "mismatch", "error": "daemon serves a different index or cache"}
+        target = str(request.get("target", ""))
+        try:
+            if op == "resolve":
+                resolved = self.docs.resolve(target)
+                return {"ok": True, "result": {"url": resolved["url"], "slug": resolved["slug"]}}
+            if op == "suggest":
+                return {"ok": True, "result": {"suggestions": self.docs.suggest(target, int(request.get("limit", 5)))}}
+            if op == "fetch":
+                return {"ok": True, "result": self.pool.submit(self._fetch, request).result()}
+            if op == "search":
+                query = str(request.get("query", ""))
+                return {"ok": True, "result": self.search(query, int(request.get("limit", 10)))}
+        except ValueError as exc:
+            return {"ok": False, "kind": "value", "error": str(exc)}
+        except RuntimeError as exc:
+            return {"ok": False, "kind": "runtime", "error": str(exc)}
+        return {"ok": False, "kind": "value", "error": f"unknown op: {op!r}"}
+
+    def _fetch(self, request: dict) -> dict:
+        out = request.get("out") or ""
+        page = self.docs.fetch(
+            str(request.get("target", "")),
+            refresh=bool(request.get("refresh")),
+            text=False,
+            out=Path(out) if out else None,
+            probe=bool(request.get("probe")),
+        )
+        if self.prefetcher is not None and page["cache"] != "off" and page["index_path"]:
+            self.prefetcher.schedule(self.docs.lookup(), page["index_path"])
+        return dict(page, path=str(page["path"]))
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("request must be a JSON object")
+            except ValueError as exc:
+                response = {"ok": False, "kind": "value", "error": f"bad request: {exc}"}
+            else:
+                if request.get("op") == "shutdown":
+                    self.wfile.write(b'{"ok": true, "result": {}}\n')
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    return
+                response = self.server.state.dispatch(request)
+            self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+
+
+class DocClawServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path, state: DaemonState) -> None:
+        self.state = state
+        super().__init__(str(socket_path), RequestHandler)
+
+
+def serve(socket_path: Path, state: DaemonState) -> None:
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    if daemon_call({"op": "ping"}, socket_path, timeout=2.0) is not None:
+        raise SystemExit(f"A docclaw daemon is already listening on {socket_path}")
+    try:
+        socket_path.unlink()
+    except FileNotFoundError:
+        pass
+    old_umask = os.umask(0o077)
+    try:
+        server = DocClawServer(socket_path, state)
+    finally:
+        os.umask(old_umask)
+    print(f"docclaw daemon listening on {socket_path} (pid {os.getpid()})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        state.pool.shutdown(wait=False)
+        if state.prefetcher is not None:
+            state.prefetcher.shutdown()
+        try:
+            socket_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run or control the docclaw lookup daemon")
+    parser.add_argument("--socket", default=str(DEFAULT_SOCKET), help="Unix socket path")
+    parser.add_argument("--index", default=str(DEFAULT_INDEX), help="Index JSON path")
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR), help="Markdown cache directory")
+    parser.add_argument("--docs-root", default="https://docs.openclaw.ai", help="Docs root URL")
+    parser.add_argument("--timeout", type=float, default=20.0, help="HTTP timeout in seconds")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent fetch workers")
+    parser.add_argument("--no-prefetch", action="store_true", help="Do not warm related pages after a fetch")
+    parser.add_argument(
+        "--prefetch-pages", type=int, default=DEFAULT_PREFETCH_PAGES, help="Pages warmed per prefetch run"
+    )
+    parser.add_argument(
+        "--prefetch-bytes", type=int, default=DEFAULT_PREFETCH_BYTES, help="Byte budget per prefetch run"
+    )
+    parser.add_argument(
+        "--prefetch-workers", type=int, default=DEFAULT_PREFETCH_WORKERS, help="Concurrent prefetch fetches"
+    )
+    parser.add_argument("--status", action="store_true", help="Print daemon status and exit")
+    parser.add_argument("--stop", action="store_true", help="Stop a running daemon")
+    args = parser.parse_args()
+
+    socket_path = Path(args.socket)
+    if args.status or args.stop:
+        response = daemon_call({"op": "shutdown" if args.stop else "ping"}, socket_path, timeout=5.0)
+        if response is None:
+            print(f"No docclaw daemon listening on {socket_path}")
+            return 1
+        print("Stopped." if args.stop else json.dumps(response.get("result", {}), indent=2))
+        return 0
+
+    import fetch_doc_markdown as fetch
+
+    try:
+        docs_root = fetch.normalize_docs_root(args.docs_root)
+    except ValueError as exc:
+        raise SystemExit(str(exc)) from exc
+    prefetch = None
+    if not args.no_prefetch:
+        prefetch = {
+            "workers": args.prefetch_workers,
+            "max_pages": args.prefetch_pages,
+            "max_bytes": args.prefetch_bytes,
+        }
+    state = DaemonState(Path(args.index), Path(args.cache_dir), docs_root, args.timeout, args.workers, prefetch)
+    serve(socket_path, state)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""Shared HTTP client for the trusted docs host.
+
+Keeps a small pool of persistent HTTPS connections to docs.openclaw.ai,
+requests compressed bodies (gzip, plus br when the optional ``brotli`` module
+is installed) and decodes them while streaming, follows same-host redirects,
+and retries transient failures with exponential backoff and jitter.
+
+Errors surface as ``urllib.error.HTTPError``/``URLError`` so callers keep the
+same handling they had with ``urllib.request.urlopen``.
+"""
+
+from __future__ import annotations
+
+import http.client
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import zlib
+
+import instrument
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+TRUSTED_DOCS_HOST = "docs.openclaw.ai"
+UA = "docclaw/1.0.3"
+CHUNK_SIZE = 64 * 1024
+MAX_IDLE = 16
+MAX_ATTEMPTS = 3
+MAX_REDIRECTS = 3
+BACKOFF_BASE = 0.25
+BACKOFF_MAX = 4.0
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+ACCEPT_ENCODING = "gzip, br" if brotli is not None else "gzip"
+
+
+def open_connection(timeout: float) -> http.client.HTTPConnection:
+    return http.client.HTTPSConnection(TRUSTED_DOCS_HOST, timeout=timeout)
+
+
+class ConnectionPool:
+    """Idle keep-alive connections shared across threads."""
+
+    def __init__(self, max_idle: int = MAX_IDLE) -> None:
+        self.max_idle = max_idle
+        self._idle: list[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float) -> tuple[http.client.HTTPConnection, bool]:
+        """Return (connection, reused)."""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            return open_connection(timeout), False
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn, True
+
+    def release(self, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close_all(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+POOL = ConnectionPool()
+
+
+def conditional_headers(validators: dict[str, str] | None) -> dict[str, str]:
+    headers = {"User-Agent": UA, "Accept-Encoding": ACCEPT_ENCODING, "Connection": "keep-alive"}
+    if validators and validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators and validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def response_validators(headers) -> dict[str, str]:
+    fresh = {"etag": headers.get("ETag", ""), "last_modified": headers.get("Last-Modified", "")}
+    return {k: v for k, v in fresh.items() if v}
+
+
+def decoded_chunks(resp: http.client.HTTPResponse):
+    """Yield the response body in chunks, undoing Content-Encoding."""
+    encoding = (resp.headers.get("Content-Encoding") or "").strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        decode, finish = inflater.decompress, inflater.flush
+    elif encoding == "br" and brotli is not None:
+        decode, finish = brotli.Decompressor().process, bytes
+    elif encoding in ("", "identity"):
+        decode = finish = None
+    else:
+        raise urllib.error.URLError(f"unsupported Content-Encoding: {encoding}")
+    for chunk in iter(lambda: resp.read(CHUNK_SIZE), b""):
+        instrument.count("http.bytes", len(chunk))
+        yield decode(chunk) if decode else chunk
+    if finish is not None:
+        tail = finish()
+        if tail:
+            yield tail
+
+
+def backoff(attempt: int) -> float:
+    return min(BACKOFF_MAX, BACKOFF_BASE * (2**attempt)) * (0.5 + random.random())
+
+
+def trusted_path(url: str) -> str:
+    parsed = urllib.parse.urlparse(url)
+    if parsed.scheme != "https" or parsed.netloc != TRUSTED_DOCS_HOST:
+        raise ValueError(f"Refusing to fetch outside trusted docs host: {url}")
+    return parsed.path + (f"?{parsed.query}" if parsed.query else "")
+
+
+def finish(conn: http.client.HTTPConnection, resp: http.client.HTTPResponse) -> None:
+    if resp.will_close:
+        conn.close()
+    else:
+        POOL.release(conn)
+
+
+def stream(url: str, timeout: float, validators: dict[str, str] | None, consume):
+    """GET a trusted URL and hand its decoded body to ``consume`` as byte chunks.
+
+    Returns (consume(...) result, validators). The result is None when
+    ``validators`` were sent and the server answered 304; any other non-200
+    raises ``HTTPError``. Connection failures and 429/5xx answers are retried
+    before the body is read; a failure while ``consume`` runs is not.
+    """
+    with instrument.span("http.get", url=url):
+        return _stream(url, timeout, validators, consume)
+
+
+def _stream(url: str, timeout: float, validators: dict[str, str] | None, consume):
+    headers = conditional_headers(validators)
+    redirects = 0
+    attempt = 0
+    while True:
+        instrument.count("http.requests")
+        path = trusted_path(url)
+        conn, reused = POOL.acquire(timeout)
+        instrument.count("http.reused_connections" if reused else "http.new_connections")
+        try:
+            conn.request("GET", path, headers=headers)
+            resp = conn.getresponse()
+        except (http.client.HTTPException, OSError) as exc:
+            conn.close()
+            # A server-closed idle connection fails on first use; retry at once.
+            if reused:
+                instrument.count("http.stale_connections")
+                continue
+            instrument.count("http.retries")
+            attempt += 1
+            if attempt >= MAX_ATTEMPTS:
+                raise urllib.error.URLError(exc) from exc
+            time.sleep(backoff(attempt))
+            continue
+
+        status = resp.status
+        if status == 200:
+            try:
+                result = consume(decoded_chunks(resp))
+                resp.read()
+            except (http.client.HTTPException, OSError, zlib.error) as exc:
+                conn.close()
+                raise urllib.error.URLError(exc) from exc
+            except BaseException:
+                conn.close()
+                raise
+            fresh = response_validators(resp.headers)
+            finish(conn, resp)
+            return result, fresh
+
+        resp.read()
+        finish(conn, resp)
+        if status == 304 and validators:
+            instrument.count("http.not_modified")
+            return None, validators
+        location = resp.headers.get("Location", "")
+        if status in (301, 302, 303, 307, 308) and location and redirects < MAX_REDIRECTS:
+            target = urllib.parse.urljoin(url, location)
+            trusted_path(target)
+            url = target
+            redirects += 1
+            continue
+        if status in RETRY_STATUSES and attempt + 1 < MAX_ATTEMPTS:
+            instrument.count("http.retries")
+            attempt += 1
+            retry_after = resp.headers.get("Retry-After", "")
+            delay = float(retry_after) if retry_after.isdigit() else backoff(attempt)
+            time.sleep(min(delay, BACKOFF_MAX))
+            continue
+        raise urllib.error.HTTPError(url, status, resp.reason, resp.headers, None)
+
+
+def get(url: str, timeout: float, validators: dict[str, str] | None = None) -> tuple[str | None, dict[str, str]]:
+    """Return (text, validators); text is None when the server answers 304."""
+    data, fresh = stream(url, timeout, validators, b"".join)
+    if data is None:
+        return None, fresh
+    return data.decode("utf-8", errors="replace"), fresh
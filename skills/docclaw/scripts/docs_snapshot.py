@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""Export and import the whole local docs state as one archive.
+
+``--export`` packs the current index generation (JSON, lookup, compact
+index, Markdown) and every cached page (metadata plus compressed blobs) into
+a tar archive (gzip when the name ends in ``.gz``/``.tgz``). The first member
+is ``manifest.json`` with the sha256 and size of every other member.
+
+``--import`` reads the archive in one sequential pass, hashing each member
+into staging directories; nothing is installed unless every listed member
+is present and matches. The index is then published as a new generation
+(see ``index_generations.py``) and the pages are merged into the page cache,
+keeping local copies that were fetched later. Import never touches the
+network, so an air-gapped or fresh host is fully warm afterwards.
+
+Only members named in the manifest are read, and slugs and blob names are
+checked before anything is written, so an archive cannot place files
+outside the index and cache directories. The manifest guards against
+corruption, not tampering: fetched URLs are still re-validated against the
+trusted docs host.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import tarfile
+import time
+from pathlib import Path
+
+import instrument
+from compact_index import CompactIndex, compact_path, write_compact
+from doc_cache import BLOB_SUFFIX, OBJECTS_DIR, PageCache, compress
+from index_delta import diff_entries, is_empty, write_changes
+from index_generations import DEFAULT_KEEP, checked_at, snapshot_path
+from lookup_index import LookupIndex, lookup_path
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_MANIFEST = "manifest.json"
+TRUSTED_DOCS_ROOT = "https://docs.openclaw.ai"
+BLOB_RE = re.compile(r"^[0-9a-f]{2}/[0-9a-f]{64}\.md\.(gz|zst)$")
+READ_BLOCK = 1 << 16
+
+
+def index_members(index_path: Path, md_path: Path) -> dict[str, Path]:
+    """Archive name -> file for the index generation ``index_path`` currently names."""
+    json_path = snapshot_path(index_path)
+    return {
+        "index/index.json": json_path,
+        "index/lookup.json": lookup_path(json_path),
+        "index/compact.bin": compact_path(json_path),
+        "index/index.md": snapshot_path(md_path),
+    }
+
+
+def install_names(out_json: Path, out_md: Path) -> dict[str, str]:
+    """Archive name -> file name inside a generation for the importing host's index."""
+    return {
+        "index/index.json": out_json.name,
+        "index/lookup.json": lookup_path(out_json).name,
+        "index/compact.bin": compact_path(out_json).name,
+        "index/index.md": out_md.name,
+    }
+
+
+def file_digest(path: Path) -> tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    with path.open("rb") as fh:
+        for block in iter(lambda: fh.read(READ_BLOCK), b""):
+            digest.update(block)
+            size += len(block)
+    return digest.hexdigest(), size
+
+
+def blob_for(data: bytes) -> tuple[str, str, bytes]:
+    """(hash, blob name, packed bytes) as ``PageCache.store`` would write them."""
+    digest = hashlib.sha256(data).hexdigest()
+    return digest, f"{digest[:2]}/{digest}{BLOB_SUFFIX}", compress(data)
+
+
+def export_snapshot(archive: Path, index_path: Path, md_path: Path, cache_dir: Path) -> dict:
+    """Write ``archive``; return ``archive``, ``entries``, ``pages``, ``files`` and ``bytes``."""
+    json_path = snapshot_path(index_path)
+    try:
+        payload = json.loads(json_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        raise ValueError(f"No readable docs index at {index_path}; run refresh_docs_index.py first.") from exc
+    if payload.get("docs_root") != TRUSTED_DOCS_ROOT:
+        raise ValueError(f"Index docs_root must be {TRUSTED_DOCS_ROOT}.")
+    # Missing or stale derived files may be added to a generation in place.
+    if LookupIndex.load(json_path) is None:
+        LookupIndex.from_entries(payload["entries"]).write(json_path)
+    compact = CompactIndex.open(json_path)
+    if compact is None:
+        write_compact(json_path, payload)
+    else:
+        compact.close()
+    members = {name: path for name, path in index_members(index_path, md_path).items() if path.is_file()}
+
+    cache = PageCache(cache_dir)
+    pages: dict[str, dict] = {}
+    packed: dict[str, bytes] = {}  # pages cached before the blob store, packed for the archive
+    for slug, meta in cache.pages.items():
+        blob = cache.blob_path(meta)
+        if blob is not None:
+            if blob.is_file():
+                members[f"cache/objects/{meta['blob']}"] = blob
+                pages[slug] = {k: v for k, v in meta.items() if k != "view"}
+            continue
+        text = cache.read(slug)
+        if text is None:
+            continue
+        digest, name, data = blob_for(text.encode("utf-8"))
+        packed[f"cache/objects/{name}"] = data
+        pages[slug] = dict(
+            {k: v for k, v in meta.items() if k != "view"}, hash=digest, blob=name, stored=len(data)
+        )
+    pages_json = json.dumps({"version": 1, "pages": pages}, ensure_ascii=False, separators=(",", ":")).encode()
+
+    files: dict[str, list] = {}
+    with instrument.span("snapshot.hash", files=len(members)):
+        for name, path in members.items():
+            files[name] = list(file_digest(path))
+    for name, data in [*packed.items(), ("cache/pages.json", pages_json)]:
+        files[name] = [hashlib.sha256(data).hexdigest(), len(data)]
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "created_at": time.time(),
+        "docs_root": payload["docs_root"],
+        "index": {
+            "generated_at": payload.get("generated_at"),
+            "entries": len(payload.get("entries", [])),
+            "mtime_ns": json_path.stat().st_mtime_ns,
+            "checked_at": checked_at(index_path),
+        },
+        "pages": len(pages),
+        "files": files,
+    }
+
+    def add_bytes(tar: tarfile.TarFile, name: str, data: bytes) -> None:
+        import io
+
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(manifest["created_at"])
+        tar.addfile(info, io.BytesIO(data))
+
+    def normalized(info: tarfile.TarInfo) -> tarfile.TarInfo:
+        info.uid = info.gid = 0
+        info.uname = info.gname = ""
+        info.mode = 0o644
+        return info
+
+    archive.parent.mkdir(parents=True, exist_ok=True)
+    tmp = archive.with_name(f".{archive.name}.{os.getpid()}.tmp")
+    mode = "w:gz" if archive.name.endswith((".gz", ".tgz")) else "w"
+    try:
+        with instrument.span("snapshot.write"), tarfile.open(tmp, mode) as tar:
+            add_bytes(tar, SNAPSHOT_MANIFEST, json.dumps(manifest, indent=2).encode("utf-8"))
+            for name, path in members.items():
+                tar.add(path, arcname=name, recursive=False, filter=normalized)
+            for name, data in packed.items():
+                add_bytes(tar, name, data)
+            add_bytes(tar, "cache/pages.json", pages_json)
+        os.replace(tmp, archive)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return {
+        "archive": archive,
+        "entries": manifest["index"]["entries"],
+        "pages": len(pages),
+        "files": len(files),
+        "bytes": archive.stat().st_size,
+    }
+
+
+def check_manifest(manifest: dict) -> dict[str, list]:
+    if not isinstance(manifest, dict) or manifest.get("version") != SNAPSHOT_VERSION:
+        raise ValueError("Not a docclaw snapshot (or an unsupported version).")
+    if manifest.get("docs_root") != TRUSTED_DOCS_ROOT:
+        raise ValueError(f"Snapshot docs_root must be {TRUSTED_DOCS_ROOT}.")
+    files = manifest.get("files")
+    if not isinstance(files, dict) or "index/index.json" not in files or "cache/pages.json" not in files:
+        raise ValueError("Snapshot manifest lists no index or page metadata.")
+    known = set(index_members(Path("x.json"), Path("x.md"))) | {"cache/pages.json"}
+    for name in files:
+        blob = name.removeprefix("cache/objects/")
+        if name not in known and not (blob != name and BLOB_RE.match(blob)):
+            raise ValueError(f"Unexpected file in snapshot manifest: {name}")
+    return files
+
+
+def check_pages(pages: dict, files: dict[str, list]) -> dict[str, dict]:
+    """Page metadata whose slug is a plain slug and whose blob ships in the archive."""
+    from fetch_doc_markdown import slugify
+
+    if not isinstance(pages, dict):
+        raise ValueError("Snapshot page list must be an object.")
+    out: dict[str, dict] = {}
+    for slug, meta in pages.items():
+        blob = str(meta.get("blob", "")) if isinstance(meta, dict) else ""
+        if slugify(slug) != slug or not BLOB_RE.match(blob) or f"cache/objects/{blob}" not in files:
+            raise ValueError(f"Bad page entry in snapshot: {slug!r}")
+        out[slug] = meta
+    return out
+
+
+def read_snapshot(
+    archive: Path, staging: Path, blob_staging: Path, names: dict[str, str], out_json: Path
+) -> tuple[dict, dict[str, list], dict[str, dict], dict]:
+    """Stream ``archive`` into the staging dirs, verifying every member; return (manifest, files, pages, payload)."""
+    seen: set[str] = set()
+    with instrument.span("snapshot.read"), tarfile.open(archive, "r|*") as tar:
+        manifest = None
+        for info in tar:
+            if manifest is None:
+                if info.name != SNAPSHOT_MANIFEST or not info.isfile():
+                    raise ValueError("Snapshot must start with manifest.json.")
+                manifest = json.loads(tar.extractfile(info).read().decode("utf-8"))
+                files = check_manifest(manifest)
+                continue
+            if info.name not in files or info.name in seen or not info.isfile():
+                raise ValueError(f"Unexpected member in snapshot: {info.name}")
+            if info.name in names:
+                dest = staging / names[info.name]
+            elif info.name == "cache/pages.json":
+                dest = staging / ".pages.json"
+            else:
+                dest = blob_staging / info.name.removeprefix("cache/objects/")
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            digest = hashlib.sha256()
+            size = 0
+            src = tar.extractfile(info)
+            with dest.open("wb") as fh:
+                for block in iter(lambda: src.read(READ_BLOCK), b""):
+                    digest.update(block)
+                    size += len(block)
+                    fh.write(block)
+            if [digest.hexdigest(), size] != files[info.name]:
+                raise ValueError(f"Hash mismatch for {info.name} in snapshot.")
+            seen.add(info.name)
+    if manifest is None:
+        raise ValueError("Snapshot is empty.")
+    missing = sorted(set(files) - seen)
+    if missing:
+        raise ValueError(f"Snapshot is missing {len(missing)} file(s), e.g. {missing[0]}.")
+    pages = check_pages(json.loads((staging / ".pages.json").read_text(encoding="utf-8"))["pages"], files)
+    (staging / ".pages.json").unlink()
+    payload = json.loads((staging / out_json.name).read_text(encoding="utf-8"))
+    if payload.get("docs_root") != TRUSTED_DOCS_ROOT:
+        raise ValueError(f"Snapshot index docs_root must be {TRUSTED_DOCS_ROOT}.")
+    return manifest, files, pages, payload
+
+
+def import_snapshot(
+    archive: Path,
+    out_json: Path,
+    out_md: Path,
+    cache_dir: Path,
+    keep_generations: int = DEFAULT_KEEP,
+) -> dict:
+    """Verify and install ``archive``; raise ValueError (installing nothing) if it does not check out.
+
+    An index identical to the current one is not published again. Returns
+    ``generation``, ``entries``, ``pages`` (in the archive), ``merged``
+    (pages taken over local copies), ``skipped`` (pages whose blob format
+    this Python cannot read), ``blobs`` (new blob files) and ``delta``
+    counts against the previous index (None without one).
+    """
+    from fetch_doc_markdown import apply_index_changes
+    from refresh_docs_index import index_generations, load_previous, same_index, write_index_md
+
+    gens = index_generations(out_json, out_md, keep_generations)
+    names = install_names(out_json, out_md)
+    staging = gens.stage()
+    blob_staging = cache_dir / f".import-{os.getpid()}"
+    try:
+        try:
+            manifest, files, pages, payload = read_snapshot(archive, staging, blob_staging, names, out_json)
+        except (tarfile.TarError, OSError, KeyError, TypeError) as exc:
+            raise ValueError(f"Unreadable snapshot {archive}: {exc}") from exc
+
+        previous = load_previous(out_json)
+        changes = diff_entries((previous or {}).get("entries", []), payload["entries"])
+        if same_index(payload, previous):
+            generation = gens.current()
+        else:
+            if not (staging / out_md.name).exists():
+                write_index_md(staging / out_md.name, payload)
+            # The lookup and compact files key on the JSON's mtime and size.
+            mtime_ns = int(manifest["index"]["mtime_ns"])
+            os.utime(staging / out_json.name, ns=(mtime_ns, mtime_ns))
+            if previous is not None and not is_empty(changes):
+                write_changes(staging / out_json.name, changes, previous, payload)
+            with instrument.span("snapshot.publish"):
+                generation = gens.publish(staging)
+                gens.prune()
+            checked = manifest["index"].get("checked_at")
+            if checked:
+                # Freshness is the exporter's: an old snapshot must not look just refreshed.
+                os.utime(gens.current_dir(), (checked, checked))
+
+        with instrument.span("snapshot.install_cache"):
+            blobs = 0
+            skipped = [s for s, meta in pages.items() if meta["blob"].endswith(".zst") and BLOB_SUFFIX != ".md.zst"]
+            for slug in skipped:
+                pages.pop(slug)
+            referenced = {meta["blob"] for meta in pages.values()}
+            for blob in sorted(referenced):
+                src, dest = blob_staging / blob, cache_dir / OBJECTS_DIR / blob
+                if dest.exists() or not src.exists():
+                    continue
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(src, dest)
+                blobs += 1
+            cache = PageCache(cache_dir)
+            if previous is not None:
+                apply_index_changes(cache, changes)
+            # Pages keep the exporter's fetch times, as the index keeps its checked_at.
+            merged = cache.merge(pages)
+            cache.save()
+    finally:
+        # Nothing is left behind whether the import failed or published.
+        shutil.rmtree(blob_staging, ignore_errors=True)
+        shutil.rmtree(staging, ignore_errors=True)
+    return {
+        "generation": generation,
+        "entries": len(payload["entries"]),
+        "pages": len(pages) + len(skipped),
+        "merged": len(merged),
+        "skipped": len(skipped),
+        "blobs": blobs,
+        "delta": None
+        if previous is None
+        else {k: len(changes[k]) for k in ("added", "changed", "removed")} | {"unchanged": changes["unchanged"]},
+    }
+
+
+def main() -> int:
+    from refresh_docs_index import DEFAULT_CACHE_DIR, DEFAULT_OUT_JSON, DEFAULT_OUT_MD
+
+    parser = argparse.ArgumentParser(description="Export or import an offline OpenClaw docs snapshot")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument("--export", default="", help="Write the index and cached pages to this archive")
+    action.add_argument("--import", dest="import_", default="", help="Verify and install this archive")
+    parser.add_argument("--index", default=str(DEFAULT_OUT_JSON), help="Docs index JSON path")
+    parser.add_argument("--index-md", default=str(DEFAULT_OUT_MD), help="Docs index Markdown path")
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR), help="Page cache directory")
+    parser.add_argument(
+        "--keep-generations", type=int, default=DEFAULT_KEEP, help="Index generations to keep on disk"
+    )
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+    instrument.setup(args.profile, args.cprofile)
+
+    try:
+        if args.export:
+            report = export_snapshot(Path(args.export), Path(args.index), Path(args.index_md), Path(args.cache_dir))
+            print(f"Wrote {report['archive']} ({report['bytes']} bytes)")
+            print(
+                f"Snapshot: {report['entries']} index entries, {report['pages']} cached pages, {report['files']} files"
+            )
+            return 0
+        report = import_snapshot(
+            Path(args.import_), Path(args.index), Path(args.index_md), Path(args.cache_dir), args.keep_generations
+        )
+    except ValueError as exc:
+        raise SystemExit(str(exc)) from exc
+    print(f"Generation: {report['generation']}")
+    if report["delta"] is not None:
+        print("Delta: " + " ".join(f"{k}={v}" for k, v in report["delta"].items()))
+    print(f"Indexed entries: {report['entries']}")
+    skipped = f", {report['skipped']} skipped (zstd blobs need Python 3.14+)" if report["skipped"] else ""
+    print(f"Cached pages: {report['merged']}/{report['pages']} installed, {report['blobs']} new blobs{skipped}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,28 +3,51 @@
 
 from __future__ import annotations
 
-import argparse
-import difflib
 import json
+import os
 import re
-import urllib.error
+import time
 import urllib.parse
-import urllib.request
 from pathlib import Path
 
+import instrument
+from compact_index import CompactFirstLookup, CompactIndex
+from daemon_client import daemon_call, public_path
+from doc_cache import DEFAULT_MAX_BYTES, DEFAULT_MAX_ENTRIES, DEFAULT_TTL, PageCache
+from lookup_index import LookupIndex
+from query_memo import QueryMemo
+
+# ``typing`` is not imported at runtime either; type checkers treat this
+# module-level flag like ``typing.TYPE_CHECKING``.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    import argparse
+
+# Startup matters: this script runs per lookup, and a cache hit or exact slug
+# needs no network. The HTTP client, thread pools, subprocess, argparse and
+# the section/prefetch modules are imported on the paths that use them.
+
 DEFAULT_DOCS_ROOT = "https://docs.openclaw.ai"
 TRUSTED_DOCS_HOST = "docs.openclaw.ai"
 SKILL_DIR = Path(__file__).resolve().parents[1]
 DEFAULT_INDEX = SKILL_DIR / "references" / "openclaw-docs-index.json"
 DEFAULT_CACHE_DIR = SKILL_DIR / "references" / "cache"
-UA = "docclaw/1.0.3"
+DEFAULT_WORKERS = 8
+DEFAULT_INDEX_MAX_AGE = 24 * 3600.0
 
 
 def http_get(url: str, timeout: float) -> str:
-    req = urllib.request.Request(url, headers={"User-Agent": UA})
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        data = resp.read()
-    return data.decode("utf-8", errors="replace")
+    text, _ = http_get_conditional(url, timeout)
+    return text or ""
+
+
+def http_get_conditional(
+    url: str, timeout: float, validators: dict[str, str] | None = None
+) -> tuple[str | None, dict[str, str]]:
+    """Return (text, validators) over a pooled connection; text is None on HTTP 304."""
+    import docs_http
+
+    return docs_http.get(url, timeout, validators)
 
 
 def normalize_docs_root(value: str) -> str:
@@ -66,89 +89,550 @@ def load_index(path: Path) -> list[dict]:
     return []
 
 
-def resolve_target(query: str, entries: list[dict], docs_root: str) -> tuple[str, str]:
+def load_lookup(path: Path) -> LookupIndex:
+    """Prefer the compact index, then the precomputed lookup, then the JSON index.
+
+    With a fresh compact index, exact slugs resolve from the memory map and the
+    larger lookup structures are only loaded if a title or suggestion query
+    needs them. ``path`` is resolved to the index generation it currently
+    names, so later lazy loads read the same snapshot.
+    """
+    path = Path(os.path.realpath(path))
+
+    def load_full() -> LookupIndex:
+        lookup = LookupIndex.load(path)
+        if lookup is None:
+            lookup = LookupIndex.from_entries(load_index(path))
+        return lookup
+
+    with instrument.span("fetch.load_lookup"):
+        compact = CompactIndex.open(path)
+        if compact is not None:
+            return CompactFirstLookup(compact, load_full)
+        return load_full()
+
+
+def index_is_fresh(index_path: Path, max_age: float = DEFAULT_INDEX_MAX_AGE) -> bool:
+    """True when the index was built or confirmed against the site within ``max_age`` seconds."""
+    from index_generations import checked_at
+
+    checked = checked_at(index_path)
+    return checked is not None and time.time() - checked < max_age
+
+
+def as_lookup(entries: list[dict] | LookupIndex) -> LookupIndex:
+    return entries if isinstance(entries, LookupIndex) else LookupIndex.from_entries(entries)
+
+
+def resolve_target(
+    query: str, entries: list[dict] | LookupIndex, docs_root: str, memo: QueryMemo | None = None
+) -> tuple[str, str]:
+    """Return (markdown URL, slug): exact index path, then title match, then a slug guess."""
+    md_url, slug, _ = resolve_entry(query, entries, docs_root, memo)
+    return md_url, slug
+
+
+def resolve_entry(
+    query: str, entries: list[dict] | LookupIndex, docs_root: str, memo: QueryMemo | None = None
+) -> tuple[str, str, str]:
+    """``resolve_target`` plus the index path it matched ("" for a slug guess).
+
+    Cache slugs are slugified and may differ from the indexed path (for
+    example ``reference/RELEASING``), so index lookups use the returned path.
+    Exact paths never touch ``memo``; title matches and guesses are read from
+    and recorded in it.
+    """
     q = query.strip()
     if q.startswith("http://") or q.startswith("https://"):
         raise ValueError("Full URLs are not allowed. Pass a docs slug like cli/models.")
+    lookup = as_lookup(entries)
 
     raw_slug = q.strip("/").removesuffix(".md")
-    for e in entries:
-        if raw_slug and e.get("path") == raw_slug:
-            md_url = normalize_markdown_url(str(e.get("markdown_url", "")))
-            if md_url:
-                return md_url, slugify(str(e["path"]))
-
-    q_lower = q.lower()
-    for e in entries:
-        title = str(e.get("title", "")).lower()
-        if q_lower and q_lower in title:
-            md_url = normalize_markdown_url(str(e.get("markdown_url", "")))
-            if md_url:
-                return md_url, slugify(str(e.get("path", q_lower)))
-
-    guess = slugify(raw_slug)
-    return f"{docs_root}/{guess}.md", guess
-
-
-def suggest_targets(query: str, entries: list[dict], limit: int = 5) -> list[str]:
-    universe = [str(e.get("path", "")) for e in entries if e.get("path")]
-    universe.extend([str(e.get("title", "")) for e in entries if e.get("title")])
-    universe = sorted({u for u in universe if u})
-
-    q = query.strip().removesuffix(".md")
-    if not q or not universe:
-        return []
-    return difflib.get_close_matches(q, universe, n=limit, cutoff=0.5)
+    e = lookup.get(raw_slug) if raw_slug else None
+    if e is not None:
+        # An entry whose URL leaves the docs host is still indexed; fetch
+        # its path from the trusted root instead of the listed URL.
+        slug = slugify(e["path"])
+        md_url = normalize_markdown_url(e["markdown_url"]) or f"{docs_root}/{slug}.md"
+        return md_url, slug, e["path"]
 
+    if memo is not None:
+        found = memo.resolution(q)
+        if found is not None:
+            return found
 
-def main() -> int:
-    parser = argparse.ArgumentParser(description="Fetch an OpenClaw docs page as markdown")
-    parser.add_argument("target", help="Doc slug (e.g. cli/models) or title keyword")
-    parser.add_argument("--docs-root", default=DEFAULT_DOCS_ROOT, help="Docs root URL")
-    parser.add_argument("--index", default=str(DEFAULT_INDEX), help="Index JSON path")
-    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR), help="Cache output directory")
-    parser.add_argument("--timeout", type=float, default=20.0, help="HTTP timeout in seconds")
-    parser.add_argument("--out", default="", help="Output file path (optional)")
-    args = parser.parse_args()
+    e = lookup.find_title(q, accept=lambda c: bool(normalize_markdown_url(c["markdown_url"])))
+    if e is not None:
+        md_url, slug, path = normalize_markdown_url(e["markdown_url"]), slugify(e["path"]), e["path"]
+    else:
+        slug, path = slugify(raw_slug), ""
+        md_url = f"{docs_root}/{slug}.md"
+    if memo is not None:
+        memo.remember(q, md_url, slug, path)
+    return md_url, slug, path
 
-    try:
-        docs_root = normalize_docs_root(args.docs_root)
-    except ValueError as exc:
-        raise SystemExit(str(exc)) from exc
-    entries = load_index(Path(args.index))
-    try:
-        md_url, slug = resolve_target(args.target, entries, docs_root)
-    except ValueError as exc:
-        raise SystemExit(str(exc)) from exc
+
+def suggest_targets(
+    query: str, entries: list[dict] | LookupIndex, limit: int = 5, memo: QueryMemo | None = None
+) -> list[str]:
+    if memo is not None:
+        found = memo.suggestions(query, limit)
+        if found is not None:
+            return found
+    suggestions = as_lookup(entries).suggest(query, limit=limit)
+    if memo is not None:
+        memo.remember_suggestions(query, limit, suggestions)
+    return suggestions
+
+
+def failure_message(head: str, target: str, entries: LookupIndex, memo: QueryMemo | None, hint: str = "") -> str:
+    msg = [head]
+    suggestions = suggest_targets(target, entries, memo=memo)
+    if suggestions:
+        msg.append("Suggestions:")
+        msg.extend(f"- {s}" for s in suggestions)
+    if hint:
+        msg.append(hint)
+    return "\n".join(msg)
+
+
+def index_lastmod(lookup: LookupIndex, path: str) -> str:
+    e = lookup.get(path) if path else None
+    return e["lastmod"] if e is not None else ""
+
+
+def fetch_page(
+    target: str,
+    entries: list[dict] | LookupIndex,
+    docs_root: str,
+    timeout: float,
+    out_path: Path | None = None,
+    cache: PageCache | None = None,
+    getter=http_get_conditional,
+    ttl: float | None = None,
+    view: bool = True,
+    prefetch: bool = False,
+    memo: QueryMemo | None = None,
+    fresh_index: bool = False,
+    probe: bool = False,
+) -> dict:
+    """Resolve and fetch one page, serving from ``cache`` when it is fresh.
+
+    Returns a dict with ``url``, ``path``, ``slug``, ``index_path`` (the
+    matched index entry's path, "" for an unindexed guess), ``bytes`` and
+    ``cache`` (``hit``, ``revalidated``, ``miss`` or ``off``). With ``view`` a cached
+    page is materialized as readable markdown at ``path`` and gets a section
+    index (see ``chunk_store.py``); without it only the compressed blob is
+    stored and ``path`` is empty. ``prefetch`` marks background warming in the
+    cache counters. ``memo`` remembers title resolutions, suggestions and
+    404s for slugs outside the index (see ``query_memo.py``); a remembered
+    404 is raised again without a request. With ``fresh_index`` (the index
+    was confirmed against the site recently) a slug guess that is not in the
+    index is refused without a request. ``probe`` requests it regardless.
+    Raises ValueError for rejected input and RuntimeError for fetch failures,
+    with messages suitable for the CLI.
+    """
+    entries = as_lookup(entries)
+    with instrument.span("fetch.resolve"):
+        md_url, slug, indexed_path = resolve_entry(target, entries, docs_root, memo)
     md_url = normalize_markdown_url(md_url)
     if not md_url:
-        raise SystemExit(f"Resolved URL is outside trusted docs host ({TRUSTED_DOCS_HOST}).")
+        raise ValueError(f"Resolved URL is outside trusted docs host ({TRUSTED_DOCS_HOST}).")
+    unindexed = not indexed_path
+    if unindexed and not probe:
+        missing = memo.missing(slug) if memo is not None else None
+        if missing is not None:
+            instrument.count("fetch.memo_404")
+            raise RuntimeError(missing)
+        if fresh_index and len(entries):
+            instrument.count("fetch.not_indexed")
+            raise RuntimeError(
+                failure_message(
+                    f"{slug} is not in the docs index, so it was not requested.",
+                    target,
+                    entries,
+                    memo,
+                    "Pass --probe to request it anyway.",
+                )
+            )
+
+    use_cache = cache is not None and out_path is None
+    lastmod = index_lastmod(entries, indexed_path) if use_cache else ""
+    validators: dict[str, str] = {}
+
+    def cached_page(text: str, status: str) -> dict:
+        instrument.count(f"cache.{'prefetched' if prefetch and status == 'miss' else status}")
+        path = ""
+        if view:
+            path, written = cache.view(slug)
+            if written:
+                from chunk_store import ChunkStore
+
+                ChunkStore(cache.cache_dir).index_page(slug, path, text.encode("utf-8"))
+        size = len(text.encode("utf-8"))
+        return {"url": md_url, "path": path, "slug": slug, "index_path": indexed_path, "bytes": size, "cache": status}
+
+    if use_cache:
+        cached, validators = cache.lookup(slug, lastmod, ttl)
+        if cached is not None:
+            return cached_page(cached, "hit")
+
+    import urllib.error
 
     try:
-        markdown = http_get(md_url, args.timeout)
+        markdown, fresh = getter(md_url, timeout, validators)
     except urllib.error.HTTPError as exc:
-        suggestions = suggest_targets(args.target, entries)
-        msg = [f"Failed to fetch {md_url} (HTTP {exc.code})."]
-        if suggestions:
-            msg.append("Suggestions:")
-            msg.extend([f"- {s}" for s in suggestions])
-        raise SystemExit("\n".join(msg)) from exc
+        instrument.count(f"fetch.http_{exc.code}")
+        msg = failure_message(f"Failed to fetch {md_url} (HTTP {exc.code}).", target, entries, memo)
+        if unindexed and memo is not None and exc.code == 404:
+            memo.remember_missing(slug, msg)
+        raise RuntimeError(msg) from exc
     except urllib.error.URLError as exc:
-        raise SystemExit(f"Network error while fetching {md_url}: {exc}") from exc
+        raise RuntimeError(f"Network error while fetching {md_url}: {exc}") from exc
+    if unindexed and probe and memo is not None:
+        memo.forget_missing(slug)
+
+    if markdown is None and use_cache:
+        return cached_page(cache.revalidated(slug, lastmod), "revalidated")
+    markdown = markdown or ""
 
     if "<html" in markdown[:500].lower():
-        raise SystemExit(
+        raise RuntimeError(
             f"Fetched HTML instead of markdown from {md_url}. Try another slug or refresh the index first."
         )
 
-    out_path = Path(args.out) if args.out else Path(args.cache_dir) / f"{slug}.md"
+    if use_cache:
+        cache.store(slug, md_url, markdown, fresh, lastmod, prefetched=prefetch)
+        return cached_page(markdown, "miss")
+
+    out_path = out_path or DEFAULT_CACHE_DIR / f"{slug}.md"
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(markdown, encoding="utf-8")
+    data = markdown.encode("utf-8")
+    out_path.write_bytes(data)
+    instrument.count("cache.off")
+    size = len(data)
+    return {"url": md_url, "path": out_path, "slug": slug, "index_path": indexed_path, "bytes": size, "cache": "off"}
+
 
-    print(f"Fetched: {md_url}")
-    print(f"Saved: {out_path}")
+def page_section(cache_dir: Path, slug: str, page: Path, query: str) -> tuple[dict, str]:
+    """Return (chunk, text) for the section of a cached page matching ``query``."""
+    from chunk_store import ChunkStore
+
+    chunks = ChunkStore(cache_dir)
+    with instrument.span("fetch.section"):
+        chunk = chunks.find(slug, page, query)
+    if chunk is None:
+        headings = chunks.headings(slug, page)
+        msg = [f"No section matching {query!r} in {slug}."]
+        if headings:
+            msg.append("Sections:")
+            msg.extend(f"- {h}" for h in headings)
+        raise ValueError("\n".join(msg))
+    return chunk, chunks.read(page, chunk)
+
+
+def print_page(page: dict, section: str, cache_dir: Path) -> None:
+    print(f"Fetched: {page['url']}")
+    print(f"Saved: {page['path']}")
+    if page["cache"] != "off":
+        print(f"Cache: {page['cache']}")
+    if section:
+        chunk, text = page_section(cache_dir, page["slug"], Path(page["path"]), section)
+        anchor = f"#{chunk['anchor']}, " if chunk["anchor"] else ""
+        print(f"Section: {' > '.join(chunk['path']) or '(intro)'} ({anchor}bytes {chunk['start']}-{chunk['end']})")
+        print()
+        print(text.rstrip("\n"))
+
+
+def batch_targets(targets: list[str], lookup: LookupIndex, section: str, fetch_all: bool) -> list[str]:
+    out = list(targets)
+    if fetch_all:
+        out.extend(row[0] for row in lookup.rows)
+    elif section:
+        out.extend(row[0] for row in lookup.rows if row[3] == section)
+    seen: set[str] = set()
+    unique: list[str] = []
+    for t in out:
+        if t in seen:
+            continue
+        seen.add(t)
+        unique.append(t)
+    return unique
+
+
+def fetch_batch(
+    targets: list[str],
+    entries: list[dict] | LookupIndex,
+    docs_root: str,
+    timeout: float,
+    cache: PageCache,
+    workers: int = DEFAULT_WORKERS,
+    memo: QueryMemo | None = None,
+    fresh_index: bool = False,
+    probe: bool = False,
+) -> list[dict]:
+    """Fetch many pages concurrently over the shared connection pool.
+
+    Pages are stored in the cache's blob store only; readable views are
+    written when a page is opened individually or surfaced by search.
+    """
+    import concurrent.futures
+
+    entries = as_lookup(entries)
+
+    def one(target: str) -> dict:
+        started = time.perf_counter()
+        result = {"target": target, "ok": False, "url": "", "path": "", "bytes": 0, "cache": "", "error": ""}
+        try:
+            page = fetch_page(
+                target,
+                entries,
+                docs_root,
+                timeout,
+                cache=cache,
+                view=False,
+                memo=memo,
+                fresh_index=fresh_index,
+                probe=probe,
+            )
+            result.update(page, ok=True, path=str(page["path"]))
+        except (ValueError, RuntimeError) as exc:
+            result["error"] = str(exc).splitlines()[0]
+        result["seconds"] = time.perf_counter() - started
+        return result
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(pool.map(one, targets))
+
+
+def make_prefetcher(docs_root: str, timeout: float, cache: PageCache, on_done=None, **budget):
+    from prefetch import Prefetcher
+
+    def fetch_one(lookup: LookupIndex, path: str) -> int:
+        page = fetch_page(path, lookup, docs_root, timeout, cache=cache, view=False, prefetch=True)
+        return page["bytes"]
+
+    return Prefetcher(fetch_one, lambda path, lastmod: cache.is_fresh(slugify(path), lastmod), on_done, **budget)
+
+
+def apply_index_changes(cache: PageCache, changes: dict, evict: bool = False) -> dict[str, list[str]]:
+    """Invalidate cached pages named by an ``index_delta`` changes record."""
+    removed = [slugify(e["path"]) for e in changes.get("removed", [])]
+    moved = changes.get("added", []) + changes.get("changed", [])
+    lastmods = {slugify(e["path"]): e.get("lastmod", "") for e in moved}
+    forced = [slugify(e["path"]) for e in changes.get("changed", []) if "markdown_url" in e.get("fields", ())]
+    return cache.invalidate(removed, lastmods, forced, evict=evict)
+
+
+def spawn_prefetch(args: argparse.Namespace, path: str) -> None:
+    """Warm pages related to the index ``path`` in a detached process so this command returns now."""
+    import subprocess
+    import sys
+
+    subprocess.Popen(
+        [
+            sys.executable,
+            str(Path(__file__).resolve()),
+            "--prefetch-for",
+            path,
+            "--index",
+            args.index,
+            "--cache-dir",
+            args.cache_dir,
+            "--docs-root",
+            args.docs_root,
+            "--timeout",
+            str(args.timeout),
+        ],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def print_batch_report(results: list[dict], elapsed: float) -> None:
+    for r in results:
+        if r["ok"]:
+            dest = f"  -> {r['path']}" if r["path"] else ""
+            print(f"ok    {r['target']}  {r['bytes']} bytes  {r['seconds']:.2f}s  {r['cache']}{dest}")
+        else:
+            print(f"FAIL  {r['target']}  {r['error']}")
+    ok = [r for r in results if r["ok"]]
+    hits = sum(1 for r in ok if r["cache"] in ("hit", "revalidated"))
+    total_bytes = sum(r["bytes"] for r in ok)
+    rate = len(ok) / elapsed if elapsed > 0 else 0.0
+    kib_rate = total_bytes / 1024 / elapsed if elapsed > 0 else 0.0
+    print(
+        f"Fetched {len(ok)}/{len(results)} pages, {total_bytes} bytes in {elapsed:.2f}s "
+        f"({rate:.1f} pages/s, {kib_rate:.1f} KiB/s, {hits} served from cache)"
+    )
+
+
+def run_via_daemon(args: argparse.Namespace, docs_root: str) -> int | None:
+    """Serve a single-target fetch/suggest from the daemon; None means fall back in-process."""
+    request = {
+        "op": "suggest" if args.suggest else "fetch",
+        "target": args.target[0],
+        "index": str(public_path(args.index)),
+        "cache_dir": str(Path(args.cache_dir).resolve()),
+        "docs_root": docs_root,
+        "out": str(Path(args.out).resolve()) if args.out else "",
+        "refresh": args.refresh,
+        "probe": args.probe,
+    }
+    # The daemon applies its own TTL and cache budgets; custom ones stay in-process.
+    if args.ttl != DEFAULT_TTL or args.max_cache_bytes != DEFAULT_MAX_BYTES:
+        return None
+    if args.max_cache_entries != DEFAULT_MAX_ENTRIES:
+        return None
+    response = daemon_call(request)
+    if response is None or response.get("kind") == "mismatch":
+        return None
+    if not response.get("ok"):
+        raise SystemExit(str(response.get("error", "daemon request failed")))
+    result = response["result"]
+    if args.suggest:
+        suggestions = result["suggestions"]
+        print(f"Suggestions for {args.target[0]!r}:")
+        print("\n".join(f"- {s}" for s in suggestions) if suggestions else "- (none)")
+        return 0 if suggestions else 1
+    try:
+        print_page(result, args.section, Path(args.cache_dir))
+    except ValueError as exc:
+        raise SystemExit(str(exc)) from exc
     return 0
 
 
+def main() -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fetch OpenClaw docs pages as markdown")
+    parser.add_argument("target", nargs="*", help="Doc slug(s) (e.g. cli/models) or title keyword(s)")
+    parser.add_argument("--docs-root", default=DEFAULT_DOCS_ROOT, help="Docs root URL")
+    parser.add_argument("--index", default=str(DEFAULT_INDEX), help="Index JSON path")
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR), help="Cache output directory")
+    parser.add_argument("--timeout", type=float, default=20.0, help="HTTP timeout in seconds")
+    parser.add_argument("--out", default="", help="Output file path (optional, single target only)")
+    parser.add_argument(
+        "--section", default="", help="Print only the page section matching this heading, anchor or keyword"
+    )
+    parser.add_argument("--index-section", default="", help="Batch: fetch every index entry in this section")
+    parser.add_argument("--all", action="store_true", help="Batch: fetch every index entry (full mirror)")
+    parser.add_argument(
+        "--workers", type=int, default=DEFAULT_WORKERS, help="Batch: concurrent fetch workers"
+    )
+    parser.add_argument(
+        "--ttl", type=float, default=DEFAULT_TTL, help="Serve cached pages younger than this (seconds)"
+    )
+    parser.add_argument("--max-cache-bytes", type=int, default=DEFAULT_MAX_BYTES, help="Cache size budget")
+    parser.add_argument("--max-cache-entries", type=int, default=DEFAULT_MAX_ENTRIES, help="Cache entry budget")
+    parser.add_argument(
+        "--refresh", action="store_true", help="Revalidate cached pages regardless of TTL or lastmod (implies --probe)"
+    )
+    parser.add_argument(
+        "--probe",
+        action="store_true",
+        help="Request slugs missing from a fresh index (and retry remembered 404s) instead of refusing them",
+    )
+    parser.add_argument("--cache-stats", action="store_true", help="Print cache statistics and exit")
+    parser.add_argument(
+        "--suggest", action="store_true", help="Print close slug/title matches for the target(s) and exit"
+    )
+    parser.add_argument(
+        "--prefetch",
+        action="store_true",
+        help="Warm sibling and recently updated pages in the background (the daemon always does)",
+    )
+    parser.add_argument("--prefetch-for", default="", help=argparse.SUPPRESS)
+    parser.add_argument("--no-daemon", action="store_true", help="Do not use a running docclaw daemon")
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+    instrument.setup(args.profile, args.cprofile)
+
+    try:
+        docs_root = normalize_docs_root(args.docs_root)
+    except ValueError as exc:
+        raise SystemExit(str(exc)) from exc
+
+    if not args.no_daemon and not (args.cache_stats or args.index_section or args.all) and len(args.target) == 1:
+        with instrument.span("fetch.daemon"):
+            handled = run_via_daemon(args, docs_root)
+        if handled is not None:
+            return handled
+    from docclaw_api import Docs
+
+    docs = Docs(
+        Path(args.index),
+        Path(args.cache_dir),
+        docs_root,
+        args.timeout,
+        ttl=0.0 if args.refresh else args.ttl,
+        max_cache_bytes=args.max_cache_bytes,
+        max_cache_entries=args.max_cache_entries,
+        workers=args.workers,
+    )
+
+    if args.cache_stats:
+        print(json.dumps(docs.cache_stats(), indent=2))
+        return 0
+
+    if args.prefetch_for:
+        entries = docs.lookup()
+        prefetcher = make_prefetcher(docs_root, args.timeout, docs.cache)
+        try:
+            prefetcher.run(entries, prefetcher.plan(entries, args.prefetch_for))
+        finally:
+            docs.save()
+        return 0
+
+    if args.suggest:
+        if not args.target:
+            raise SystemExit("--suggest needs at least one target.")
+        found = False
+        for target in args.target:
+            suggestions = docs.suggest(target)
+            found = found or bool(suggestions)
+            print(f"Suggestions for {target!r}:")
+            print("\n".join(f"- {s}" for s in suggestions) if suggestions else "- (none)")
+        return 0 if found else 1
+
+    if len(args.target) == 1 and not (args.index_section or args.all):
+        if args.section and args.out:
+            raise SystemExit("--section reads from the page cache; drop --out.")
+        try:
+            with instrument.span("fetch.page"):
+                page = docs.fetch(
+                    args.target[0],
+                    refresh=args.refresh,
+                    text=False,
+                    out=Path(args.out) if args.out else None,
+                    probe=args.probe,
+                )
+        except (ValueError, RuntimeError) as exc:
+            raise SystemExit(str(exc)) from exc
+        if args.prefetch and page["index_path"]:
+            spawn_prefetch(args, page["index_path"])
+        try:
+            print_page(page, args.section, docs.cache.cache_dir)
+        except ValueError as exc:
+            raise SystemExit(str(exc)) from exc
+        return 0
+
+    if args.out or args.section:
+        raise SystemExit("--out and --section only apply to a single target.")
+    if (args.index_section or args.all) and not len(docs.lookup()):
+        raise SystemExit(f"Index is empty or missing: {args.index}. Run refresh_docs_index.py first.")
+    targets = docs.batch_targets(args.target, args.index_section, args.all)
+    if not targets:
+        raise SystemExit("Nothing to fetch. Pass slugs, --index-section <name>, or --all.")
+
+    started = time.perf_counter()
+    with instrument.span("fetch.batch", pages=len(targets)):
+        results = docs.fetch_many(targets, refresh=args.refresh, probe=args.probe)
+    print_batch_report(results, time.perf_counter() - started)
+    return 0 if all(r["ok"] for r in results) else 1
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
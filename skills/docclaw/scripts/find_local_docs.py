@@ -1,13 +1,31 @@
 #!/usr/bin/env python3
-"""Locate local OpenClaw docs directories for offline fallback search."""
+"""Locate local OpenClaw docs directories for offline fallback search.
+
+Discovery results are cached in ``references/local-docs.json`` and reused
+while ``PATH``, the candidate directories and their parents keep their
+mtimes. ``--scan`` adds a manifest of every doc file under each root
+(relative slug, size, mtime, content hash), built in parallel and rehashing
+only files whose size or mtime moved, and maps local files to index ``path``
+values so ``--resolve <path>`` can name the file to open.
+"""
 
 from __future__ import annotations
 
 import argparse
 import json
+import os
 import shutil
 from pathlib import Path
 
+import instrument
+from doc_cache import write_json_atomic
+
+SKILL_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_INDEX = SKILL_DIR / "references" / "openclaw-docs-index.json"
+DEFAULT_LOCAL_CACHE = SKILL_DIR / "references" / "local-docs.json"
+LOCAL_VERSION = 1
+DOC_SUFFIXES = (".md", ".mdx")
+SCAN_WORKERS = 8
 
 
 def derive_from_openclaw_bin() -> list[Path]:
@@ -47,19 +65,270 @@ def collect_candidates() -> list[Path]:
     return unique
 
 
+def mtime_ns(path: str) -> int | None:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def discovery_signature(checked: list[str]) -> list:
+    """mtimes that move when a candidate root or an ``openclaw`` binary on PATH appears or changes."""
+    sig: list = [[p, mtime_ns(p), mtime_ns(os.path.dirname(p))] for p in checked]
+    sig.extend([d, mtime_ns(d)] for d in os.environ.get("PATH", "").split(os.pathsep) if d)
+    return sig
+
+
+def load_local_cache(path: Path) -> dict:
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(payload, dict) or payload.get("version") != LOCAL_VERSION:
+        return {}
+    return payload
+
+
+def discover(cache_path: Path = DEFAULT_LOCAL_CACHE, refresh: bool = False) -> dict:
+    """Return {"checked", "existing", "cached"}, reusing cached results while their mtimes hold."""
+    payload = load_local_cache(cache_path)
+    found = payload.get("discovery")
+    if not refresh and isinstance(found, dict) and found.get("signature") == discovery_signature(found["checked"]):
+        return {"checked": found["checked"], "existing": found["existing"], "cached": True}
+    checked = [str(p) for p in collect_candidates()]
+    existing = [p for p in checked if os.path.isdir(p)]
+    payload.update(
+        version=LOCAL_VERSION,
+        discovery={"checked": checked, "existing": existing, "signature": discovery_signature(checked)},
+    )
+    try:
+        write_json_atomic(cache_path, payload)
+    except OSError:
+        pass  # read-only skill dir: discovery still works, just uncached
+    return {"checked": checked, "existing": existing, "cached": False}
+
+
+def existing_roots(cache_path: Path = DEFAULT_LOCAL_CACHE) -> list[Path]:
+    return [Path(p) for p in discover(cache_path)["existing"]]
+
+
+def iter_doc_files(root: Path):
+    """Yield (file, stat) for doc files under ``root``, skipping hidden files and directories."""
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for item in it:
+                    if item.name.startswith("."):
+                        continue
+                    if item.is_dir(follow_symlinks=False):
+                        stack.append(Path(item.path))
+                    elif item.name.endswith(DOC_SUFFIXES) and item.is_file():
+                        yield Path(item.path), item.stat()
+        except OSError:
+            continue
+
+
+def top_level_docs(root: Path) -> list[tuple[Path, os.stat_result]]:
+    try:
+        with os.scandir(root) as it:
+            return [
+                (Path(e.path), e.stat())
+                for e in it
+                if e.name.endswith(DOC_SUFFIXES) and not e.name.startswith(".") and e.is_file()
+            ]
+    except OSError:
+        return []
+
+
+def slug_for(path: Path, root: Path) -> str:
+    rel = path.relative_to(root).as_posix()
+    for suffix in DOC_SUFFIXES:
+        if rel.endswith(suffix):
+            return rel[: -len(suffix)]
+    return rel
+
+
+def file_hash(path: Path) -> str:
+    import hashlib
+
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for block in iter(lambda: fh.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def scan_roots(roots: list[Path], previous: dict, workers: int = SCAN_WORKERS) -> tuple[dict, dict[str, int]]:
+    """Manifest {root: {rel: [slug, size, mtime_ns, hash]}} plus counts of hashed/reused files.
+
+    Each root is split into its top-level subtrees, which are walked and
+    hashed in parallel; files whose size and mtime match ``previous`` keep
+    their hash.
+    """
+    import concurrent.futures
+
+    jobs: list[tuple[Path, Path, bool]] = []  # (root, start, recurse)
+    for root in roots:
+        jobs.append((root, root, False))
+        try:
+            with os.scandir(root) as it:
+                subtrees = [e for e in it if e.is_dir(follow_symlinks=False) and not e.name.startswith(".")]
+            jobs.extend((root, Path(e.path), True) for e in subtrees)
+        except OSError:
+            continue
+
+    def walk(job: tuple[Path, Path, bool]) -> tuple[str, dict, int]:
+        root, start, recurse = job
+        old = previous.get(str(root), {})
+        found = iter_doc_files(start) if recurse else top_level_docs(start)
+        files: dict[str, list] = {}
+        hashed = 0
+        for file, st in found:
+            rel = file.relative_to(root).as_posix()
+            prior = old.get(rel)
+            if prior and prior[1] == st.st_size and prior[2] == st.st_mtime_ns:
+                files[rel] = prior
+                continue
+            try:
+                files[rel] = [slug_for(file, root), st.st_size, st.st_mtime_ns, file_hash(file)]
+                hashed += 1
+            except OSError:
+                continue
+        return str(root), files, hashed
+
+    manifest: dict[str, dict] = {str(root): {} for root in roots}
+    counts = {"files": 0, "hashed": 0, "reused": 0}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for root, files, hashed in pool.map(walk, jobs):
+            manifest[root].update(files)
+            counts["files"] += len(files)
+            counts["hashed"] += hashed
+    counts["reused"] = counts["files"] - counts["hashed"]
+    return manifest, counts
+
+
+def index_paths(index_path: Path) -> set[str]:
+    from lookup_index import LookupIndex
+
+    lookup = LookupIndex.load(index_path)
+    if lookup is not None:
+        return {row[0] for row in lookup.rows}
+    try:
+        payload = json.loads(index_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return set()
+    return {e["path"] for e in payload.get("entries", []) if isinstance(e, dict) and e.get("path")}
+
+
+def map_to_index(manifest: dict, known: set[str]) -> dict[str, str]:
+    """Map index ``path`` -> local file; earlier roots win, ``x/index.md`` serves ``x``."""
+    mapping: dict[str, str] = {}
+    for root, files in manifest.items():
+        for rel, (slug, *_rest) in sorted(files.items()):
+            for candidate in (slug, slug.removesuffix("/index"), slug.removesuffix("/README")):
+                if candidate in known and candidate not in mapping:
+                    mapping[candidate] = str(Path(root) / rel)
+                    break
+    return mapping
+
+
+def scan(
+    cache_path: Path = DEFAULT_LOCAL_CACHE,
+    index_path: Path = DEFAULT_INDEX,
+    refresh: bool = False,
+    workers: int = SCAN_WORKERS,
+) -> dict:
+    """Discover roots, update the manifest and the index mapping, and save them."""
+    found = discover(cache_path, refresh)
+    payload = load_local_cache(cache_path)
+    roots = [Path(p) for p in found["existing"]]
+    with instrument.span("local.scan", roots=len(roots)):
+        manifest, counts = scan_roots(roots, {} if refresh else payload.get("manifest", {}), workers)
+    instrument.count("local.files", counts["files"])
+    instrument.count("local.hashed", counts["hashed"])
+    with instrument.span("local.map_index"):
+        mapping = map_to_index(manifest, index_paths(index_path))
+    payload.update(version=LOCAL_VERSION, manifest=manifest, index_map=mapping)
+    try:
+        write_json_atomic(cache_path, payload)
+    except OSError:
+        pass
+    return {**found, **counts, "manifest": manifest, "index_map": mapping}
+
+
+def find_in_manifest(key: str, index_map: dict, manifest: dict) -> str:
+    """Path mapped to ``key`` in ``index_map``, else the manifest file whose local slug is ``key``."""
+    if key in index_map:
+        return index_map[key]
+    for root, files in manifest.items():
+        for rel, (slug, *_rest) in files.items():
+            if slug == key:
+                return str(Path(root) / rel)
+    return ""
+
+
+def local_file(
+    path: str, cache_path: Path = DEFAULT_LOCAL_CACHE, index_path: Path = DEFAULT_INDEX, refresh: bool = False
+) -> str:
+    """Local file for an index ``path`` (or a local slug), or "" when there is none.
+
+    While the cached discovery is still valid the answer comes from the saved
+    mapping and manifest; the roots are only rescanned on a miss, when the
+    file has gone, or with ``refresh``.
+    """
+    key = path.strip().strip("/").removesuffix(".md")
+    if not refresh and discover(cache_path)["cached"]:
+        payload = load_local_cache(cache_path)
+        found = find_in_manifest(key, payload.get("index_map", {}), payload.get("manifest", {}))
+        if found and os.path.isfile(found):
+            instrument.count("local.resolve_cached")
+            return found
+    result = scan(cache_path, index_path, refresh)
+    return find_in_manifest(key, result["index_map"], result["manifest"])
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Find local OpenClaw docs directories")
     parser.add_argument("--json", action="store_true", help="Print JSON output")
+    parser.add_argument("--scan", action="store_true", help="Build the doc file manifest and index mapping")
+    parser.add_argument("--resolve", default="", help="Print the local file for this index path (e.g. cli/models)")
+    parser.add_argument("--index", default=str(DEFAULT_INDEX), help="Docs index JSON path (for --scan/--resolve)")
+    parser.add_argument("--cache", default=str(DEFAULT_LOCAL_CACHE), help="Discovery/manifest cache path")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached discovery results and hashes")
+    parser.add_argument("--workers", type=int, default=SCAN_WORKERS, help="Parallel scan workers")
+    instrument.add_arguments(parser)
     args = parser.parse_args()
+    instrument.setup(args.profile, args.cprofile)
+    cache_path = Path(args.cache)
+
+    if args.resolve:
+        found = local_file(args.resolve, cache_path, Path(args.index), args.refresh)
+        if not found:
+            print(f"No local doc file for {args.resolve!r}.")
+            return 1
+        print(found)
+        return 0
 
-    candidates = collect_candidates()
-    existing = [p for p in candidates if p.exists() and p.is_dir()]
+    with instrument.span("local.collect"):
+        if args.scan:
+            result = scan(cache_path, Path(args.index), args.refresh, args.workers)
+        else:
+            result = discover(cache_path, args.refresh)
+    candidates, existing = result["checked"], result["existing"]
+    instrument.count("local.checked", len(candidates))
+    instrument.count("local.found", len(existing))
 
     if args.json:
-        payload = {
-            "existing": [str(p) for p in existing],
-            "checked": [str(p) for p in candidates],
-        }
+        payload = {"existing": existing, "checked": candidates, "cached": result["cached"]}
+        if args.scan:
+            payload.update(
+                files=result["files"],
+                hashed=result["hashed"],
+                manifest=result["manifest"],
+                index_map=result["index_map"],
+            )
         print(json.dumps(payload, indent=2))
         return 0
 
@@ -72,7 +341,13 @@ def main() -> int:
 
     print("Local OpenClaw docs roots:")
     for p in existing:
-        print(f"- {p}")
+        files = f" ({len(result['manifest'][p])} doc files)" if args.scan else ""
+        print(f"- {p}{files}")
+    if args.scan:
+        print(
+            f"Manifest: {result['files']} files ({result['hashed']} hashed, {result['reused']} unchanged), "
+            f"{len(result['index_map'])} mapped to index paths"
+        )
     return 0
 
 
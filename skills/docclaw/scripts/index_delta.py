@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Entry-level delta between two docs index payloads.
+
+``diff_entries`` compares entries by ``path``: new paths are ``added``, gone
+paths are ``removed``, and paths whose ``lastmod`` or any other field moved
+are ``changed`` (with the list of fields that differ). ``write_changes``
+stores the delta next to the index JSON as ``<stem>.changes.json``.
+
+``from``/``to`` hold the ``generated_at`` of the previous and the new index.
+A consumer that last applied a delta ending somewhere other than ``from``
+missed a refresh and should fall back to revalidating pages by ``lastmod``.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+CHANGES_VERSION = 1
+
+
+def changes_path(index_path: Path) -> Path:
+    return index_path.with_name(f"{index_path.stem}.changes.json")
+
+
+def diff_entries(old: list[dict], new: list[dict]) -> dict:
+    before = {e.get("path"): e for e in old if isinstance(e, dict)}
+    added: list[dict[str, str]] = []
+    changed: list[dict] = []
+    unchanged = 0
+    for entry in new:
+        prior = before.pop(entry["path"], None)
+        if prior is None:
+            added.append({"path": entry["path"], "lastmod": entry.get("lastmod", "")})
+        elif prior == entry:
+            unchanged += 1
+        else:
+            fields = sorted(k for k in prior.keys() | entry.keys() if prior.get(k) != entry.get(k))
+            changed.append(
+                {
+                    "path": entry["path"],
+                    "lastmod": entry.get("lastmod", ""),
+                    "previous_lastmod": prior.get("lastmod", ""),
+                    "fields": fields,
+                }
+            )
+    removed = [{"path": path, "lastmod": e.get("lastmod", "")} for path, e in sorted(before.items())]
+    return {"added": added, "changed": changed, "removed": removed, "unchanged": unchanged}
+
+
+def is_empty(changes: dict) -> bool:
+    return not (changes["added"] or changes["changed"] or changes["removed"])
+
+
+def write_changes(index_path: Path, changes: dict, previous: dict | None, payload: dict) -> Path:
+    out = changes_path(index_path)
+    record = {
+        "version": CHANGES_VERSION,
+        "docs_root": payload.get("docs_root", ""),
+        "from": (previous or {}).get("generated_at"),
+        "to": payload.get("generated_at"),
+        **changes,
+    }
+    tmp = out.with_name(f".{out.name}.tmp")
+    tmp.write_text(json.dumps(record, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    tmp.replace(out)
+    return out
+
+
+def load_changes(index_path: Path) -> dict | None:
+    try:
+        record = json.loads(changes_path(index_path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(record, dict) or record.get("version") != CHANGES_VERSION:
+        return None
+    return record
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""Versioned docs index snapshots with an atomic "current" pointer.
+
+Each refresh that changes the index writes its JSON, lookup, compact index,
+Markdown and changes files into a staging directory next to the index, then
+renames it to ``<stem>.generations/<id>/`` (ids sort by creation time) and
+flips the ``current`` symlink to it with one atomic rename. The usual file
+names (``openclaw-docs-index.json`` and friends) are fixed symlinks through
+``current``, so readers that open them always see one complete generation.
+
+Generation directories are never modified after publishing (missing derived
+files may be added and the HTTP validators sidecar is rewritten), so a reader
+that resolved a generation keeps a consistent snapshot while newer ones are
+built; see ``snapshot_path``. Every successful refresh touches the current
+generation directory, so its mtime says when the index was last confirmed
+against the site (``checked_at``).
+Pinning a version means passing ``<stem>.generations/<id>/<name>.json`` as
+the index. Only the newest ``keep`` generations (plus ``current``) are kept.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+
+# ``checked_at`` is on the fetch path; datetime and shutil are imported by the
+# refresh-side methods that use them.
+
+CURRENT = "current"
+STAGING_PREFIX = ".staging-"
+DEFAULT_KEEP = 5
+STALE_STAGING_SECONDS = 3600.0
+
+
+def generations_dir(index_path: Path) -> Path:
+    return index_path.parent / f"{index_path.stem}.generations"
+
+
+def snapshot_path(index_path: Path) -> Path:
+    """Resolve ``index_path`` through ``current`` to the generation it names right now."""
+    return Path(os.path.realpath(index_path))
+
+
+def checked_at(index_path: Path) -> float | None:
+    """When the index was last built or confirmed unchanged; None if it is missing."""
+    real = snapshot_path(index_path)
+    in_generation = real.parent.parent.name.endswith(".generations")
+    try:
+        return os.stat(real.parent if in_generation else real).st_mtime
+    except OSError:
+        return None
+
+
+def _symlink_atomic(link: Path, target: str) -> None:
+    """Point ``link`` at ``target``, replacing whatever is there in one rename."""
+    tmp = link.with_name(f".{link.name}.{os.getpid()}.link")
+    try:
+        tmp.unlink()
+    except FileNotFoundError:
+        pass
+    os.symlink(target, tmp)
+    os.replace(tmp, link)
+
+
+class Generations:
+    """Generations of one index; ``links`` maps public paths to file names inside a generation."""
+
+    def __init__(self, index_path: Path, links: dict[Path, str], keep: int = DEFAULT_KEEP) -> None:
+        self.index_path = index_path
+        self.root = generations_dir(index_path)
+        self.links = links
+        self.keep = max(1, keep)
+
+    def list(self) -> list[str]:
+        try:
+            names = [e.name for e in os.scandir(self.root) if e.is_dir(follow_symlinks=False)]
+        except OSError:
+            return []
+        return sorted(n for n in names if not n.startswith("."))
+
+    def current(self) -> str | None:
+        try:
+            return os.readlink(self.root / CURRENT)
+        except OSError:
+            return None
+
+    def current_dir(self) -> Path | None:
+        gen = self.current()
+        return self.root / gen if gen else None
+
+    def stage(self) -> Path:
+        """Create an empty staging directory for the next generation."""
+        import datetime as dt
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        stamp = dt.datetime.now(dt.timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        staging = self.root / f"{STAGING_PREFIX}{stamp}-{os.getpid()}"
+        staging.mkdir()
+        return staging
+
+    def publish(self, staging: Path) -> str:
+        """Turn ``staging`` into a generation and make it current; return its id."""
+        gen = staging.name.removeprefix(STAGING_PREFIX).rsplit("-", 1)[0]
+        final = self.root / gen
+        suffix = 0
+        while final.exists():
+            suffix += 1
+            final = self.root / f"{gen}.{suffix}"
+        os.rename(staging, final)
+        self.switch(final.name)
+        return final.name
+
+    def switch(self, gen: str) -> None:
+        """Make ``gen`` current and make sure the public paths link through ``current``.
+
+        Public paths for files ``gen`` does not have are unlinked rather than
+        left dangling.
+        """
+        if gen not in self.list():
+            raise ValueError(f"Unknown index generation: {gen}")
+        _symlink_atomic(self.root / CURRENT, gen)
+        for link, name in self.links.items():
+            if not (self.root / gen / name).exists():
+                if link.is_symlink():
+                    link.unlink()
+                continue
+            target = os.path.relpath(self.root / CURRENT / name, link.parent)
+            if link.is_symlink() and os.readlink(link) == target:
+                continue
+            _symlink_atomic(link, target)
+
+    def mark_checked(self) -> None:
+        """Record that the current generation was just confirmed against the site."""
+        current = self.current_dir()
+        if current is not None:
+            os.utime(current)
+
+    def rollback(self) -> str:
+        """Make the generation before ``current`` current; return its id."""
+        gens = self.list()
+        current = self.current()
+        older = [g for g in gens if current is None or g < current]
+        if not older:
+            raise ValueError("No older index generation to roll back to.")
+        self.switch(older[-1])
+        return older[-1]
+
+    def prune(self) -> list[str]:
+        """Delete generations beyond the newest ``keep`` (never ``current``) and abandoned staging dirs."""
+        import shutil
+
+        current = self.current()
+        gens = self.list()
+        doomed = [g for g in gens[: max(0, len(gens) - self.keep)] if g != current]
+        for gen in doomed:
+            shutil.rmtree(self.root / gen, ignore_errors=True)
+        try:
+            staging = [e for e in os.scandir(self.root) if e.name.startswith(STAGING_PREFIX)]
+        except OSError:
+            staging = []
+        cutoff = time.time() - STALE_STAGING_SECONDS
+        for entry in staging:
+            try:
+                if entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+            except OSError:
+                continue
+        return doomed
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Opt-in timing spans and counters for the docclaw scripts.
+
+Enable with ``--profile table|json`` on a script or ``DOCCLAW_PROFILE=table``
+(or ``json``) in the environment. Spans and counters are reported on stderr
+when the process exits: ``table`` prints an aggregated summary, ``json``
+prints one JSON line per finished span plus a final summary line.
+``--cprofile PATH`` additionally dumps ``cProfile`` stats for the whole run.
+
+When profiling is off, ``span()`` returns a shared no-op context and
+``count()`` returns immediately.
+"""
+
+from __future__ import annotations
+
+import atexit
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+ENV_VAR = "DOCCLAW_PROFILE"
+FORMATS = ("table", "json")
+_NULL = contextlib.nullcontext()
+
+
+class Recorder:
+    def __init__(self, fmt: str, stream=None) -> None:
+        self.fmt = fmt
+        self.stream = stream or sys.stderr
+        self.started = time.perf_counter()
+        self.spans: dict[str, list[float]] = {}  # name -> [calls, total, max]
+        self.counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, seconds: float, fields: dict) -> None:
+        with self._lock:
+            agg = self.spans.setdefault(name, [0, 0.0, 0.0])
+            agg[0] += 1
+            agg[1] += seconds
+            agg[2] = max(agg[2], seconds)
+            if self.fmt == "json":
+                line = {"type": "span", "name": name, "ms": round(seconds * 1000, 3), **fields}
+                self.stream.write(json.dumps(line, default=str) + "\n")
+
+    def count(self, name: str, n: int) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "wall_ms": round((time.perf_counter() - self.started) * 1000, 3),
+                "spans": {
+                    name: {"calls": int(c), "total_ms": round(t * 1000, 3), "max_ms": round(m * 1000, 3)}
+                    for name, (c, t, m) in self.spans.items()
+                },
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def report(self) -> None:
+        summary = self.summary()
+        if self.fmt == "json":
+            self.stream.write(json.dumps({"type": "summary", **summary}) + "\n")
+            return
+        lines = [f"docclaw profile (wall {summary['wall_ms']:.1f} ms)"]
+        lines.append(f"{'span':<28} {'calls':>7} {'total ms':>11} {'max ms':>10}")
+        ordered = sorted(summary["spans"].items(), key=lambda kv: kv[1]["total_ms"], reverse=True)
+        for name, s in ordered:
+            lines.append(f"{name:<28} {s['calls']:>7} {s['total_ms']:>11.2f} {s['max_ms']:>10.2f}")
+        if summary["counters"]:
+            lines.append(f"{'counter':<28} {'value':>7}")
+            lines.extend(f"{name:<28} {value:>7}" for name, value in summary["counters"].items())
+        self.stream.write("\n".join(lines) + "\n")
+        self.stream.flush()
+
+
+_recorder: Recorder | None = None
+
+
+def enabled() -> bool:
+    return _recorder is not None
+
+
+@contextlib.contextmanager
+def _timed(recorder: Recorder, name: str, fields: dict):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.add_span(name, time.perf_counter() - started, fields)
+
+
+def span(name: str, **fields):
+    """Time a ``with`` block as ``name``; extra fields go to JSON output."""
+    recorder = _recorder
+    if recorder is None:
+        return _NULL
+    return _timed(recorder, name, fields)
+
+
+def record(name: str, seconds: float, **fields) -> None:
+    """Add a span measured by the caller (e.g. CPU time accumulated across chunks)."""
+    recorder = _recorder
+    if recorder is not None:
+        recorder.add_span(name, seconds, fields)
+
+
+def count(name: str, n: int = 1) -> None:
+    recorder = _recorder
+    if recorder is not None:
+        recorder.count(name, n)
+
+
+def add_arguments(parser) -> None:
+    parser.add_argument(
+        "--profile",
+        choices=FORMATS,
+        default=None,
+        help=f"Report timing spans and counters on stderr (or set {ENV_VAR})",
+    )
+    parser.add_argument("--cprofile", default="", help="Write cProfile stats for this run to this path")
+
+
+def setup(fmt: str | None = None, cprofile: str = "") -> None:
+    """Start recording for this process; ``fmt`` falls back to $DOCCLAW_PROFILE."""
+    global _recorder
+    fmt = fmt or os.environ.get(ENV_VAR, "").strip().lower() or None
+    if fmt in ("0", "off", "false", "no"):
+        fmt = None
+    if fmt is not None and fmt not in FORMATS:
+        fmt = "table"
+    if fmt is not None and _recorder is None:
+        _recorder = Recorder(fmt)
+        atexit.register(_recorder.report)
+    if cprofile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+        def dump() -> None:
+            profiler.disable()
+            profiler.dump_stats(cprofile)
+
+        # Registered after the report hook so it runs first (atexit is LIFO).
+        atexit.register(dump)
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""Precomputed lookup structures for the docs index.
+
+``refresh_docs_index.py`` writes ``<index>.lookup.json`` next to the index
+JSON. It holds compact entry rows plus path, normalized-title and title-token
+maps so ``fetch_doc_markdown.py`` can resolve queries without scanning every
+entry, and a character trigram index over paths and titles for suggestions.
+The file records the index JSON's mtime/size and is ignored when they no
+longer match.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import re
+from pathlib import Path
+
+LOOKUP_VERSION = 2
+ROW_FIELDS = ("path", "title", "markdown_url", "section", "lastmod")
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+SUGGEST_CANDIDATES = 50
+
+
+def trigrams(value: str) -> set[str]:
+    padded = f"  {value.lower()} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _bitparallel_distance(pattern: str, text: str, partial: bool) -> int:
+    """Levenshtein distance via Myers/Hyyro bit vectors (one int op chain per text char).
+
+    With ``partial`` the match may start and end anywhere in ``text``.
+    """
+    m = len(pattern)
+    if m == 0:
+        return 0 if partial else len(text)
+    peq: dict[str, int] = {}
+    for i, c in enumerate(pattern):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv, mv, score = mask, 0, m
+    best = m
+    carry = 0 if partial else 1
+    for c in text:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        ph = ((ph << 1) | carry) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+        if score < best:
+            best = score
+    return best if partial else score
+
+
+def edit_distance(a: str, b: str) -> int:
+    return _bitparallel_distance(a, b, partial=False)
+
+
+def partial_distance(needle: str, hay: str) -> int:
+    """Edit distance between ``needle`` and its best-matching substring of ``hay``."""
+    if len(needle) >= len(hay):
+        return edit_distance(needle, hay)
+    return _bitparallel_distance(needle, hay, partial=True)
+
+
+def similarity(query: str, term: str) -> float:
+    """Blend whole-string and best-substring edit similarity (0..1)."""
+    if not query or not term:
+        return 0.0
+    whole = 1.0 - edit_distance(query, term) / max(len(query), len(term))
+    partial = 1.0 - partial_distance(query, term) / len(query)
+    return (whole + 2.0 * max(partial, 0.0)) / 3.0
+
+
+def lookup_path(index_path: Path) -> Path:
+    return index_path.with_name(f"{index_path.stem}.lookup.json")
+
+
+def title_tokens(title: str) -> list[str]:
+    return TOKEN_RE.findall(title.lower())
+
+
+def index_stat(index_path: Path) -> list[int]:
+    st = index_path.stat()
+    return [st.st_mtime_ns, st.st_size]
+
+
+class LookupIndex:
+    def __init__(
+        self,
+        rows: list[list[str]],
+        by_path: dict[str, int],
+        by_title: dict[str, int],
+        tokens: dict[str, list[int]],
+        terms: list[str] | None = None,
+        grams: dict[str, list[int]] | None = None,
+    ) -> None:
+        self.rows = rows
+        self.by_path = by_path
+        self.by_title = by_title
+        self.tokens = tokens
+        self.terms = terms
+        self.grams = grams
+        self._vocab: list[str] | None = None
+        self._vocab_blob = ""
+        self._vocab_offsets: list[int] = []
+
+    @classmethod
+    def from_entries(cls, entries: list[dict]) -> LookupIndex:
+        rows: list[list[str]] = []
+        by_path: dict[str, int] = {}
+        by_title: dict[str, int] = {}
+        tokens: dict[str, list[int]] = {}
+        for e in entries:
+            path = str(e.get("path") or "")
+            if not path:
+                continue
+            i = len(rows)
+            title = str(e.get("title") or "")
+            rows.append([str(e.get(f) or "") for f in ROW_FIELDS])
+            by_path.setdefault(path, i)
+            if title:
+                by_title.setdefault(title.lower(), i)
+            for tok in set(title_tokens(title)):
+                tokens.setdefault(tok, []).append(i)
+        return cls(rows, by_path, by_title, tokens)
+
+    @classmethod
+    def load(cls, index_path: Path) -> LookupIndex | None:
+        """Load the precomputed lookup for ``index_path``; None if missing or stale."""
+        try:
+            payload = json.loads(lookup_path(index_path).read_text(encoding="utf-8"))
+            if payload.get("version") != LOOKUP_VERSION or payload.get("index_stat") != index_stat(index_path):
+                return None
+            return cls(
+                payload["rows"],
+                payload["by_path"],
+                payload["by_title"],
+                payload["tokens"],
+                payload["terms"],
+                payload["trigrams"],
+            )
+        except (OSError, ValueError, KeyError, AttributeError):
+            return None
+
+    def write(self, index_path: Path) -> Path:
+        out = lookup_path(index_path)
+        self.build_trigrams()
+        payload = {
+            "version": LOOKUP_VERSION,
+            "index_stat": index_stat(index_path),
+            "fields": list(ROW_FIELDS),
+            "rows": self.rows,
+            "by_path": self.by_path,
+            "by_title": self.by_title,
+            "tokens": self.tokens,
+            "terms": self.terms,
+            "trigrams": self.grams,
+        }
+        tmp = out.with_name(f".{out.name}.tmp")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        tmp.replace(out)
+        return out
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def entry(self, i: int) -> dict[str, str]:
+        return dict(zip(ROW_FIELDS, self.rows[i]))
+
+    @property
+    def entries(self) -> list[dict[str, str]]:
+        return [self.entry(i) for i in range(len(self.rows))]
+
+    def get(self, path: str) -> dict[str, str] | None:
+        i = self.by_path.get(path)
+        return None if i is None else self.entry(i)
+
+    def rows_with_token_containing(self, fragment: str) -> set[int]:
+        """Rows whose title has a token containing ``fragment``.
+
+        The vocabulary is joined into one newline-separated string so the
+        substring scan runs in ``str.find`` rather than a Python loop.
+        """
+        if self._vocab is None:
+            self._vocab = list(self.tokens)
+            offsets: list[int] = []
+            pos = 0
+            for tok in self._vocab:
+                offsets.append(pos)
+                pos += len(tok) + 1
+            self._vocab_offsets = offsets
+            self._vocab_blob = "\n".join(self._vocab)
+        out: set[int] = set()
+        pos = self._vocab_blob.find(fragment)
+        while pos != -1:
+            k = bisect.bisect_right(self._vocab_offsets, pos) - 1
+            out.update(self.tokens[self._vocab[k]])
+            nxt = k + 1
+            if nxt >= len(self._vocab):
+                break
+            pos = self._vocab_blob.find(fragment, self._vocab_offsets[nxt])
+        return out
+
+    def find_title(self, query: str, accept=None) -> dict[str, str] | None:
+        """Exact normalized title first, else the first entry whose title contains ``query``.
+
+        ``accept`` optionally filters candidate entries (e.g. untrusted URLs).
+        """
+        q = query.strip().lower()
+        if not q:
+            return None
+        i = self.by_title.get(q)
+        if i is not None and (accept is None or accept(self.entry(i))):
+            return self.entry(i)
+
+        q_tokens = title_tokens(q)
+        if not q_tokens:
+            candidates = set(range(len(self.rows)))
+        else:
+            # Query tokens may be partial words, so match the longest (usually
+            # most selective) one against the vocabulary; the substring check
+            # below verifies the full query.
+            candidates = self.rows_with_token_containing(max(q_tokens, key=len))
+        for i in sorted(candidates):
+            if q in self.rows[i][1].lower():
+                entry = self.entry(i)
+                if accept is None or accept(entry):
+                    return entry
+        return None
+
+    def build_trigrams(self) -> None:
+        """Index every distinct path and title by character trigram (lazy)."""
+        if self.terms is not None and self.grams is not None:
+            return
+        universe = {row[0] for row in self.rows} | {row[1] for row in self.rows if row[1]}
+        self.terms = sorted(u for u in universe if u)
+        grams: dict[str, list[int]] = {}
+        for i, term in enumerate(self.terms):
+            for g in trigrams(term):
+                grams.setdefault(g, []).append(i)
+        self.grams = grams
+
+    def suggest(self, query: str, limit: int = 5, cutoff: float = 0.5) -> list[str]:
+        """Rank paths/titles close to ``query``.
+
+        Terms sharing trigrams with the query are pruned to the best
+        ``SUGGEST_CANDIDATES`` by shared-trigram count, then reranked by
+        edit-distance similarity; results below ``cutoff`` are dropped.
+        """
+        q = query.strip().removesuffix(".md")
+        if not q:
+            return []
+        self.build_trigrams()
+        q_grams = trigrams(q)
+        overlap: dict[int, int] = {}
+        for g in q_grams:
+            for i in self.grams.get(g, ()):
+                overlap[i] = overlap.get(i, 0) + 1
+        if not overlap:
+            return []
+
+        def prune_key(i: int) -> tuple[int, int]:
+            return overlap[i], -len(self.terms[i])
+
+        pruned = sorted(overlap, key=prune_key, reverse=True)[:SUGGEST_CANDIDATES]
+        q_lower = q.lower()
+        scored = []
+        for i in pruned:
+            score = similarity(q_lower, self.terms[i].lower())
+            if score >= cutoff:
+                scored.append((-score, len(self.terms[i]), self.terms[i]))
+        scored.sort()
+        return [term for _, _, term in scored[:limit]]
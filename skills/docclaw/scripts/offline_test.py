@@ -0,0 +1,1397 @@
+#!/usr/bin/env python3
+"""Offline tests for docclaw scripts against the benchmark stand-in server.
+
+Every test serves a synthetic site from 127.0.0.1 (see ``bench_docclaw.py``)
+and routes this process's docs requests there, so nothing touches the
+network. Run with ``python3 offline_test.py`` or pytest.
+"""
+
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import contextlib
+import gzip
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import urllib.error
+from pathlib import Path
+from unittest import mock
+
+import bench_docclaw as bench
+import docclaw_api
+import docs_http
+import docs_snapshot
+import fetch_doc_markdown as fetch
+import find_local_docs
+import index_delta
+import index_generations
+import instrument
+import refresh_docs_index as refresh
+import search_docs
+from chunk_store import split_sections
+from compact_index import CompactFirstLookup, CompactIndex, compact_path
+from daemon_client import daemon_call, public_path
+from doc_cache import OBJECTS_DIR, ORPHAN_GRACE, PageCache
+from lookup_index import LookupIndex, edit_distance, lookup_path, partial_distance
+from prefetch import plan_prefetch
+from query_memo import QueryMemo
+
+TRUSTED_ROOT = bench.TRUSTED_ROOT
+
+
+def add_page(files: dict[str, bytes], path: str, title: str, lastmod: str = "2026-10-01") -> None:
+    """Add ``path`` to a synthetic site's llms.txt, sitemap and pages."""
+    files["/llms.txt"] += f"- [{title}]({TRUSTED_ROOT}/{path}.md): added page\n".encode("utf-8")
+    url = f"<url><loc>{TRUSTED_ROOT}/{path}</loc><lastmod>{lastmod}</lastmod></url></urlset>"
+    files["/sitemap.xml"] = files["/sitemap.xml"].replace(b"</urlset>", url.encode("utf-8"))
+    files[f"/{path}.md"] = f"# {title}\n\nAdded page.\n".encode("utf-8")
+
+
+def set_lastmod(files: dict[str, bytes], path: str, lastmod: str) -> None:
+    """Change the sitemap ``lastmod`` of ``path`` in a synthetic site."""
+    loc = f"<loc>{TRUSTED_ROOT}/{path}</loc><lastmod>".encode("utf-8")
+    sitemap = files["/sitemap.xml"]
+    start = sitemap.index(loc) + len(loc)
+    end = sitemap.index(b"</lastmod>", start)
+    files["/sitemap.xml"] = sitemap[:start] + lastmod.encode("utf-8") + sitemap[end:]
+
+
+class PageCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cache_dir = Path(tempfile.mkdtemp(prefix="docclaw-cache-"))
+        self.addCleanup(shutil.rmtree, self.cache_dir, True)
+
+    def store(self, cache: PageCache, slug: str, text: str = "") -> None:
+        cache.store(slug, f"{TRUSTED_ROOT}/{slug}.md", text or f"# {slug}\n", {})
+
+    def test_future_fetch_time_is_stale(self) -> None:
+        cache = PageCache(self.cache_dir)
+        self.store(cache, "cli/a")
+        self.assertTrue(cache.is_fresh("cli/a"))
+        cache.pages["cli/a"].update(fetched_at=time.time() + 3600, lastmod="2026-01-01")
+        self.assertFalse(cache.is_fresh("cli/a"))
+        self.assertFalse(cache.is_fresh("cli/a", "2026-01-01"))
+        self.assertIsNone(cache.lookup("cli/a")[0])
+        self.assertEqual(cache.revalidated("cli/a"), "# cli/a\n")
+        self.assertTrue(cache.is_fresh("cli/a"))
+
+    def test_identical_pages_share_one_blob(self) -> None:
+        cache = PageCache(self.cache_dir)
+        self.store(cache, "cli/a", "# Same\n")
+        self.store(cache, "cli/b", "# Same\n")
+        objects = self.cache_dir / OBJECTS_DIR
+        self.assertEqual(len(list(objects.rglob("*.md.*"))), 1)
+        self.assertEqual(cache.counters["writes_skipped"], 1)
+        self.assertEqual(cache.pages["cli/a"]["blob"], cache.pages["cli/b"]["blob"])
+        shared = cache.blob_path(cache.pages["cli/a"])
+
+        self.store(cache, "cli/a", "# Changed\n")
+        cache.save()
+        self.assertTrue(shared.exists())
+        self.assertEqual(cache.read("cli/b"), "# Same\n")
+        self.store(cache, "cli/b", "# Changed\n")
+        cache.save()
+        self.assertFalse(shared.exists())
+        self.assertEqual(len(list(objects.rglob("*.md.*"))), 1)
+        self.assertEqual(PageCache(self.cache_dir).read("cli/a"), "# Changed\n")
+
+    def test_concurrent_saves_keep_each_others_pages(self) -> None:
+        first, second = PageCache(self.cache_dir), PageCache(self.cache_dir)
+        self.store(first, "cli/a")
+        self.store(second, "cli/b")
+        first.save()
+        second.save()
+        self.assertEqual(sorted(PageCache(self.cache_dir).pages), ["cli/a", "cli/b"])
+        self.assertEqual(PageCache(self.cache_dir).counters["misses"], 2)
+
+    def test_eviction_counts_pages_stored_by_other_processes(self) -> None:
+        other = PageCache(self.cache_dir)
+        mine = PageCache(self.cache_dir, max_entries=3)
+        for i in range(3):
+            self.store(other, f"cli/other-{i}")
+        other.save()
+        for i in range(2):
+            self.store(mine, f"cli/mine-{i}")
+        mine.evict()
+        mine.save()
+        reloaded = PageCache(self.cache_dir)
+        self.assertEqual(len(reloaded.pages), 3)
+        blobs = {m["blob"] for m in reloaded.pages.values()}
+        on_disk = {f"{p.parent.name}/{p.name}" for p in (self.cache_dir / OBJECTS_DIR).glob("*/*")}
+        self.assertEqual(on_disk, blobs)
+
+    def test_dropped_blob_shared_with_another_process_survives(self) -> None:
+        first, second = PageCache(self.cache_dir), PageCache(self.cache_dir)
+        self.store(first, "cli/a", "# same\n")
+        first.save()
+        self.store(second, "cli/b", "# same\n")
+        second.save()
+        first.invalidate(["cli/a"], {})
+        first.save()
+        reloaded = PageCache(self.cache_dir)
+        self.assertEqual(list(reloaded.pages), ["cli/b"])
+        self.assertEqual(reloaded.read("cli/b"), "# same\n")
+
+    def test_evict_collects_old_orphan_blobs(self) -> None:
+        cache = PageCache(self.cache_dir)
+        self.store(cache, "cli/a")
+        cache.save()
+        shard = self.cache_dir / OBJECTS_DIR / "ff"
+        shard.mkdir(parents=True)
+        old, new = shard / ("f" * 64 + ".md.gz"), shard / ("e" * 64 + ".md.gz")
+        old.write_bytes(b"orphan")
+        new.write_bytes(b"in flight")
+        stamp = time.time() - ORPHAN_GRACE - 60
+        os.utime(old, (stamp, stamp))
+        cache.scanned_at = 0.0
+        cache.evict()
+        self.assertFalse(old.exists())
+        self.assertTrue(new.exists())
+        self.assertIsNotNone(cache.read("cli/a"))
+        self.assertEqual(PageCache(self.cache_dir).counters["orphans"], 1)
+
+
+class StandInCase(unittest.TestCase):
+    """A temp directory with index, Markdown and cache paths plus a synthetic site."""
+
+    ENTRIES = 40
+
+    def setUp(self) -> None:
+        self.files = bench.synthetic_site(self.ENTRIES)
+        self.tmp = Path(tempfile.mkdtemp(prefix="docclaw-test-"))
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.index_json = self.tmp / "index.json"
+        self.index_md = self.tmp / "index.md"
+        self.cache_dir = self.tmp / "cache"
+
+    @contextlib.contextmanager
+    def site(self, latency: float = 0.0):
+        """Serve ``self.files`` as they are now; a new server per phase sees edits."""
+        with bench.stand_in_server(self.files, latency) as port, bench.routed_to(port):
+            yield port
+
+    def refresh(self, **kwargs) -> dict:
+        with self.site():
+            return refresh.refresh(self.index_json, self.index_md, TRUSTED_ROOT, 10.0, cache=self.cache_dir, **kwargs)
+
+
+class RefreshTest(StandInCase):
+    def test_incremental_refresh_revalidates_and_merges(self) -> None:
+        first = self.refresh(incremental=True)
+        self.assertIsNone(first["delta"])
+        self.assertEqual(first["entries"], self.ENTRIES)
+        second = self.refresh(incremental=True)
+        self.assertTrue(second["not_modified"])
+        self.assertTrue(second["unchanged"])
+        self.assertEqual(second["written"], {})
+
+        before = {e["path"]: e for e in fetch.load_index(self.index_json)}
+        path = sorted(before)[3]
+        set_lastmod(self.files, path, "2027-01-01")
+        third = self.refresh(incremental=True)
+        self.assertFalse(third["not_modified"])
+        self.assertEqual(third["delta"], {"added": 0, "updated": 1, "removed": 0, "unchanged": self.ENTRIES - 1})
+        after = {e["path"]: e for e in fetch.load_index(self.index_json)}
+        self.assertEqual(after[path]["lastmod"], "2027-01-01")
+        self.assertEqual({p: e for p, e in after.items() if p != path}, {p: e for p, e in before.items() if p != path})
+
+    def test_validator_only_change_does_not_republish(self) -> None:
+        first = self.refresh(incremental=True)
+        self.files["/llms.txt"] += b"\n<!-- rebuilt -->\n"
+        second = self.refresh(incremental=True)
+        self.assertTrue(second["unchanged"])
+        self.assertEqual(second["written"], {})
+        self.assertEqual(second["generation"], first["generation"])
+        self.assertEqual(refresh.index_generations(self.index_json, self.index_md).list(), [first["generation"]])
+        sidecar = refresh.validators_path(self.index_json.resolve())
+        self.assertTrue(sidecar.is_file())
+        # The stored validators make the next run fully conditional.
+        third = self.refresh(incremental=True)
+        self.assertTrue(third["not_modified"])
+        self.assertTrue(third["unchanged"])
+
+    def edit_current_index(self, **fields) -> None:
+        json_path = self.index_json.resolve()
+        payload = json.loads(json_path.read_text(encoding="utf-8"))
+        payload.update(fields)
+        json_path.write_text(json.dumps(payload), encoding="utf-8")
+
+    def test_markdown_follows_the_delta(self) -> None:
+        self.refresh()
+        first_md = self.index_md.resolve()
+        text = first_md.read_text(encoding="utf-8")
+        self.assertIn(f"Entries: {self.ENTRIES}\n", text)
+
+        # A moved docs root or moved sources publish a new generation with its own Markdown.
+        for edit in ({"docs_root": "https://docs.openclaw.ai/old"}, {"sources": {"llms": "old", "sitemap": "old"}}):
+            self.edit_current_index(**edit)
+            report = self.refresh()
+            self.assertIn("markdown", report["written"])
+            self.assertEqual(self.index_md.read_text(encoding="utf-8"), text)
+            self.assertFalse(os.path.samefile(self.index_md, first_md))
+            first_md = self.index_md.resolve()
+
+        report = self.refresh()
+        self.assertEqual(report["written"], {})
+        self.assertTrue(os.path.samefile(self.index_md, first_md))
+
+        add_page(self.files, "cli/new", "New Page")
+        self.refresh()
+        text = self.index_md.read_text(encoding="utf-8")
+        self.assertIn(f"Entries: {self.ENTRIES + 1}\n", text)
+        self.assertIn(f"- `cli/new` - [New Page]({TRUSTED_ROOT}/cli/new) (source: llms, lastmod: 2026-10-01)", text)
+
+    def test_failed_write_leaves_no_temp_file(self) -> None:
+        with self.assertRaises(KeyError):
+            refresh.write_index_md(self.index_md, {"generated_at": "now", "entries": [{}], "sources": {}})
+        self.assertEqual(list(self.tmp.iterdir()), [])
+
+
+class GenerationsTest(StandInCase):
+    def public_files(self) -> list[Path]:
+        return [
+            self.index_json,
+            self.index_md,
+            lookup_path(self.index_json),
+            compact_path(self.index_json),
+            index_delta.changes_path(self.index_json),
+        ]
+
+    def test_rollback_switch_and_prune(self) -> None:
+        first = self.refresh(keep_generations=2)["generation"]
+        add_page(self.files, "cli/second", "Second")
+        second = self.refresh(keep_generations=2)["generation"]
+        add_page(self.files, "cli/third", "Third")
+        report = self.refresh(keep_generations=2)
+        third = report["generation"]
+        self.assertEqual(report["pruned"], [first])
+        gens = refresh.index_generations(self.index_json, self.index_md)
+        self.assertEqual(gens.list(), [second, third])
+
+        self.assertEqual(gens.rollback(), second)
+        self.assertEqual(len(fetch.load_index(self.index_json)), self.ENTRIES + 1)
+        for path in self.public_files():
+            self.assertTrue(path.is_symlink(), path)
+            self.assertEqual(path.resolve().parent.name, second)
+        self.assertIsNotNone(LookupIndex.load(self.index_json))
+        compact = CompactIndex.open(self.index_json)
+        self.assertIsNotNone(compact)
+        compact.close()
+        added = index_delta.load_changes(self.index_json)["added"]
+        self.assertEqual(added, [{"path": "cli/second", "lastmod": "2026-10-01"}])
+        with self.assertRaisesRegex(ValueError, "No older index generation"):
+            gens.rollback()
+
+        args = argparse.Namespace(
+            out_json=str(self.index_json),
+            out_md=str(self.index_md),
+            keep_generations=2,
+            rollback=False,
+            use_generation=third,
+            list_generations=True,
+        )
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            refresh.manage_generations(args)
+        self.assertEqual(out.getvalue(), f"Current generation: {third}\n  {second}\n* {third}\n")
+        self.assertEqual(fetch.load_lookup(self.index_json).get("cli/third")["title"], "Third")
+        with self.assertRaisesRegex(ValueError, "Unknown index generation"):
+            gens.switch(first)
+        self.assertEqual(gens.current(), third)
+
+
+class CacheInvalidationTest(StandInCase):
+    def setUp(self) -> None:
+        super().setUp()
+        add_page(self.files, "cli/alpha", "Alpha")
+        add_page(self.files, "cli/beta", "Beta")
+        self.refresh()
+        lookup = fetch.load_lookup(self.index_json)
+        cache = PageCache(self.cache_dir)
+        with self.site():
+            for slug in ("cli/alpha", "cli/beta"):
+                self.assertEqual(fetch.fetch_page(slug, lookup, TRUSTED_ROOT, 10.0, cache=cache)["cache"], "miss")
+        cache.save()
+        set_lastmod(self.files, "cli/alpha", "2027-01-01")
+        self.files["/llms.txt"] = self.files["/llms.txt"].replace(
+            f"- [Beta]({TRUSTED_ROOT}/cli/beta.md): added page\n".encode("utf-8"), b""
+        )
+        self.files["/sitemap.xml"] = self.files["/sitemap.xml"].replace(
+            f"<url><loc>{TRUSTED_ROOT}/cli/beta</loc><lastmod>2026-10-01</lastmod></url>".encode("utf-8"), b""
+        )
+
+    def test_refresh_marks_changed_and_drops_removed_pages(self) -> None:
+        report = self.refresh()
+        self.assertEqual(report["cache"]["stale"], ["cli/alpha"])
+        self.assertEqual(report["cache"]["removed"], ["cli/beta"])
+        changes = index_delta.load_changes(self.index_json)
+        self.assertEqual([(e["path"], e["fields"]) for e in changes["changed"]], [("cli/alpha", ["lastmod"])])
+        self.assertEqual(changes["removed"], [{"path": "cli/beta", "lastmod": "2026-10-01"}])
+        self.assertEqual(changes["added"], [])
+
+        cache = PageCache(self.cache_dir)
+        self.assertEqual(cache.stale(), ["cli/alpha"])
+        self.assertNotIn("cli/beta", cache.pages)
+        lookup = fetch.load_lookup(self.index_json)
+        with self.site():
+            page = fetch.fetch_page("cli/alpha", lookup, TRUSTED_ROOT, 10.0, cache=cache)
+        self.assertEqual(page["cache"], "revalidated")
+        self.assertEqual(cache.stale(), [])
+        self.assertTrue(cache.is_fresh("cli/alpha", "2027-01-01"))
+
+        # The same delta applied again changes nothing.
+        self.assertEqual(fetch.apply_index_changes(cache, changes), {"stale": [], "removed": []})
+
+    def test_evict_policy_deletes_changed_pages(self) -> None:
+        report = self.refresh(cache_policy="evict")
+        self.assertEqual(sorted(report["cache"]["removed"]), ["cli/alpha", "cli/beta"])
+        self.assertEqual(PageCache(self.cache_dir).pages.keys() & {"cli/alpha", "cli/beta"}, set())
+
+    def test_refetch_policy_warms_changed_pages(self) -> None:
+        report = self.refresh(cache_policy="refetch")
+        self.assertEqual(report["cache"]["refetched"], 1)
+        cache = PageCache(self.cache_dir)
+        self.assertEqual(cache.stale(), [])
+        self.assertTrue(cache.is_fresh("cli/alpha", "2027-01-01"))
+
+
+class BenchTest(unittest.TestCase):
+    def test_scale_run_completes_offline(self) -> None:
+        real_open_connection = bench.docs_http.open_connection
+        results = bench.bench_scale(20, 0.0, 1, 10, 5, 2)
+        self.assertIs(bench.docs_http.open_connection, real_open_connection)
+        self.assertEqual(results["fetch_bulk"]["failures"], 0)
+        self.assertEqual(results["fetch_bulk"]["pages"], 5)
+        self.assertEqual(results["resolve_target"]["queries"], 10)
+        for stats in results.values():
+            self.assertNotIn("_result", stats)
+            self.assertGreaterEqual(stats["median_ms"], stats["min_ms"])
+
+        lines = bench.compare({"scales": {"20": results}}, {"scales": {"20": results}})
+        self.assertEqual(len(lines), len(results))
+        self.assertTrue(all(line.endswith("x1.00") for line in lines))
+
+
+class StartupTest(unittest.TestCase):
+    LAZY = (
+        "argparse",
+        "chunk_store",
+        "concurrent.futures",
+        "docclaw_daemon",
+        "docs_http",
+        "hashlib",
+        "http.client",
+        "prefetch",
+        "ssl",
+        "subprocess",
+        "typing",
+    )
+
+    def test_fetch_import_defers_heavy_modules(self) -> None:
+        code = "import sys, fetch_doc_markdown; print(' '.join(m for m in sys.argv[1:] if m in sys.modules))"
+        result = subprocess.run(
+            [sys.executable, "-c", code, *self.LAZY],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual(result.stdout.split(), [])
+
+
+LLMS = (
+    "# OpenClaw\r\n\r\n## Docs\r\n"
+    f"- [Überblick – Start]({TRUSTED_ROOT}/start/überblick.md): erste Schritte 🚀\r\n"
+    f"- [CLI]({TRUSTED_ROOT}/cli.md)\r\n"
+    f"  - [Models]({TRUSTED_ROOT}/cli/models?tab=1): nested\n"
+    f"- [CLI again]({TRUSTED_ROOT}/cli.md): duplicate\r"
+    "- [Evil](https://docs.openclaw.ai.example.com/cli.md): wrong host\n"
+    "- [Plain](http://docs.openclaw.ai/cli.md): not https\n"
+    f"Prose mentioning [a link]({TRUSTED_ROOT}/prose.md) inline.\n"
+    f"- [Last]({TRUSTED_ROOT}/last): no newline"
+)
+
+
+class LlmsStreamTest(unittest.TestCase):
+    def test_stream_matches_whole_text_at_every_split(self) -> None:
+        data = LLMS.encode("utf-8")
+        whole = refresh.parse_llms(LLMS, TRUSTED_ROOT)
+        self.assertEqual([e["path"] for e in whole], ["start/überblick", "cli", "cli/models", "cli", "last"])
+        expected = ([e for e in whole if e["title"] != "CLI again"], 5)
+        for size in (1, 2, 3, 7, len(data)):
+            chunks = [data[i : i + size] for i in range(0, len(data), size)]
+            self.assertEqual(refresh.parse_llms_stream(chunks, TRUSTED_ROOT), expected, size)
+        for cut in range(len(data) + 1):
+            self.assertEqual(refresh.parse_llms_stream([data[:cut], data[cut:]], TRUSTED_ROOT), expected, cut)
+
+    def test_fast_url_split_matches_normalize_url(self) -> None:
+        for url in (
+            f"{TRUSTED_ROOT}/cli/models.md",
+            f"{TRUSTED_ROOT}/cli/models",
+            f"{TRUSTED_ROOT}/",
+            f"{TRUSTED_ROOT}//double/slash.md",
+            f"{TRUSTED_ROOT}/cli/models?tab=1",
+            f"{TRUSTED_ROOT}/cli/models#flags",
+            f"{TRUSTED_ROOT}/cli;v=1.md",
+            f"{TRUSTED_ROOT}x/cli.md",
+        ):
+            self.assertEqual(refresh.split_docs_url(url, TRUSTED_ROOT), refresh.normalize_url(url, TRUSTED_ROOT), url)
+
+
+class LookupTest(StandInCase):
+    def setUp(self) -> None:
+        super().setUp()
+        add_page(self.files, "gateway/configuration", "Gateway Configuration")
+        self.refresh()
+        self.entries = fetch.load_index(self.index_json)
+
+    def test_precomputed_lookup_matches_the_index(self) -> None:
+        lookup = LookupIndex.load(self.index_json.resolve())
+        self.assertIsNotNone(lookup)
+        built = LookupIndex.from_entries(self.entries)
+        self.assertEqual(len(lookup), len(self.entries))
+        for entry in self.entries:
+            self.assertEqual(lookup.get(entry["path"]), built.get(entry["path"]))
+            self.assertEqual(lookup.find_title(entry["title"])["path"], entry["path"])
+
+    def test_resolve_target_order(self) -> None:
+        lookup = fetch.load_lookup(self.index_json)
+        page = f"{TRUSTED_ROOT}/gateway/configuration.md"
+        for query in ("gateway/configuration", "/gateway/configuration.md", "gateway configuration", "Gateway Conf"):
+            self.assertEqual(fetch.resolve_target(query, lookup, TRUSTED_ROOT), (page, "gateway/configuration"))
+        self.assertEqual(
+            fetch.resolve_target("Some Guess", lookup, TRUSTED_ROOT), (f"{TRUSTED_ROOT}/some-guess.md", "some-guess")
+        )
+        with self.assertRaisesRegex(ValueError, "Full URLs are not allowed"):
+            fetch.resolve_target(f"{TRUSTED_ROOT}/cli.md", lookup, TRUSTED_ROOT)
+
+    def test_stale_lookup_is_ignored(self) -> None:
+        json_path = self.index_json.resolve()
+        json_path.write_text(json_path.read_text(encoding="utf-8") + "\n", encoding="utf-8")
+        self.assertIsNone(LookupIndex.load(json_path))
+        lookup = fetch.load_lookup(self.index_json)
+        self.assertEqual(lookup.get("gateway/configuration")["title"], "Gateway Configuration")
+
+    def test_write_replaces_the_file(self) -> None:
+        json_path = self.index_json.resolve()
+        held = self.tmp / "held.lookup.json"
+        os.link(lookup_path(json_path), held)
+        before = held.read_bytes()
+        LookupIndex.from_entries(self.entries[:1]).write(json_path)
+        # A reader holding the old file keeps reading it whole.
+        self.assertEqual(held.read_bytes(), before)
+        self.assertEqual(len(LookupIndex.load(json_path)), 1)
+        self.assertEqual([p.name for p in json_path.parent.iterdir() if p.name.endswith(".tmp")], [])
+
+    def test_typo_suggests_the_real_page(self) -> None:
+        lookup = LookupIndex.load(self.index_json.resolve())
+        self.assertIn("gateway/configuration", lookup.suggest("gatway/configuraton"))
+        self.assertIn("Gateway Configuration", fetch.suggest_targets("Gateway Configration", lookup))
+        self.assertEqual(lookup.suggest("zzzz"), [])
+        rebuilt = LookupIndex.from_entries(self.entries)
+        rebuilt.build_trigrams()
+        self.assertEqual(lookup.terms, rebuilt.terms)
+        self.assertEqual({g: sorted(rows) for g, rows in lookup.grams.items()}, rebuilt.grams)
+
+
+class EditDistanceTest(unittest.TestCase):
+    @staticmethod
+    def naive(a: str, b: str, partial: bool = False) -> int:
+        prev = [0] * (len(b) + 1) if partial else list(range(len(b) + 1))
+        for i, ca in enumerate(a, 1):
+            cur = [i]
+            for j, cb in enumerate(b, 1):
+                cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+            prev = cur
+        return min(prev) if partial else prev[-1]
+
+    def test_bit_parallel_matches_dynamic_programming(self) -> None:
+        rng = random.Random(7)
+        for _ in range(500):
+            a = "".join(rng.choice("abcd/-") for _ in range(rng.randint(0, 12)))
+            b = "".join(rng.choice("abcd/-") for _ in range(rng.randint(0, 20)))
+            self.assertEqual(edit_distance(a, b), self.naive(a, b), (a, b))
+            if len(a) < len(b):
+                self.assertEqual(partial_distance(a, b), self.naive(a, b, partial=True), (a, b))
+
+
+class CompactIndexTest(StandInCase):
+    def setUp(self) -> None:
+        super().setUp()
+        add_page(self.files, "install/ueberblick", "Überblick – Installation")
+        self.refresh()
+        self.entries = fetch.load_index(self.index_json)
+
+    def test_compact_records_match_the_json_index(self) -> None:
+        compact = CompactIndex.open(self.index_json.resolve())
+        self.assertIsNotNone(compact)
+        self.addCleanup(compact.close)
+        self.assertEqual(len(compact), len(self.entries))
+        for entry in self.entries:
+            record = compact.get(entry["path"])
+            self.assertEqual({k: record.get(k, "") for k in entry}, entry)
+        self.assertIsNone(compact.get("install/nope"))
+        self.assertIsNone(compact.get(""))
+
+    def test_exact_paths_skip_the_full_lookup(self) -> None:
+        lookup = fetch.load_lookup(self.index_json)
+        self.assertIsInstance(lookup, CompactFirstLookup)
+        self.addCleanup(lookup.compact.close)
+        for query in ("install/ueberblick", "Überblick – Installation"):
+            self.assertEqual(fetch.resolve_target(query, lookup, TRUSTED_ROOT)[1], "install/ueberblick")
+            self.assertEqual(lookup._full is None, query == "install/ueberblick")
+
+    def test_stale_compact_index_is_ignored(self) -> None:
+        json_path = self.index_json.resolve()
+        st = json_path.stat()
+        os.utime(json_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        self.assertIsNone(CompactIndex.open(json_path))
+        lookup = fetch.load_lookup(self.index_json)
+        self.assertNotIsInstance(lookup, CompactFirstLookup)
+        self.assertEqual(lookup.get("install/ueberblick")["title"], "Überblick – Installation")
+
+
+GUIDE = """Intro text.
+
+# Gateway Guide
+
+## Auth
+
+Tokens rotate daily.
+
+```sh
+# not a heading
+openclaw auth rotate
+```
+
+### OAuth
+
+Use the device flow.
+
+## Auth
+
+Second auth section.
+
+## Limits ##
+
+Rate limits apply.
+"""
+
+
+class ChunkTest(StandInCase):
+    def test_split_sections(self) -> None:
+        data = GUIDE.encode("utf-8")
+        chunks = split_sections(data)
+        self.assertEqual(
+            [(c["level"], c["anchor"], c["path"]) for c in chunks],
+            [
+                (0, "", []),
+                (1, "gateway-guide", ["Gateway Guide"]),
+                (2, "auth", ["Gateway Guide", "Auth"]),
+                (3, "oauth", ["Gateway Guide", "Auth", "OAuth"]),
+                (2, "auth-1", ["Gateway Guide", "Auth"]),
+                (2, "limits", ["Gateway Guide", "Limits"]),
+            ],
+        )
+        auth = data[chunks[2]["start"] : chunks[2]["end"]].decode("utf-8")
+        self.assertIn("# not a heading", auth)
+        self.assertIn("device flow", auth)
+        self.assertNotIn("Second auth", auth)
+        self.assertEqual(chunks[2]["body_end"], chunks[3]["start"])
+        self.assertEqual(chunks[-1]["end"], len(data))
+        self.assertIn("rotate", chunks[2]["terms"])
+
+    def test_fetch_section_through_the_cache(self) -> None:
+        add_page(self.files, "gateway/guide", "Gateway Guide")
+        self.files["/gateway/guide.md"] = GUIDE.encode("utf-8")
+        self.refresh()
+        docs = docclaw_api.Docs(self.index_json, self.cache_dir, TRUSTED_ROOT, 10.0)
+        with self.site():
+            page = docs.fetch("gateway/guide", section="oauth")
+            self.assertEqual(page["section"]["path"], ["Gateway Guide", "Auth", "OAuth"])
+            self.assertEqual(page["section"]["text"], "### OAuth\n\nUse the device flow.\n\n")
+            self.assertEqual(docs.fetch("gateway/guide", section="#auth-1")["section"]["anchor"], "auth-1")
+            self.assertEqual(docs.fetch("gateway/guide", section="rate limits")["section"]["anchor"], "limits")
+            with self.assertRaisesRegex(ValueError, "Sections:\n- Gateway Guide\n"):
+                docs.fetch("gateway/guide", section="webhooks")
+
+        self.files["/gateway/guide.md"] = GUIDE.replace("device flow", "browser flow").encode("utf-8")
+        with self.site():
+            page = docs.fetch("gateway/guide", section="oauth", refresh=True)
+        self.assertIn("browser flow", page["section"]["text"])
+
+
+class SitemapIndexTest(StandInCase):
+    def split_sitemap(self) -> dict[str, str]:
+        flat = refresh.parse_sitemap(self.files["/sitemap.xml"].decode("utf-8"))
+        urls = sorted(flat.items())
+        half = len(urls) // 2
+
+        def urlset(items) -> bytes:
+            rows = "".join(f"<url><loc>{loc}</loc><lastmod>{mod}</lastmod></url>" for loc, mod in items)
+            return f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{rows}</urlset>'.encode("utf-8")
+
+        self.files["/sitemaps/a.xml"] = urlset(urls[:half])
+        self.files["/sitemaps/b.xml.gz"] = gzip.compress(urlset(urls[half:]))
+        self.files["/sitemaps/c.xml"] = urlset([(f"{TRUSTED_ROOT}/untrusted/page", "2026-01-01")])
+        children = [
+            f"{TRUSTED_ROOT}/sitemaps/a.xml",
+            f"{TRUSTED_ROOT}/sitemaps/b.xml.gz",
+            f"http://{refresh.TRUSTED_DOCS_HOST}/sitemaps/c.xml",
+            f"{TRUSTED_ROOT}/sitemaps/a.xml",
+        ]
+        rows = "".join(f"<sitemap><loc>{c}</loc></sitemap>" for c in children)
+        self.files["/sitemap.xml"] = (
+            f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{rows}</sitemapindex>'
+        ).encode("utf-8")
+        return flat
+
+    def test_sitemap_index_follows_trusted_children(self) -> None:
+        flat = self.split_sitemap()
+        with self.site():
+            urls, validators = refresh.fetch_sitemap(f"{TRUSTED_ROOT}/sitemap.xml", 10.0)
+        self.assertEqual(urls, flat)
+        self.assertTrue(validators)
+        self.refresh()
+        lastmods = {e["path"]: e["lastmod"] for e in fetch.load_index(self.index_json)}
+        self.assertNotIn("untrusted/page", lastmods)
+        for loc, mod in flat.items():
+            self.assertEqual(lastmods[loc.removeprefix(f"{TRUSTED_ROOT}/")], mod)
+
+    def test_incremental_refresh_revalidates_children(self) -> None:
+        self.split_sitemap()
+        first = self.refresh(incremental=True)
+        self.assertEqual(
+            sorted(json.loads(self.index_json.read_text(encoding="utf-8"))["validators"]["sitemap"]["children"]),
+            [f"{TRUSTED_ROOT}/sitemaps/a.xml", f"{TRUSTED_ROOT}/sitemaps/b.xml.gz"],
+        )
+        second = self.refresh(incremental=True)
+        self.assertTrue(second["not_modified"])
+
+        # The index document is unchanged (304); only a child moved.
+        entry = fetch.load_index(self.index_json)[0]
+        loc = f"<loc>{entry['html_url']}</loc><lastmod>".encode("utf-8")
+        child = self.files["/sitemaps/a.xml"]
+        start = child.index(loc) + len(loc)
+        self.files["/sitemaps/a.xml"] = child[:start] + b"2027-01-01" + child[child.index(b"</lastmod>", start) :]
+        third = self.refresh(incremental=True)
+        self.assertFalse(third["not_modified"])
+        self.assertEqual(third["delta"], {"added": 0, "updated": 1, "removed": 0, "unchanged": first["entries"] - 1})
+        lastmods = {e["path"]: e["lastmod"] for e in fetch.load_index(self.index_json)}
+        self.assertEqual(lastmods[entry["path"]], "2027-01-01")
+        self.assertEqual(len(lastmods), first["entries"])
+
+    def test_stream_parse_matches_whole_document(self) -> None:
+        data = gzip.compress(self.files["/sitemap.xml"])
+        chunks = [data[i : i + 37] for i in range(0, len(data), 37)]
+        urls, children = refresh.parse_sitemap_stream(chunks)
+        self.assertEqual(urls, refresh.parse_sitemap(self.files["/sitemap.xml"].decode("utf-8")))
+        self.assertEqual(children, [])
+        with self.assertRaisesRegex(RuntimeError, "Invalid sitemap XML"):
+            refresh.parse_sitemap_stream([b"<urlset><url>"])
+
+
+class DocsHttpTest(StandInCase):
+    @contextlib.contextmanager
+    def counted_site(self):
+        """Serve the site and count the connections docs_http opens to it."""
+        opened = []
+        with self.site():
+            real_open_connection = docs_http.open_connection
+
+            def open_connection(timeout: float):
+                opened.append(timeout)
+                return real_open_connection(timeout)
+
+            with mock.patch.object(docs_http, "open_connection", open_connection):
+                yield opened
+
+    def test_serial_requests_share_one_connection(self) -> None:
+        paths = [p for p in self.files if p.endswith(".md")][:5]
+        with self.counted_site() as opened:
+            for path in paths:
+                text, validators = docs_http.get(f"{TRUSTED_ROOT}{path}", 10.0)
+                self.assertEqual(text, self.files[path].decode("utf-8"))
+                self.assertTrue(validators["etag"])
+            self.assertEqual(len(opened), 1)
+            self.assertEqual(docs_http.get(f"{TRUSTED_ROOT}{paths[-1]}", 10.0, validators), (None, validators))
+            self.assertEqual(len(opened), 1)
+
+    def test_stale_idle_connection_is_replaced(self) -> None:
+        import socket
+
+        with self.counted_site() as opened:
+            docs_http.get(f"{TRUSTED_ROOT}/llms.txt", 10.0)
+            docs_http.POOL._idle[0].sock.shutdown(socket.SHUT_RDWR)
+            text, _ = docs_http.get(f"{TRUSTED_ROOT}/llms.txt", 10.0)
+            self.assertEqual(text, self.files["/llms.txt"].decode("utf-8"))
+            self.assertEqual(len(opened), 2)
+
+    def test_errors(self) -> None:
+        with self.counted_site() as opened:
+            with self.assertRaises(urllib.error.HTTPError) as caught:
+                docs_http.get(f"{TRUSTED_ROOT}/missing.md", 10.0)
+            self.assertEqual(caught.exception.code, 404)
+            for url in ("https://example.com/llms.txt", f"http://{docs_http.TRUSTED_DOCS_HOST}/llms.txt"):
+                with self.assertRaisesRegex(ValueError, "outside trusted docs host"):
+                    docs_http.get(url, 10.0)
+            self.assertEqual(len(opened), 1)
+
+
+class BatchFetchTest(StandInCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.refresh()
+        self.docs = docclaw_api.Docs(self.index_json, self.cache_dir, TRUSTED_ROOT, 10.0)
+
+    def test_section_batch_reports_each_page_in_order(self) -> None:
+        cli = [e["path"] for e in fetch.load_index(self.index_json) if e["section"] == "cli"]
+        targets = self.docs.batch_targets(["cli/no-such-page", cli[0]], index_section="cli")
+        self.assertEqual(targets, ["cli/no-such-page", *cli])
+        with self.site():
+            results = self.docs.fetch_many(targets, workers=4, probe=True)
+        self.assertEqual([r["target"] for r in results], targets)
+        self.assertFalse(results[0]["ok"])
+        self.assertIn("HTTP 404", results[0]["error"])
+        self.assertEqual({(r["ok"], r["cache"]) for r in results[1:]}, {(True, "miss")})
+        with self.site():
+            again = self.docs.fetch_many(cli, workers=4)
+        self.assertEqual({r["cache"] for r in again}, {"hit"})
+
+    def test_all_targets_every_entry(self) -> None:
+        self.assertEqual(len(self.docs.batch_targets([], fetch_all=True)), self.ENTRIES)
+
+
+class PrefetchTest(StandInCase):
+    def test_plan_prefers_siblings_then_recent_pages(self) -> None:
+        rows = [
+            ["cli/a", "A", "", "CLI", "2026-01-01"],
+            ["cli/b", "B", "", "CLI", "2026-03-01"],
+            ["cli/sub/c", "C", "", "CLI", "2026-09-01"],
+            ["cli/d", "D", "", "CLI", "2026-02-01"],
+            ["gateway/e", "E", "", "Gateway", "2026-10-01"],
+            ["gateway/f", "F", "", "Gateway", ""],
+        ]
+        never = lambda path, lastmod: False  # noqa: E731
+        self.assertEqual(plan_prefetch(rows, "cli/a", 3, never), ["cli/b", "gateway/e", "cli/sub/c"])
+        self.assertEqual(plan_prefetch(rows, "cli/a", 5, never), ["cli/b", "cli/d", "cli/sub/c", "gateway/e"])
+        cached_b = lambda path, lastmod: path == "cli/b"  # noqa: E731
+        self.assertEqual(plan_prefetch(rows, "cli/a", 3, cached_b), ["cli/d", "gateway/e", "cli/sub/c"])
+        self.assertEqual(plan_prefetch(rows, "cli/nope", 3, never), [])
+        self.assertEqual(plan_prefetch(rows, "cli/a", 0, never), [])
+
+    def test_run_warms_the_cache_within_budget(self) -> None:
+        self.refresh()
+        lookup = fetch.load_lookup(self.index_json)
+        cache = PageCache(self.cache_dir)
+        first = lookup.entries[0]["path"]
+        with self.site():
+            prefetcher = fetch.make_prefetcher(TRUSTED_ROOT, 10.0, cache, workers=2, max_pages=4)
+            self.addCleanup(prefetcher.shutdown)
+            targets = prefetcher.plan(lookup, first)
+            self.assertEqual(len(targets), 4)
+            result = prefetcher.run(lookup, targets)
+            self.assertEqual((result["pages"], result["failed"]), (4, 0))
+            self.assertEqual(cache.counters["prefetched"], 4)
+            self.assertEqual(cache.counters["misses"], 0)
+            self.assertTrue(all(cache.is_fresh(fetch.slugify(t)) for t in targets))
+            self.assertTrue(set(targets).isdisjoint(prefetcher.plan(lookup, first)))
+
+            tight = fetch.make_prefetcher(TRUSTED_ROOT, 10.0, cache, workers=1, max_pages=3, max_bytes=1)
+            self.addCleanup(tight.shutdown)
+            result = tight.run(lookup, tight.plan(lookup, lookup.entries[-1]["path"]))
+        self.assertEqual((result["pages"], result["skipped_budget"]), (1, 2))
+        self.assertEqual(tight.stats()["queued"], 0)
+
+
+    def test_prefetch_starts_from_the_index_path(self) -> None:
+        import docclaw_daemon
+
+        add_page(self.files, "reference/RELEASING", "Releasing")
+        add_page(self.files, "reference/templates", "Templates")
+        self.refresh()
+        state = docclaw_daemon.DaemonState(
+            self.index_json, self.cache_dir, TRUSTED_ROOT, 10.0, 1, {"workers": 1, "max_pages": 2, "max_bytes": 1 << 20}
+        )
+        self.addCleanup(state.pool.shutdown)
+        self.addCleanup(state.prefetcher.shutdown)
+        with mock.patch.object(state.prefetcher, "schedule", return_value=[]) as schedule, self.site():
+            response = state.dispatch({"op": "fetch", "target": "reference/RELEASING"})
+        self.assertTrue(response["ok"], response)
+        self.assertEqual(response["result"]["slug"], "reference/releasing")
+        self.assertEqual(schedule.call_args.args[1], "reference/RELEASING")
+        self.assertTrue(state.prefetcher.plan(state.docs.lookup(), "reference/RELEASING"))
+
+        argv = ["fetch_doc_markdown.py", "Releasing", "--prefetch", "--no-daemon", "--index", str(self.index_json)]
+        argv += ["--cache-dir", str(self.cache_dir), "--docs-root", TRUSTED_ROOT]
+        with mock.patch.object(sys, "argv", argv), mock.patch.object(fetch, "spawn_prefetch") as spawn, self.site():
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(fetch.main(), 0)
+        self.assertEqual(spawn.call_args.args[1], "reference/RELEASING")
+
+
+class InstrumentTest(StandInCase):
+    def test_off_by_default(self) -> None:
+        self.assertFalse(instrument.enabled())
+        self.assertIs(instrument.span("fetch.anything"), instrument.span("fetch.other"))
+
+    def test_fetch_records_spans_and_counters(self) -> None:
+        self.refresh()
+        lookup = fetch.load_lookup(self.index_json)
+        cache = PageCache(self.cache_dir)
+        slug = lookup.entries[0]["path"]
+        stream = io.StringIO()
+        with mock.patch.object(instrument, "_recorder", instrument.Recorder("json", stream)) as recorder:
+            with self.site():
+                for _ in range(2):
+                    fetch.fetch_page(slug, lookup, TRUSTED_ROOT, 10.0, cache=cache)
+            summary = recorder.summary()
+            recorder.report()
+        counters = summary["counters"]
+        self.assertEqual((counters["cache.miss"], counters["cache.hit"]), (1, 1))
+        self.assertEqual(counters["http.requests"], 1)
+        self.assertEqual(summary["spans"]["http.get"]["calls"], 1)
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        http_spans = [line for line in lines if line["type"] == "span" and line["name"] == "http.get"]
+        self.assertEqual([line["url"] for line in http_spans], [f"{TRUSTED_ROOT}/{slug}.md"])
+        self.assertEqual(lines[-1]["type"], "summary")
+        self.assertEqual(lines[-1]["counters"], counters)
+
+
+class QueryMemoTest(StandInCase):
+    def setUp(self) -> None:
+        super().setUp()
+        add_page(self.files, "gateway/configuration", "Gateway Configuration")
+        self.refresh()
+        self.page = (f"{TRUSTED_ROOT}/gateway/configuration.md", "gateway/configuration")
+
+    def test_resolutions_persist_until_the_index_changes(self) -> None:
+        memo = QueryMemo(self.cache_dir, self.index_json)
+        lookup = fetch.load_lookup(self.index_json)
+        self.assertEqual(fetch.resolve_target("Gateway Config", lookup, TRUSTED_ROOT, memo), self.page)
+        self.assertEqual(memo.stats()["hits"], 0)
+        with mock.patch.object(LookupIndex, "find_title", side_effect=AssertionError("not memoized")):
+            self.assertEqual(fetch.resolve_target(" Gateway Config\n", lookup, TRUSTED_ROOT, memo), self.page)
+        # Inner whitespace changes the title match, so it is a different query.
+        guess = (f"{TRUSTED_ROOT}/gateway-config.md", "gateway-config")
+        self.assertEqual(fetch.resolve_target("Gateway  Config", lookup, TRUSTED_ROOT, memo), guess)
+        memo.save()
+
+        reloaded = QueryMemo(self.cache_dir, self.index_json)
+        self.assertEqual(reloaded.resolution("Gateway Config"), (*self.page, "gateway/configuration"))
+        self.assertEqual(reloaded.resolution("Gateway  Config"), (*guess, ""))
+        self.assertEqual(reloaded.stats()["hits"], 3)
+
+        add_page(self.files, "cli/new", "New")
+        self.refresh()
+        reloaded.sync()
+        self.assertIsNone(reloaded.resolution("Gateway Config"))
+        self.assertEqual(reloaded.stats()["invalidated"], 2)
+        self.assertIsNone(QueryMemo(self.cache_dir, self.index_json).resolution("Gateway Config"))
+
+    def test_suggestions_are_memoized_per_limit(self) -> None:
+        memo = QueryMemo(self.cache_dir, self.index_json)
+        lookup = fetch.load_lookup(self.index_json)
+        found = fetch.suggest_targets("gatway configuraton", lookup, 3, memo)
+        self.assertIn("gateway/configuration", found)
+        with mock.patch.object(LookupIndex, "suggest", side_effect=AssertionError("not memoized")):
+            self.assertEqual(fetch.suggest_targets("gatway configuraton", lookup, 3, memo), found)
+        self.assertIsNone(memo.suggestions("gatway configuraton", 5))
+
+    def test_least_recently_used_entries_are_trimmed(self) -> None:
+        memo = QueryMemo(self.cache_dir, self.index_json, max_entries=2)
+        for query in ("a", "b"):
+            memo.remember(query, f"{TRUSTED_ROOT}/{query}.md", query)
+        memo.resolution("a")
+        memo.remember("c", f"{TRUSTED_ROOT}/c.md", "c")
+        self.assertEqual(list(memo.entries), ["a", "c"])
+
+
+class IndexedPathTest(StandInCase):
+    """Index paths that are not slug-normal (``reference/RELEASING``)."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        add_page(self.files, "reference/RELEASING", "Releasing", lastmod="2026-09-30")
+        self.refresh()
+        self.docs = docclaw_api.Docs(self.index_json, self.cache_dir, TRUSTED_ROOT, 10.0)
+
+    def test_fresh_index_fetches_indexed_page(self) -> None:
+        self.assertTrue(fetch.index_is_fresh(self.index_json))
+        with self.site():
+            first = self.docs.fetch("reference/RELEASING")
+            second = self.docs.fetch("reference/RELEASING")
+        self.assertEqual(first["slug"], "reference/releasing")
+        self.assertEqual((first["cache"], second["cache"]), ("miss", "hit"))
+        self.assertIn("# Releasing", second["text"])
+        self.assertEqual(self.docs.cache.pages["reference/releasing"]["lastmod"], "2026-09-30")
+
+    def test_resolve_returns_the_index_entry(self) -> None:
+        for query in ("reference/RELEASING", "Releasing"):
+            resolved = self.docs.resolve(query)
+            self.assertEqual(resolved["slug"], "reference/releasing")
+            self.assertIsNotNone(resolved["entry"], query)
+            self.assertEqual(resolved["entry"]["path"], "reference/RELEASING")
+        self.assertIsNone(self.docs.resolve("cli/no-such-page")["entry"])
+
+    def test_unindexed_guess_is_refused_before_a_request(self) -> None:
+        with self.site(), self.assertRaisesRegex(RuntimeError, "is not in the docs index"):
+            self.docs.fetch("cli/no-such-page")
+
+    def test_untrusted_entry_url_is_fetched_from_the_docs_root(self) -> None:
+        add_page(self.files, "cli/docs", "CLI Docs")
+        payload = json.loads(self.index_json.read_text(encoding="utf-8"))
+        payload["entries"].insert(
+            0,
+            {
+                "title": "CLI Docs",
+                "markdown_url": "https://example.com/evil.md",
+                "html_url": "https://example.com/evil",
+                "path": "cli/docs",
+                "section": "cli",
+                "source": "test",
+            },
+        )
+        malicious = self.tmp / "malicious.json"
+        malicious.write_text(json.dumps(payload), encoding="utf-8")
+        self.assertEqual(
+            fetch.resolve_entry("cli/docs", fetch.load_lookup(malicious), TRUSTED_ROOT),
+            (f"{TRUSTED_ROOT}/cli/docs.md", "cli/docs", "cli/docs"),
+        )
+        docs = docclaw_api.Docs(malicious, self.cache_dir, TRUSTED_ROOT, 10.0)
+        self.assertTrue(fetch.index_is_fresh(malicious))
+        with self.site():
+            page = docs.fetch("cli/docs")
+        self.assertEqual(page["url"], f"{TRUSTED_ROOT}/cli/docs.md")
+        self.assertIn("# CLI Docs", page["text"])
+
+
+class PreflightTest(StandInCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.refresh()
+        self.lookup = fetch.load_lookup(self.index_json)
+        self.requested: list[str] = []
+
+    def getter(self, url: str, timeout: float, validators: dict | None = None):
+        self.requested.append(url)
+        return fetch.http_get_conditional(url, timeout, validators)
+
+    def fetch(self, target: str, memo: QueryMemo, **kw) -> dict:
+        out = self.tmp / "page.md"
+        with self.site():
+            return fetch.fetch_page(
+                target, self.lookup, TRUSTED_ROOT, 10.0, out_path=out, getter=self.getter, memo=memo, **kw
+            )
+
+    def test_fresh_index_refuses_unindexed_slugs(self) -> None:
+        self.assertTrue(fetch.index_is_fresh(self.index_json))
+        memo = QueryMemo(self.cache_dir, self.index_json)
+        with self.assertRaisesRegex(RuntimeError, "not in the docs index, so it was not requested"):
+            self.fetch("cli/no-such-page", memo, fresh_index=True)
+        self.assertEqual(self.requested, [])
+
+    def test_unindexed_404_is_remembered_until_probed(self) -> None:
+        memo = QueryMemo(self.cache_dir, self.index_json)
+        with self.assertRaisesRegex(RuntimeError, "HTTP 404") as first:
+            self.fetch("cli/later", memo)
+        self.assertEqual(len(self.requested), 1)
+        memo.save()
+
+        memo = QueryMemo(self.cache_dir, self.index_json)
+        with self.assertRaises(RuntimeError) as again:
+            self.fetch("cli/later", memo)
+        self.assertEqual(str(again.exception), str(first.exception))
+        self.assertEqual(len(self.requested), 1)
+
+        self.files["/cli/later.md"] = b"# Later\n"
+        self.assertEqual(self.fetch("cli/later", memo, probe=True)["slug"], "cli/later")
+        self.assertEqual(len(self.requested), 2)
+        self.assertIsNone(memo.missing("cli/later"))
+        self.fetch("cli/later", memo)
+        self.assertEqual(len(self.requested), 3)
+
+        # Indexed pages never consult the 404 memo.
+        indexed = self.lookup.entries[0]["path"]
+        memo.remember_missing(indexed, "stale 404")
+        self.assertEqual(self.fetch(indexed, memo)["slug"], indexed)
+
+
+class AsyncDocsTest(StandInCase):
+    def test_coroutines_run_on_the_bounded_pool(self) -> None:
+        import asyncio
+
+        self.refresh()
+        docs = docclaw_api.Docs(self.index_json, self.cache_dir, TRUSTED_ROOT, 10.0)
+        client = docclaw_api.AsyncDocs(docs, concurrency=2)
+        slugs = [e["path"] for e in fetch.load_index(self.index_json)[:6]]
+        running, peak = 0, 0
+        lock = threading.Lock()
+        real_fetch = docs.fetch
+
+        def counted_fetch(target: str, **kwargs) -> dict:
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            try:
+                time.sleep(0.02)
+                return real_fetch(target, **kwargs)
+            finally:
+                with lock:
+                    running -= 1
+
+        async def main():
+            pages = await asyncio.gather(*(client.fetch(slug) for slug in slugs[:4]))
+            batch = await client.fetch_many(slugs)
+            resolved, suggestions = await asyncio.gather(client.resolve(slugs[0]), client.suggest(slugs[0][:-1]))
+            with self.assertRaisesRegex(ValueError, "Full URLs are not allowed"):
+                await client.fetch(f"{TRUSTED_ROOT}/{slugs[0]}.md")
+            with self.assertRaises(RuntimeError):
+                await client.fetch("cli/no-such-page", probe=True)
+            return pages, batch, resolved, suggestions
+
+        with self.site(), mock.patch.object(docs, "fetch", counted_fetch):
+            pages, batch, resolved, suggestions = asyncio.run(main())
+        client.close()
+        self.assertEqual(peak, 2)
+        self.assertEqual([p["slug"] for p in pages], slugs[:4])
+        self.assertTrue(all(p["text"].startswith("# ") for p in pages))
+        self.assertEqual([r["target"] for r in batch], slugs)
+        self.assertTrue(all(r["ok"] for r in batch))
+        self.assertEqual(sum(r["cache"] == "hit" for r in batch), 4)
+        self.assertEqual(resolved["entry"]["path"], slugs[0])
+        self.assertIn(slugs[0], suggestions)
+
+
+class SearchTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = Path(tempfile.mkdtemp(prefix="docclaw-search-"))
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.local = self.tmp / "local"
+        self.cache_dir = self.tmp / "cache"
+        self.write("gateway/auth.md", "# Gateway Auth\n\nRotate the token.\nToken scopes.\n\nToken expiry.\n")
+        self.write("cli/models.md", "# Models\n\n" + "Pick a model for the agent. " * 30 + "\nA token budget.\n")
+        self.write("tools/browser.md", "# Browser\n\nThe browser tool drives Chrome.\n")
+        cache = PageCache(self.cache_dir)
+        cache.store("gateway/auth", f"{TRUSTED_ROOT}/gateway/auth.md", "# Gateway Auth\n\nToken token token.\n", {})
+        cache.save()
+        self.roots = [(self.cache_dir, "cache"), (self.local, "local")]
+        self.index_path = self.tmp / "search-index.json"
+
+    def write(self, rel: str, text: str) -> Path:
+        path = self.local / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+        return path
+
+    def test_update_tracks_files_by_mtime_and_size(self) -> None:
+        index = search_docs.SearchIndex(self.index_path)
+        self.assertEqual(index.update(self.roots), {"added": 4, "updated": 0, "removed": 0})
+        self.assertEqual(index.update(self.roots), {"added": 0, "updated": 0, "removed": 0})
+
+        self.write("tools/browser.md", "# Browser\n\nThe browser tool drives Chromium and Firefox.\n")
+        (self.local / "cli/models.md").unlink()
+        self.write("tools/exec.md", "# Exec\n\nRun shell commands.\n")
+        self.assertEqual(index.update(self.roots), {"added": 1, "updated": 1, "removed": 1})
+        self.assertEqual([doc["slug"] for _, doc in index.search("firefox")], ["tools/browser"])
+        self.assertEqual(index.search("model"), [])
+        self.assertNotIn("model", index.postings)
+        self.assertEqual(index.total_length, sum(d["length"] for d in index.docs.values()))
+
+        index.save()
+        reloaded = search_docs.SearchIndex(self.index_path)
+        self.assertEqual(reloaded.docs, index.docs)
+        self.assertEqual(reloaded.total_length, index.total_length)
+        self.assertEqual(reloaded.update(self.roots), {"added": 0, "updated": 0, "removed": 0})
+
+    def test_bm25_ranking_and_slug_dedup(self) -> None:
+        index = search_docs.SearchIndex(self.index_path)
+        index.update(self.roots)
+        ranked = index.search("token")
+        self.assertEqual([doc["slug"] for _, doc in ranked], ["gateway/auth", "cli/models"])
+        self.assertEqual(ranked[0][1]["origin"], "cache")
+        self.assertGreater(ranked[0][0], ranked[1][0])
+        self.assertEqual(len(index.search("token", limit=1)), 1)
+        self.assertEqual(index.search("zzz unknown"), [])
+        # The local copy of gateway/auth is indexed but only its best-scoring document is listed.
+        self.assertEqual(sum(d["slug"] == "gateway/auth" for d in index.docs.values()), 2)
+
+    def test_snippets_and_results(self) -> None:
+        auth = self.local / "gateway/auth.md"
+        self.assertEqual(search_docs.best_snippet(auth, "token scopes"), "Token scopes. Token expiry.")
+        self.assertEqual(search_docs.best_snippet(auth, "rotate"), "Rotate the token. Token scopes.")
+        self.assertEqual(search_docs.best_snippet(auth, "nothing"), "")
+        self.assertEqual(search_docs.best_snippet(auth, "gateway", width=10), "# Gatew...")
+
+        index = search_docs.SearchIndex(self.index_path)
+        index.update(self.roots)
+        titles = LookupIndex.from_entries([{"path": "gateway/auth", "title": "Gateway Authentication"}])
+        cache = PageCache(self.cache_dir)
+        results = search_docs.search_results(index, "token", 5, titles, cache)
+        self.assertEqual(results[0]["title"], "Gateway Authentication")
+        self.assertEqual(results[0]["file"], str(self.cache_dir / "gateway/auth.md"))
+        self.assertEqual(Path(results[0]["file"]).read_text(encoding="utf-8"), "# Gateway Auth\n\nToken token token.\n")
+        self.assertEqual(results[0]["snippet"], "Token token token.")
+        self.assertEqual(results[1]["title"], "Models")
+
+
+class LocalDocsTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = Path(tempfile.mkdtemp(prefix="docclaw-local-"))
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.first, self.second = self.tmp / "roots" / "first", self.tmp / "roots" / "second"
+        for root, files in (
+            (self.first, ["cli.md", "gateway/index.md", "gateway/auth.mdx", ".hidden/x.md", "notes.txt"]),
+            (self.second, ["cli.md", "tools/README.md", "tools/browser.md"]),
+        ):
+            for rel in files:
+                (root / rel).parent.mkdir(parents=True, exist_ok=True)
+                (root / rel).write_text(f"# {rel}\n", encoding="utf-8")
+        self.cache_path = self.tmp / "local-docs.json"
+        self.index_json = self.tmp / "index.json"
+        entries = [{"path": p, "title": p} for p in ("cli", "gateway", "gateway/auth", "tools", "tools/browser")]
+        self.index_json.write_text(json.dumps({"entries": entries}), encoding="utf-8")
+        candidates = [self.first, self.tmp / "roots" / "missing", self.second]
+        patcher = mock.patch.object(find_local_docs, "collect_candidates", return_value=candidates)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_scan_maps_local_files_to_index_paths(self) -> None:
+        result = find_local_docs.scan(self.cache_path, self.index_json)
+        self.assertFalse(result["cached"])
+        self.assertEqual(result["existing"], [str(self.first), str(self.second)])
+        self.assertEqual((result["files"], result["hashed"]), (6, 6))
+        self.assertEqual(
+            result["index_map"],
+            {
+                "cli": str(self.first / "cli.md"),
+                "gateway": str(self.first / "gateway/index.md"),
+                "gateway/auth": str(self.first / "gateway/auth.mdx"),
+                "tools": str(self.second / "tools/README.md"),
+                "tools/browser": str(self.second / "tools/browser.md"),
+            },
+        )
+
+        (self.second / "tools/browser.md").write_text("# changed, longer\n", encoding="utf-8")
+        again = find_local_docs.scan(self.cache_path, self.index_json)
+        self.assertTrue(again["cached"])
+        self.assertEqual((again["hashed"], again["reused"]), (1, 5))
+        browser = again["manifest"][str(self.second)]["tools/browser.md"]
+        self.assertEqual(browser[3], find_local_docs.file_hash(self.second / "tools/browser.md"))
+
+    def test_local_file(self) -> None:
+        self.assertEqual(
+            find_local_docs.local_file("/gateway/auth.md", self.cache_path, self.index_json),
+            str(self.first / "gateway/auth.mdx"),
+        )
+        self.assertEqual(
+            find_local_docs.local_file("tools/README", self.cache_path, self.index_json),
+            str(self.second / "tools/README.md"),
+        )
+        self.assertEqual(find_local_docs.local_file("nope", self.cache_path, self.index_json), "")
+
+    def test_local_file_is_served_from_the_cached_manifest(self) -> None:
+        find_local_docs.scan(self.cache_path, self.index_json)
+        with mock.patch.object(find_local_docs, "scan_roots", side_effect=AssertionError("rescanned")):
+            self.assertEqual(
+                find_local_docs.local_file("tools/browser", self.cache_path, self.index_json),
+                str(self.second / "tools/browser.md"),
+            )
+        (self.first / "gateway/auth.mdx").unlink()
+        (self.first / "gateway/auth.md").write_text("# auth\n", encoding="utf-8")
+        with mock.patch.object(find_local_docs, "scan_roots", wraps=find_local_docs.scan_roots) as scan_roots:
+            self.assertEqual(
+                find_local_docs.local_file("gateway/auth", self.cache_path, self.index_json),
+                str(self.first / "gateway/auth.md"),
+            )
+            find_local_docs.local_file("tools", self.cache_path, self.index_json, refresh=True)
+        self.assertEqual(scan_roots.call_count, 2)
+
+
+class SnapshotTest(StandInCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.refresh()
+        self.slugs = [e["path"] for e in fetch.load_index(self.index_json)[:5]]
+        with self.site():
+            results = docclaw_api.Docs(self.index_json, self.cache_dir, TRUSTED_ROOT, 10.0).fetch_many(self.slugs)
+        self.assertTrue(all(r["ok"] for r in results), results)
+        self.host = self.tmp / "new-host"
+        self.new_json, self.new_md, self.new_cache = (
+            self.host / "index.json",
+            self.host / "index.md",
+            self.host / "cache",
+        )
+
+    def export(self, name: str = "docs.tgz") -> Path:
+        archive = self.tmp / name
+        docs_snapshot.export_snapshot(archive, self.index_json, self.index_md, self.cache_dir)
+        return archive
+
+    def import_(self, archive: Path) -> dict:
+        return docs_snapshot.import_snapshot(archive, self.new_json, self.new_md, self.new_cache)
+
+    def leftovers(self) -> list[str]:
+        found = list(self.new_cache.glob(".import-*")) if self.new_cache.exists() else []
+        gens = refresh.index_generations(self.new_json, self.new_md)
+        if gens.root.exists():
+            found += [p for p in gens.root.iterdir() if p.name.startswith(".staging-")]
+        return [str(p) for p in found]
+
+    def test_fresh_host_is_warm_without_network(self) -> None:
+        report = self.import_(self.export())
+        self.assertEqual(report["pages"], len(self.slugs))
+        self.assertEqual(self.leftovers(), [])
+        dangling = [p.name for p in self.host.iterdir() if p.is_symlink() and not p.exists()]
+        self.assertEqual(dangling, [])
+        cache = PageCache(self.new_cache)
+        exported = PageCache(self.cache_dir).pages
+        self.assertEqual(
+            {s: m["fetched_at"] for s, m in cache.pages.items()}, {s: exported[s]["fetched_at"] for s in cache.pages}
+        )
+        docs = docclaw_api.Docs(self.new_json, self.new_cache, TRUSTED_ROOT, 10.0)
+        # Routed to a server that has no pages: anything but a cache hit fails.
+        with bench.stand_in_server({}, 0.0) as port, bench.routed_to(port):
+            self.assertEqual(docs.fetch(self.slugs[0])["cache"], "hit")
+
+    def test_future_fetch_times_are_clamped(self) -> None:
+        meta = dict(PageCache(self.cache_dir).pages[fetch.slugify(self.slugs[0])], fetched_at=time.time() + 86400)
+        cache = PageCache(self.new_cache)
+        self.assertEqual(cache.merge({"later": meta}), ["later"])
+        self.assertLessEqual(cache.pages["later"]["fetched_at"], time.time())
+
+    def test_pages_must_be_an_object(self) -> None:
+        with self.assertRaisesRegex(ValueError, "page list must be an object"):
+            docs_snapshot.check_pages(["cli"], {})
+
+    def test_tampered_archive_installs_nothing(self) -> None:
+        archive = self.export("docs.tar")
+        data = bytearray(archive.read_bytes())
+        at = data.rindex(b'{"version":1,"pages":')
+        data[at + 2 : at + 3] = b"w"
+        archive.write_bytes(bytes(data))
+        with self.assertRaisesRegex(ValueError, "Hash mismatch for cache/pages.json"):
+            self.import_(archive)
+        self.assertEqual(refresh.index_generations(self.new_json, self.new_md).list(), [])
+        self.assertFalse(self.new_json.exists())
+        self.assertEqual(self.leftovers(), [])
+
+    def test_failed_publish_leaves_no_staging(self) -> None:
+        archive = self.export()
+        with mock.patch.object(index_generations.Generations, "publish", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self.import_(archive)
+        self.assertEqual(self.leftovers(), [])
+        self.assertFalse(self.new_json.exists())
+
+
+class DaemonTest(StandInCase):
+    def test_reloads_after_refresh_publishes_a_generation(self) -> None:
+        import docclaw_daemon
+
+        self.refresh()
+        state = docclaw_daemon.DaemonState(self.index_json, self.cache_dir, TRUSTED_ROOT, 10.0, 1)
+        self.addCleanup(state.pool.shutdown)
+        # Built the way the CLIs build it.
+        request = {
+            "op": "resolve",
+            "index": str(public_path(self.index_json)),
+            "cache_dir": str(self.cache_dir.resolve()),
+        }
+        first = state.dispatch(dict(request, target="Zebra Quokka"))
+        self.assertTrue(first["ok"], first)
+        self.assertEqual(first["result"]["slug"], "zebra-quokka")
+
+        add_page(self.files, "cli/zebra-quokka-page", "Zebra Quokka")
+        generation = self.refresh()["generation"]
+        response = state.dispatch(dict(request, target="Zebra Quokka"))
+        self.assertTrue(response["ok"], response)
+        self.assertEqual(response["result"]["slug"], "cli/zebra-quokka-page")
+
+        ping = state.dispatch({"op": "ping"})["result"]
+        self.assertEqual(ping["entries"], self.ENTRIES + 1)
+        self.assertIn(generation, str(Path(ping["index"]).resolve()))
+
+    def test_pinned_generation_is_not_served_by_the_current_daemon(self) -> None:
+        import docclaw_daemon
+
+        self.refresh()
+        pinned = self.index_json.resolve()
+        state = docclaw_daemon.DaemonState(self.index_json, self.cache_dir, TRUSTED_ROOT, 10.0, 1)
+        self.addCleanup(state.pool.shutdown)
+        response = state.dispatch({"op": "resolve", "target": "cli", "index": str(pinned)})
+        self.assertEqual(response.get("kind"), "mismatch")
+
+    def test_search_rescan_does_not_block_resolves(self) -> None:
+        import docclaw_daemon
+        import search_docs
+
+        self.refresh()
+        state = docclaw_daemon.DaemonState(self.index_json, self.cache_dir, TRUSTED_ROOT, 10.0, 1)
+        self.addCleanup(state.pool.shutdown)
+        state.search_path = self.tmp / "search-index.json"
+        scanning, release = threading.Event(), threading.Event()
+
+        def slow_update(index, roots):
+            scanning.set()
+            release.wait(10)
+            return {}
+
+        with mock.patch.object(search_docs.SearchIndex, "update", slow_update):
+            searcher = threading.Thread(target=state.dispatch, args=({"op": "search", "query": "gateway"},))
+            searcher.start()
+            self.assertTrue(scanning.wait(10))
+            request = {"op": "resolve", "target": fetch.load_index(self.index_json)[0]["path"]}
+            with concurrent.futures.ThreadPoolExecutor(1) as pool:
+                resolved = pool.submit(state.dispatch, request)
+                try:
+                    self.assertTrue(resolved.result(5)["ok"])
+                finally:
+                    release.set()
+                    searcher.join(10)
+
+    def test_socket_round_trip(self) -> None:
+        import docclaw_daemon
+
+        self.refresh()
+        socket_path = self.tmp / "d.sock"
+        state = docclaw_daemon.DaemonState(self.index_json, self.cache_dir, TRUSTED_ROOT, 10.0, 2)
+        self.addCleanup(state.pool.shutdown)
+        server = docclaw_daemon.DocClawServer(socket_path, state)
+        self.addCleanup(server.server_close)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        request = {
+            "op": "fetch",
+            "target": fetch.load_index(self.index_json)[0]["path"],
+            "index": str(public_path(self.index_json)),
+            "cache_dir": str(self.cache_dir.resolve()),
+        }
+        with self.site():
+            first = daemon_call(request, socket_path, timeout=10.0)
+            second = daemon_call(request, socket_path, timeout=10.0)
+        self.assertTrue(first["ok"], first)
+        self.assertEqual(first["result"]["cache"], "miss")
+        self.assertEqual(second["result"]["cache"], "hit")
+        self.assertEqual(second["result"]["bytes"], first["result"]["bytes"])
+
+        other = daemon_call(dict(request, cache_dir=str(self.tmp / "other")), socket_path, timeout=10.0)
+        self.assertEqual(other["kind"], "mismatch")
+        self.assertEqual(daemon_call({"op": "nope"}, socket_path, timeout=10.0)["kind"], "value")
+        self.assertEqual(daemon_call({"op": "ping"}, socket_path, timeout=10.0)["result"]["requests"], 5)
+
+        self.assertTrue(daemon_call({"op": "shutdown"}, socket_path, timeout=10.0)["ok"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Predictive cache warming from the index's section graph.
+
+After a page is read, ``Prefetcher`` warms the pages most likely to be read
+next: siblings in the same index section (same parent path first, then most
+recently modified) and the most recently modified pages overall. Runs are
+budgeted by page count, bytes and worker threads, and execute one at a time
+on a background thread so foreground fetches keep priority.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import threading
+
+DEFAULT_PREFETCH_PAGES = 6
+DEFAULT_PREFETCH_BYTES = 2 * 1024 * 1024
+DEFAULT_PREFETCH_WORKERS = 2
+RECENT_SHARE = 2
+
+
+def plan_prefetch(rows: list[list[str]], path: str, limit: int, skip) -> list[str]:
+    """Pick up to ``limit`` index paths to warm after ``path`` was read.
+
+    ``rows`` are lookup rows (path, title, markdown_url, section, lastmod);
+    ``skip(path, lastmod)`` filters pages that are already cached or queued.
+    """
+    current = next((r for r in rows if r[0] == path), None)
+    if current is None or limit <= 0:
+        return []
+    parent = path.rsplit("/", 1)[0]
+    siblings = [r for r in rows if r[3] == current[3] and r[0] != path]
+    siblings.sort(key=lambda r: r[4], reverse=True)
+    siblings.sort(key=lambda r: r[0].rsplit("/", 1)[0] != parent)
+    recent = sorted((r for r in rows if r[4] and r[0] != path), key=lambda r: r[4], reverse=True)
+
+    picked: list[str] = []
+    seen = {path}
+
+    def take(candidates, quota: int) -> None:
+        for r in candidates:
+            if len(picked) >= quota:
+                return
+            if r[0] in seen:
+                continue
+            seen.add(r[0])
+            if not skip(r[0], r[4]):
+                picked.append(r[0])
+
+    take(siblings, max(0, limit - RECENT_SHARE))
+    take(recent, limit)
+    take(siblings, limit)
+    return picked
+
+
+class Prefetcher:
+    """Background warmer.
+
+    ``fetch_one(lookup, path)`` fetches one page into the cache and returns its
+    size; ``is_fresh(path, lastmod)`` reports whether a page is already cached
+    and fresh; ``on_done()`` runs after each run (e.g. to save the cache).
+    """
+
+    def __init__(
+        self,
+        fetch_one,
+        is_fresh,
+        on_done=None,
+        workers: int = DEFAULT_PREFETCH_WORKERS,
+        max_pages: int = DEFAULT_PREFETCH_PAGES,
+        max_bytes: int = DEFAULT_PREFETCH_BYTES,
+    ) -> None:
+        self.fetch_one = fetch_one
+        self.is_fresh = is_fresh
+        self.on_done = on_done
+        self.workers = max(1, workers)
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._queued: set[str] = set()
+        self._runner = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+        self.counters = {"runs": 0, "pages": 0, "bytes": 0, "failed": 0, "skipped_budget": 0}
+
+    def plan(self, lookup, path: str) -> list[str]:
+        with self._lock:
+            queued = set(self._queued)
+        targets = plan_prefetch(
+            lookup.rows, path, self.max_pages, lambda p, lastmod: p in queued or self.is_fresh(p, lastmod)
+        )
+        with self._lock:
+            self._queued.update(targets)
+        return targets
+
+    def run(self, lookup, targets: list[str]) -> dict:
+        """Warm ``targets`` now within the byte budget; blocks until done."""
+        spent = 0
+        result = {"pages": 0, "bytes": 0, "failed": 0, "skipped_budget": 0}
+
+        def one(path: str) -> None:
+            nonlocal spent
+            try:
+                with self._lock:
+                    if spent >= self.max_bytes:
+                        result["skipped_budget"] += 1
+                        return
+                try:
+                    size = self.fetch_one(lookup, path)
+                except (ValueError, RuntimeError):
+                    with self._lock:
+                        result["failed"] += 1
+                    return
+                with self._lock:
+                    spent += size
+                    result["pages"] += 1
+                    result["bytes"] += size
+            finally:
+                with self._lock:
+                    self._queued.discard(path)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as pool:
+            list(pool.map(one, targets))
+        with self._lock:
+            self.counters["runs"] += 1
+            for key, value in result.items():
+                self.counters[key] += value
+        if self.on_done is not None:
+            self.on_done()
+        return result
+
+    def schedule(self, lookup, path: str) -> list[str]:
+        """Plan a run for ``path`` and queue it in the background; return the targets."""
+        targets = self.plan(lookup, path)
+        if targets:
+            self._runner.submit(self.run, lookup, targets)
+        return targets
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counters, queued=len(self._queued))
+
+    def shutdown(self) -> None:
+        self._runner.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""Persistent memo of query resolutions, suggestions and 404s.
+
+Exact index paths resolve from the compact index in microseconds, but title
+queries, slug guesses and suggestions need the full lookup structures, and a
+guessed slug that does not exist costs a network round trip before the 404
+and its suggestions come back. ``QueryMemo`` remembers those answers in
+``<cache-dir>/.queries.json``: resolutions and suggestions keyed by the
+normalized query, 404s keyed by slug for ``miss_ttl`` seconds.
+
+The memo records the index generation it was built against (the resolved
+index path plus its mtime and size). When the index changes, every entry is
+dropped on the next read, so answers never outlive the index they came from.
+Both maps are kept in least-recently-used order and trimmed to
+``max_entries``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from doc_cache import write_json_atomic
+
+MEMO_NAME = ".queries.json"
+MEMO_VERSION = 2
+DEFAULT_MAX_QUERIES = 512
+DEFAULT_MISS_TTL = 6 * 3600.0
+
+
+def normalize_query(query: str) -> str:
+    # Only the ends: inner whitespace changes title substring matches and
+    # suggestion trigrams, so collapsing it could serve another query's answer.
+    return query.strip()
+
+
+def index_generation(index_path: Path) -> list:
+    real = os.path.realpath(index_path)
+    try:
+        st = os.stat(real)
+    except OSError:
+        return [real, None, None]
+    return [real, st.st_mtime_ns, st.st_size]
+
+
+class QueryMemo:
+    """Thread-safe LRU memo; loaded on first use, call ``save()`` after a batch."""
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        index_path: Path,
+        max_entries: int = DEFAULT_MAX_QUERIES,
+        miss_ttl: float = DEFAULT_MISS_TTL,
+    ) -> None:
+        self.path = cache_dir / MEMO_NAME
+        self.index_path = index_path
+        self.max_entries = max(1, max_entries)
+        self.miss_ttl = miss_ttl
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._dirty = False
+        self.generation: list = []
+        self.entries: dict[str, dict] = {}
+        self.misses: dict[str, list] = {}  # slug -> [recorded_at, error]
+        self.counters = {"hits": 0, "misses": 0, "invalidated": 0}
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        self.generation = index_generation(self.index_path)
+        try:
+            payload = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if not isinstance(payload, dict) or payload.get("version") != MEMO_VERSION:
+            return
+        counters = payload.get("counters")
+        if isinstance(counters, dict):
+            for key in self.counters:
+                self.counters[key] = int(counters.get(key, 0))
+        entries = payload.get("entries")
+        misses = payload.get("misses")
+        entries = entries if isinstance(entries, dict) else {}
+        misses = misses if isinstance(misses, dict) else {}
+        if payload.get("generation") != self.generation:
+            self.counters["invalidated"] += len(entries) + len(misses)
+            self._dirty = True
+            return
+        self.entries = {k: v for k, v in entries.items() if isinstance(v, dict)}
+        self.misses = {k: v for k, v in misses.items() if isinstance(v, list) and len(v) == 2}
+
+    def sync(self) -> None:
+        """Drop every entry if the index changed since the memo was loaded."""
+        with self._lock:
+            if not self._loaded:
+                return
+            generation = index_generation(self.index_path)
+            if generation != self.generation:
+                self.counters["invalidated"] += len(self.entries) + len(self.misses)
+                self.generation = generation
+                self.entries = {}
+                self.misses = {}
+                self._dirty = True
+
+    def _get(self, query: str, field: str):
+        with self._lock:
+            self._load()
+            key = normalize_query(query)
+            entry = self.entries.get(key)
+            value = entry.get(field) if entry is not None else None
+            if value is None:
+                self.counters["misses"] += 1
+                return None
+            self.counters["hits"] += 1
+            self.entries[key] = self.entries.pop(key)
+            self._dirty = True
+            return value
+
+    def _put(self, query: str, **fields) -> None:
+        with self._lock:
+            self._load()
+            key = normalize_query(query)
+            entry = self.entries.pop(key, {})
+            entry.update(fields)
+            self.entries[key] = entry
+            while len(self.entries) > self.max_entries:
+                del self.entries[next(iter(self.entries))]
+            self._dirty = True
+
+    def resolution(self, query: str) -> tuple[str, str, str] | None:
+        """(url, slug, index path or "") remembered for ``query``."""
+        found = self._get(query, "resolved")
+        return (found[0], found[1], found[2]) if found else None
+
+    def remember(self, query: str, url: str, slug: str, path: str = "") -> None:
+        self._put(query, resolved=[url, slug, path])
+
+    def missing(self, slug: str) -> str | None:
+        """Error message of a 404 for ``slug`` seen within ``miss_ttl``."""
+        with self._lock:
+            self._load()
+            found = self.misses.pop(slug, None)
+            if found is None or time.time() - float(found[0]) >= self.miss_ttl:
+                self.counters["misses"] += 1
+                self._dirty = self._dirty or found is not None
+                return None
+            self.counters["hits"] += 1
+            self.misses[slug] = found
+            self._dirty = True
+            return str(found[1])
+
+    def remember_missing(self, slug: str, error: str) -> None:
+        with self._lock:
+            self._load()
+            self.misses.pop(slug, None)
+            self.misses[slug] = [time.time(), error]
+            while len(self.misses) > self.max_entries:
+                del self.misses[next(iter(self.misses))]
+            self._dirty = True
+
+    def suggestions(self, query: str, limit: int) -> list[str] | None:
+        found = self._get(query, "suggest")
+        return found.get(str(limit)) if isinstance(found, dict) else None
+
+    def remember_suggestions(self, query: str, limit: int, suggestions: list[str]) -> None:
+        with self._lock:
+            self._load()
+            found = self.entries.get(normalize_query(query), {}).get("suggest")
+        self._put(query, suggest={**(found if isinstance(found, dict) else {}), str(limit): suggestions})
+
+    def forget(self, query: str) -> None:
+        with self._lock:
+            self._load()
+            if self.entries.pop(normalize_query(query), None) is not None:
+                self._dirty = True
+
+    def forget_missing(self, slug: str) -> None:
+        with self._lock:
+            self._load()
+            if self.misses.pop(slug, None) is not None:
+                self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            write_json_atomic(
+                self.path,
+                {
+                    "version": MEMO_VERSION,
+                    "generation": self.generation,
+                    "counters": self.counters,
+                    "entries": self.entries,
+                    "misses": self.misses,
+                },
+            )
+            self._dirty = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._load()
+            return {"entries": len(self.entries), "not_found": len(self.misses), **self.counters}
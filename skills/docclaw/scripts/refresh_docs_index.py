@@ -9,35 +9,71 @@ Sources:
 from __future__ import annotations
 
 import argparse
+import concurrent.futures
+import contextlib
 import datetime as dt
 import json
+import os
 import re
+import shutil
+import threading
+import time
 import urllib.error
 import urllib.parse
-import urllib.request
-import xml.etree.ElementTree as ET
+import zlib
 from pathlib import Path
 
+import docs_http
+import instrument
+from compact_index import CompactIndex, compact_path, write_compact
+from index_delta import changes_path, diff_entries, is_empty, write_changes
+from index_generations import DEFAULT_KEEP, Generations
+from lookup_index import LookupIndex, lookup_path
+
 DEFAULT_DOCS_ROOT = "https://docs.openclaw.ai"
-TRUSTED_DOCS_HOST = "docs.openclaw.ai"
+TRUSTED_DOCS_HOST = docs_http.TRUSTED_DOCS_HOST
 SKILL_DIR = Path(__file__).resolve().parents[1]
 DEFAULT_OUT_JSON = SKILL_DIR / "references" / "openclaw-docs-index.json"
 DEFAULT_OUT_MD = SKILL_DIR / "references" / "openclaw-docs-index.md"
-UA = "docclaw/1.0.3"
+DEFAULT_CACHE_DIR = SKILL_DIR / "references" / "cache"
+CACHE_POLICIES = ("mark", "evict", "refetch", "off")
+REFETCH_PAGES = 50
+REFETCH_BYTES = 8 * 1024 * 1024
+REFETCH_WORKERS = 4
+SITEMAP_FANOUT_WORKERS = 8
+SITEMAP_MAX_DEPTH = 2
 
 BULLET_RE = re.compile(
     r"^\s*-\s+\[(?P<title>[^\]]+)\]\((?P<url>https://docs\.openclaw\.ai/[^)]+)\)(?::\s*(?P<desc>.*))?$"
 )
+# Every line BULLET_RE matches contains this.
+BULLET_MARKER = "](https://docs.openclaw.ai/"
 
 
 def http_get(url: str, timeout: float) -> str:
-    req = urllib.request.Request(url, headers={"User-Agent": UA})
+    text, _ = http_get_conditional(url, timeout)
+    return text or ""
+
+
+def http_stream_conditional(url: str, timeout: float, validators: dict[str, str] | None, consume):
+    """Stream ``url`` through the shared pooled client into ``consume``.
+
+    Returns (consume(...) result, validators); the result is None on HTTP 304.
+    """
     try:
-        with urllib.request.urlopen(req, timeout=timeout) as resp:
-            data = resp.read()
-    except urllib.error.URLError as exc:
+        return docs_http.stream(url, timeout, validators or {}, consume)
+    except (urllib.error.URLError, ValueError) as exc:
         raise RuntimeError(f"Network error while fetching {url}: {exc}") from exc
-    return data.decode("utf-8", errors="replace")
+
+
+def http_get_conditional(
+    url: str, timeout: float, validators: dict[str, str] | None = None
+) -> tuple[str | None, dict[str, str]]:
+    """Return (text, validators); text is None when the server answers 304."""
+    data, fresh = http_stream_conditional(url, timeout, validators, b"".join)
+    if data is None:
+        return None, fresh
+    return data.decode("utf-8", errors="replace"), fresh
 
 
 def normalize_docs_root(value: str) -> str:
@@ -73,83 +109,289 @@ def title_from_path(path: str) -> str:
     return leaf.replace("-", " ").replace("_", " ").title()
 
 
-def parse_llms(llms_text: str, docs_root: str) -> list[dict[str, str]]:
-    entries: list[dict[str, str]] = []
-    for raw in llms_text.splitlines():
-        m = BULLET_RE.match(raw.strip())
+def iter_lines(chunks):
+    """Yield decoded text lines from a stream of byte chunks, one chunk in memory at a time."""
+    import codecs
+
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    tail = ""
+    for chunk in chunks:
+        # Same boundaries as str.splitlines(); an unterminated last piece
+        # waits for the next chunk.
+        lines = (tail + decoder.decode(chunk)).splitlines(True)
+        tail = lines.pop() if lines and lines[-1].splitlines() == [lines[-1]] else ""
+        yield from lines
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def split_docs_url(url: str, docs_root: str) -> tuple[str, str, str, str]:
+    """``normalize_url`` for a URL already known to start with ``<docs-root>/``, without urlparse.
+
+    URLs carrying a query, fragment, ``;params`` or control characters take
+    the general path so the results stay identical.
+    """
+    html_url = url[:-3] if url.endswith(".md") else url
+    rest = html_url[len(docs_root) + 1 :]
+    if not html_url.startswith(docs_root) or any(c in rest for c in "?#;\t\r"):
+        return normalize_url(url, docs_root)
+    path = rest.lstrip("/") or "index"
+    return f"{html_url}.md", html_url, path, path.split("/", 1)[0]
+
+
+def iter_llms_entries(lines, docs_root: str):
+    """Yield an entry per ``- [Title](https://docs.openclaw.ai/...)`` bullet in ``lines``."""
+    match = BULLET_RE.match
+    for raw in lines:
+        # Most lines are headings, prose or blank; skip them before the regex.
+        if BULLET_MARKER not in raw:
+            continue
+        m = match(raw.strip())
         if not m:
             continue
-        title = m.group("title").strip()
-        url = m.group("url").strip()
-        desc = (m.group("desc") or "").strip()
-        markdown_url, html_url, path, section = normalize_url(url, docs_root)
-        entries.append(
-            {
-                "title": title,
-                "description": desc,
-                "markdown_url": markdown_url,
-                "html_url": html_url,
-                "path": path,
-                "section": section,
-                "source": "llms",
-            }
-        )
-    return entries
+        markdown_url, html_url, path, section = split_docs_url(m.group("url").strip(), docs_root)
+        yield {
+            "title": m.group("title").strip(),
+            "description": (m.group("desc") or "").strip(),
+            "markdown_url": markdown_url,
+            "html_url": html_url,
+            "path": path,
+            "section": section,
+            "source": "llms",
+        }
 
 
-def parse_sitemap(xml_text: str) -> dict[str, str]:
-    ns = {"sm": "http://www.sitemaps.org/schemas/sitemap/0.9"}
+def parse_llms(llms_text: str, docs_root: str) -> list[dict[str, str]]:
+    return list(iter_llms_entries(llms_text.splitlines(), docs_root))
+
+
+def parse_llms_stream(chunks, docs_root: str) -> tuple[list[dict[str, str]], int]:
+    """Parse llms.txt straight off the response body.
+
+    Returns the entries deduplicated by ``path`` (first bullet wins, as in
+    ``merge_entries``) and the number of bullets read.
+    """
+    dedup: dict[str, dict[str, str]] = {}
+    bullets = 0
+    for entry in iter_llms_entries(iter_lines(chunks), docs_root):
+        bullets += 1
+        dedup.setdefault(entry["path"], entry)
+    return list(dedup.values()), bullets
+
+
+def gunzip_if_needed(chunks):
+    """Transparently inflate a gzip stream (e.g. ``sitemap.xml.gz``) chunk by chunk."""
+    inflater = None
+    for i, chunk in enumerate(chunks):
+        if i == 0 and chunk[:2] == b"\x1f\x8b":
+            inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        yield inflater.decompress(chunk) if inflater else chunk
+    if inflater is not None:
+        yield inflater.flush()
+
+
+def local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_sitemap_stream(chunks) -> tuple[dict[str, str], list[str]]:
+    """Incrementally parse a sitemap or sitemap index.
+
+    Returns (loc -> lastmod for ``<url>`` entries, child sitemap locs from a
+    ``<sitemapindex>``). Processed elements are cleared as the parser goes so
+    peak memory stays flat regardless of sitemap size.
+    """
+    import xml.etree.ElementTree as ET
+
+    parser = ET.XMLPullParser(events=("start", "end"))
+    urls: dict[str, str] = {}
+    children: list[str] = []
+    root = None
+
+    def drain() -> None:
+        nonlocal root
+        for event, el in parser.read_events():
+            if event == "start":
+                if root is None:
+                    root = el
+                continue
+            name = local_name(el.tag)
+            if name not in ("url", "sitemap"):
+                continue
+            loc = mod = ""
+            for child in el:
+                child_name = local_name(child.tag)
+                if child_name == "loc":
+                    loc = (child.text or "").strip()
+                elif child_name == "lastmod":
+                    mod = (child.text or "").strip()
+            if loc:
+                if name == "url":
+                    urls[loc] = mod
+                else:
+                    children.append(loc)
+            if root is not None:
+                root.clear()
+
+    # Parse time excludes waiting on the network between chunks.
+    parse_seconds = 0.0
     try:
-        root = ET.fromstring(xml_text)
-    except ET.ParseError as exc:
+        for data in gunzip_if_needed(chunks):
+            started = time.perf_counter()
+            parser.feed(data)
+            drain()
+            parse_seconds += time.perf_counter() - started
+        parser.close()
+        drain()
+    except (ET.ParseError, zlib.error) as exc:
         raise RuntimeError(f"Invalid sitemap XML: {exc}") from exc
+    instrument.record("refresh.parse_sitemap", parse_seconds, urls=len(urls))
+    return urls, children
 
-    out: dict[str, str] = {}
-    for url_el in root.findall("sm:url", ns):
-        loc_el = url_el.find("sm:loc", ns)
-        mod_el = url_el.find("sm:lastmod", ns)
-        if loc_el is None or not loc_el.text:
-            continue
-        out[loc_el.text.strip()] = (mod_el.text or "").strip() if mod_el is not None else ""
-    return out
 
+def parse_sitemap(xml_text: str) -> dict[str, str]:
+    urls, _ = parse_sitemap_stream([xml_text.encode("utf-8")])
+    return urls
 
-def write_index_md(path: Path, payload: dict) -> None:
-    lines: list[str] = []
-    lines.append("# OpenClaw Docs Index")
-    lines.append("")
-    lines.append(f"Generated: {payload['generated_at']}")
-    lines.append(f"Entries: {len(payload['entries'])}")
-    lines.append("")
-    lines.append("Sources:")
-    lines.append(f"- {payload['sources']['llms']}")
-    lines.append(f"- {payload['sources']['sitemap']}")
-    lines.append("")
-    lines.append("## Entries")
-    lines.append("")
-
-    for entry in payload["entries"]:
-        lastmod = entry.get("lastmod") or "n/a"
-        desc = entry.get("description") or ""
-        source = entry.get("source") or "unknown"
-        suffix = f" - {desc}" if desc else ""
-        lines.append(
-            f"- `{entry['path']}` - [{entry['title']}]({entry['html_url']}) (source: {source}, lastmod: {lastmod}){suffix}"
+
+def is_trusted_url(url: str) -> bool:
+    parsed = urllib.parse.urlparse(url.strip())
+    return parsed.scheme == "https" and parsed.netloc == TRUSTED_DOCS_HOST
+
+
+def revalidate_children(children: dict[str, dict[str, str]], timeout: float) -> dict[str, tuple]:
+    """Conditionally refetch previously seen sitemap-index children: URL -> (parsed or None, validators)."""
+    todo = [c for c in children if is_trusted_url(c)]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=SITEMAP_FANOUT_WORKERS) as pool:
+        results = pool.map(
+            lambda child: http_stream_conditional(child, timeout, children[child], parse_sitemap_stream), todo
         )
+        return dict(zip(todo, results))
+
+
+def fetch_sitemap(
+    url: str, timeout: float, validators: dict | None = None
+) -> tuple[dict[str, str] | None, dict]:
+    """Fetch and stream-parse ``url``, following sitemap-index children concurrently.
+
+    The validators of the children read are kept under ``"children"`` (child
+    URL -> validators). When the root answers 304 those children are
+    revalidated too, and (None, validators) is returned only when none of
+    them changed; otherwise the root is read again and the children that just
+    answered 200 are reused. Children outside the trusted docs host are ignored.
+    """
+    parsed, fresh = http_stream_conditional(url, timeout, validators, parse_sitemap_stream)
+    reuse: dict[str, tuple] = {}
+    if parsed is None:
+        with instrument.span("refresh.sitemap_revalidate_children"):
+            revalidated = revalidate_children(dict(fresh.get("children") or {}), timeout)
+        reuse = {child: result for child, result in revalidated.items() if result[0] is not None}
+        if not reuse:
+            return None, fresh
+        parsed, fresh = http_stream_conditional(url, timeout, None, parse_sitemap_stream)
+    urls, children = parsed
+    child_validators: dict[str, dict[str, str]] = {}
+    seen = {url}
+    depth = 0
+    while children and depth < SITEMAP_MAX_DEPTH:
+        todo = [c for c in dict.fromkeys(children) if c not in seen and is_trusted_url(c)]
+        seen.update(todo)
+        children = []
+        depth += 1
+        with concurrent.futures.ThreadPoolExecutor(max_workers=SITEMAP_FANOUT_WORKERS) as pool:
+            results = pool.map(
+                lambda child: reuse.get(child) or http_stream_conditional(child, timeout, None, parse_sitemap_stream),
+                todo,
+            )
+            for child, (result, child_fresh) in zip(todo, results):
+                child_urls, grandchildren = result
+                instrument.count("refresh.sitemap_children")
+                child_validators[child] = child_fresh
+                urls.update(child_urls)
+                children.extend(grandchildren)
+    if child_validators:
+        fresh = dict(fresh, children=child_validators)
+    return urls, fresh
+
+
+@contextlib.contextmanager
+def open_atomic(path: Path):
+    """Text handle on a temp file next to ``path``, renamed into place when the block succeeds.
+
+    The temp name is unique per thread; on failure the temp file is removed.
+    """
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with tmp.open("w", encoding="utf-8") as fh:
+            yield fh
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
 
-    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
 
+def write_index_md(path: Path, payload: dict) -> None:
+    with open_atomic(path) as fh:
+        fh.write("# OpenClaw Docs Index\n\n")
+        fh.write(f"Generated: {payload['generated_at']}\n")
+        fh.write(f"Entries: {len(payload['entries'])}\n\n")
+        fh.write("Sources:\n")
+        fh.write(f"- {payload['sources']['llms']}\n")
+        fh.write(f"- {payload['sources']['sitemap']}\n\n")
+        fh.write("## Entries\n\n")
+        for entry in payload["entries"]:
+            lastmod = entry.get("lastmod") or "n/a"
+            desc = entry.get("description") or ""
+            source = entry.get("source") or "unknown"
+            suffix = f" - {desc}" if desc else ""
+            fh.write(
+                f"- `{entry['path']}` - [{entry['title']}]({entry['html_url']}) "
+                f"(source: {source}, lastmod: {lastmod}){suffix}\n"
+            )
+
+
+def write_index_json(path: Path, payload: dict) -> None:
+    with open_atomic(path) as fh:
+        json.dump(payload, fh, indent=2, ensure_ascii=False)
+        fh.write("\n")
+
+
+def index_generations(out_json: Path, out_md: Path, keep: int = DEFAULT_KEEP) -> Generations:
+    links = {path: path.name for path in (out_json, lookup_path(out_json), compact_path(out_json))}
+    links[changes_path(out_json)] = changes_path(out_json).name
+    links[out_md] = out_md.name
+    return Generations(out_json, links, keep)
+
+
+def validators_path(json_path: Path) -> Path:
+    """Sidecar with the latest HTTP validators for the index JSON at ``json_path``.
+
+    It sits next to the generation's JSON, so it follows rollbacks and pruning
+    and a new generation starts without one.
+    """
+    return json_path.with_name(f"{json_path.stem}.validators.json")
+
+
+def write_validators(json_path: Path, validators: dict) -> Path:
+    out = validators_path(json_path)
+    with open_atomic(out) as fh:
+        json.dump({"validators": validators}, fh, indent=2)
+        fh.write("\n")
+    return out
 
-def build_index(docs_root: str, timeout: float) -> dict:
-    llms_url = f"{docs_root}/llms.txt"
-    sitemap_url = f"{docs_root}/sitemap.xml"
 
-    llms_text = http_get(llms_url, timeout)
-    sitemap_text = http_get(sitemap_url, timeout)
+def same_index(payload: dict, previous: dict | None) -> bool:
+    """True when writing ``payload`` would only restate ``previous`` (stats and validators aside)."""
+    if previous is None:
+        return False
+    keys = ("docs_root", "sources", "entries")
+    return all(payload.get(k) == previous.get(k) for k in keys)
 
-    llms_entries = parse_llms(llms_text, docs_root)
-    sitemap_map = parse_sitemap(sitemap_text)
 
+def merge_entries(
+    llms_entries: list[dict[str, str]], sitemap_map: dict[str, str], docs_root: str
+) -> list[dict]:
     dedup: dict[str, dict] = {}
 
     for item in llms_entries:
@@ -178,46 +420,356 @@ def build_index(docs_root: str, timeout: float) -> dict:
             "lastmod": lastmod,
         }
 
-    entries = sorted(dedup.values(), key=lambda x: x["path"])
+    return sorted(dedup.values(), key=lambda x: x["path"])
+
 
+def previous_llms_entries(previous: dict) -> list[dict[str, str]]:
+    out: list[dict[str, str]] = []
+    for entry in previous.get("entries", []):
+        if entry.get("source") != "llms":
+            continue
+        item = {k: v for k, v in entry.items() if k != "lastmod"}
+        out.append(item)
+    return out
+
+
+def previous_sitemap_map(previous: dict) -> dict[str, str]:
+    out: dict[str, str] = {}
+    for entry in previous.get("entries", []):
+        if entry.get("source") == "sitemap" or entry.get("lastmod"):
+            out[entry["html_url"]] = entry.get("lastmod", "")
+    return out
+
+
+def build_index(docs_root: str, timeout: float, previous: dict | None = None) -> dict:
+    """Build the index payload.
+
+    With ``previous`` set, both sources are fetched conditionally using the
+    stored validators and unchanged sources are reconstructed from the
+    previous payload; a payload where both sources answered 304 carries
+    ``stats["not_modified"] = True``. The delta is left to ``refresh``.
+    """
+    llms_url = f"{docs_root}/llms.txt"
+    sitemap_url = f"{docs_root}/sitemap.xml"
+
+    usable = previous is not None and previous.get("docs_root") == docs_root
+    old_validators = (previous or {}).get("validators", {}) if usable else {}
+
+    def consume_llms(chunks) -> tuple[list[dict[str, str]], int]:
+        with instrument.span("refresh.parse_llms"):
+            return parse_llms_stream(chunks, docs_root)
+
+    # Both sources download concurrently, so wall time is the slower of the
+    # two; each is parsed as it arrives rather than after the download.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as pool:
+        llms_job = pool.submit(http_stream_conditional, llms_url, timeout, old_validators.get("llms"), consume_llms)
+        sitemap_job = pool.submit(fetch_sitemap, sitemap_url, timeout, old_validators.get("sitemap"))
+        parsed_llms, llms_validators = llms_job.result()
+        fetched_sitemap, sitemap_validators = sitemap_job.result()
+    validators = {"llms": llms_validators, "sitemap": sitemap_validators}
+
+    if usable and parsed_llms is None and fetched_sitemap is None:
+        payload = dict(previous)
+        payload["stats"] = dict(previous.get("stats", {}), not_modified=True)
+        return payload
+
+    if parsed_llms is not None:
+        llms_entries, llms_bullets = parsed_llms
+    else:
+        llms_entries = previous_llms_entries(previous)
+        llms_bullets = len(llms_entries)
+    if fetched_sitemap is not None:
+        sitemap_map = fetched_sitemap
+    else:
+        sitemap_map = previous_sitemap_map(previous)
+
+    with instrument.span("refresh.merge"):
+        entries = merge_entries(llms_entries, sitemap_map, docs_root)
+    instrument.count("refresh.llms_entries", llms_bullets)
+    instrument.count("refresh.sitemap_entries", len(sitemap_map))
+    instrument.count("refresh.indexed_entries", len(entries))
+    stats = {
+        "llms_entries": llms_bullets,
+        "sitemap_entries": len(sitemap_map),
+        "indexed_entries": len(entries),
+    }
     return {
         "generated_at": dt.datetime.now(dt.timezone.utc).isoformat(),
         "docs_root": docs_root,
         "sources": {"llms": llms_url, "sitemap": sitemap_url},
-        "stats": {
-            "llms_entries": len(llms_entries),
-            "sitemap_entries": len(sitemap_map),
-            "indexed_entries": len(entries),
-        },
+        "validators": validators,
+        "stats": stats,
         "entries": entries,
     }
 
 
+def sync_cache(
+    cache, changes: dict, policy: str, index_path: Path, docs_root: str, timeout: float, **budget
+) -> dict | None:
+    """Invalidate cached pages that this refresh changed or removed.
+
+    ``cache`` is a ``PageCache`` or a cache directory. ``mark`` flags changed
+    pages so their next read revalidates, ``evict`` deletes them, and
+    ``refetch`` marks them and then re-fetches the most read stale pages in
+    parallel within ``budget`` (``max_pages``, ``max_bytes``, ``workers``);
+    pages past the budget stay marked. Returns None when there is no cache to
+    update.
+    """
+    if policy == "off":
+        return None
+    import fetch_doc_markdown as fetch
+
+    if not isinstance(cache, fetch.PageCache):
+        from doc_cache import MANIFEST_NAME
+
+        if not (Path(cache) / MANIFEST_NAME).exists():
+            return None
+        cache = fetch.PageCache(Path(cache))
+    result = dict(fetch.apply_index_changes(cache, changes, evict=policy == "evict"), refetched=0, failed=0)
+    targets = cache.stale()[: budget.get("max_pages", REFETCH_PAGES)] if policy == "refetch" else []
+    if targets:
+        prefetcher = fetch.make_prefetcher(docs_root, timeout, cache, **budget)
+        try:
+            run = prefetcher.run(fetch.load_lookup(index_path), targets)
+        finally:
+            prefetcher.shutdown()
+        result["refetched"], result["failed"] = run["pages"], run["failed"]
+    cache.save()
+    return result
+
+
+def load_previous(path: Path) -> dict | None:
+    """The current index payload, with validators from its sidecar when a later run stored some."""
+    if not path.exists():
+        return None
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(payload, dict) or not isinstance(payload.get("entries"), list):
+        return None
+    try:
+        stored = json.loads(validators_path(Path(os.path.realpath(path))).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        stored = None
+    if isinstance(stored, dict) and isinstance(stored.get("validators"), dict):
+        payload["validators"] = stored["validators"]
+    return payload
+
+
+def refresh(
+    out_json: Path,
+    out_md: Path,
+    docs_root: str,
+    timeout: float,
+    incremental: bool = False,
+    cache=DEFAULT_CACHE_DIR,
+    cache_policy: str = "mark",
+    keep_generations: int = DEFAULT_KEEP,
+    **budget,
+) -> dict:
+    """Rebuild the index files and apply the delta to the page cache.
+
+    A changed index is published as a new generation (see
+    ``index_generations.py``). Returns ``index``, ``generation`` (current
+    id), ``pruned`` generations, ``written`` (kind -> public path),
+    ``not_modified`` (both sources answered 304), ``unchanged`` (the JSON was
+    left as is), ``delta`` counts (None without a previous index), ``cache``
+    (see ``sync_cache``) and ``entries``. Raises RuntimeError on fetch
+    failures.
+    """
+    # The previous index is always read so the delta can be reported; it
+    # only drives conditional requests with ``incremental``.
+    with instrument.span("refresh.load_previous"):
+        previous = load_previous(out_json)
+    with instrument.span("refresh.build_index"):
+        payload = build_index(docs_root, timeout, previous if incremental else None)
+
+    with instrument.span("refresh.diff"):
+        changes = diff_entries((previous or {}).get("entries", []), payload["entries"])
+    if previous is not None and is_empty(changes):
+        payload["generated_at"] = previous.get("generated_at", payload["generated_at"])
+    if previous is not None:
+        payload["stats"]["delta"] = {
+            "added": len(changes["added"]),
+            "updated": len(changes["changed"]),
+            "removed": len(changes["removed"]),
+            "unchanged": changes["unchanged"],
+        }
+
+    out_json.parent.mkdir(parents=True, exist_ok=True)
+    out_md.parent.mkdir(parents=True, exist_ok=True)
+    gens = index_generations(out_json, out_md, keep_generations)
+    written: dict[str, Path] = {}
+
+    # A changed index goes into a fresh generation that becomes current in
+    # one rename. Otherwise missing derived files are added to the current
+    # generation (or, for an index from before generations, next to it).
+    rewrite_json = not same_index(payload, previous)
+    gen_dir = gens.stage() if rewrite_json else gens.current_dir()
+    json_path = gen_dir / out_json.name if gen_dir else out_json
+    md_path = gen_dir / out_md.name if gen_dir else out_md
+    try:
+        # Derived files key on the JSON's mtime/size, so they are rewritten
+        # whenever the JSON is, and otherwise only when missing or stale.
+        if rewrite_json:
+            with instrument.span("refresh.write_json"):
+                write_index_json(json_path, payload)
+            written["json"] = out_json
+        if rewrite_json or LookupIndex.load(json_path) is None:
+            with instrument.span("refresh.write_lookup"):
+                LookupIndex.from_entries(payload["entries"]).write(json_path)
+            written["lookup"] = lookup_path(out_json)
+        compact = None if rewrite_json else CompactIndex.open(json_path)
+        if compact is None:
+            with instrument.span("refresh.write_compact"):
+                write_compact(json_path, payload)
+            written["compact"] = compact_path(out_json)
+        else:
+            compact.close()
+        if not md_path.exists():
+            with instrument.span("refresh.write_index_md"):
+                write_index_md(md_path, payload)
+            written["markdown"] = out_md
+        if not is_empty(changes):
+            with instrument.span("refresh.write_changes"):
+                write_changes(json_path, changes, previous, payload)
+            written["changes"] = changes_path(out_json)
+        # Validators alone moving does not republish the index; the next run
+        # reads them from the sidecar (see ``load_previous``).
+        if not rewrite_json and payload.get("validators") != previous.get("validators"):
+            write_validators(json_path, payload.get("validators", {}))
+    except BaseException:
+        if rewrite_json:
+            shutil.rmtree(gen_dir, ignore_errors=True)
+        raise
+
+    pruned: list[str] = []
+    if rewrite_json:
+        with instrument.span("refresh.publish"):
+            gens.publish(gen_dir)
+            pruned = gens.prune()
+    elif written and gen_dir is not None:
+        gens.switch(gens.current())
+    gens.mark_checked()
+    synced = None
+    if not is_empty(changes):
+        with instrument.span("refresh.sync_cache"):
+            synced = sync_cache(cache, changes, cache_policy, out_json, docs_root, timeout, **budget)
+    return {
+        "index": out_json,
+        "generation": gens.current(),
+        "pruned": pruned,
+        "written": written,
+        "not_modified": bool(payload["stats"].get("not_modified")),
+        "unchanged": not rewrite_json,
+        "delta": payload["stats"].get("delta"),
+        "cache": synced,
+        "entries": payload["stats"]["indexed_entries"],
+    }
+
+
+def manage_generations(args: argparse.Namespace) -> int:
+    gens = index_generations(Path(args.out_json), Path(args.out_md), args.keep_generations)
+    try:
+        if args.rollback:
+            print(f"Current generation: {gens.rollback()}")
+        elif args.use_generation:
+            gens.switch(args.use_generation)
+            print(f"Current generation: {args.use_generation}")
+    except ValueError as exc:
+        raise SystemExit(str(exc)) from exc
+    if args.list_generations:
+        current = gens.current()
+        listed = gens.list()
+        if not listed:
+            print(f"No index generations under {gens.root}")
+        for gen in listed:
+            print(f"{'*' if gen == current else ' '} {gen}")
+    return 0
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Refresh local OpenClaw docs index")
     parser.add_argument("--docs-root", default=DEFAULT_DOCS_ROOT, help="Docs root URL")
     parser.add_argument("--out-json", default=str(DEFAULT_OUT_JSON), help="Output JSON path")
     parser.add_argument("--out-md", default=str(DEFAULT_OUT_MD), help="Output Markdown path")
     parser.add_argument("--timeout", type=float, default=20.0, help="HTTP timeout in seconds")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Revalidate sources with ETag/Last-Modified and merge only changed entries",
+    )
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR), help="Page cache to invalidate")
+    parser.add_argument(
+        "--cache-policy",
+        choices=CACHE_POLICIES,
+        default="mark",
+        help="What to do with cached pages the refresh changed: mark stale, evict, refetch, or off",
+    )
+    parser.add_argument("--refetch-pages", type=int, default=REFETCH_PAGES, help="Max pages re-fetched by refetch")
+    parser.add_argument("--refetch-bytes", type=int, default=REFETCH_BYTES, help="Max bytes re-fetched by refetch")
+    parser.add_argument("--refetch-workers", type=int, default=REFETCH_WORKERS, help="Parallel re-fetch workers")
+    parser.add_argument(
+        "--keep-generations", type=int, default=DEFAULT_KEEP, help="Index generations to keep on disk"
+    )
+    parser.add_argument("--list-generations", action="store_true", help="List index generations and exit")
+    parser.add_argument("--rollback", action="store_true", help="Make the previous index generation current and exit")
+    parser.add_argument("--use-generation", default="", help="Make this index generation current and exit")
+    instrument.add_arguments(parser)
     args = parser.parse_args()
+    instrument.setup(args.profile, args.cprofile)
+
+    if args.list_generations or args.rollback or args.use_generation:
+        return manage_generations(args)
 
     try:
         docs_root = normalize_docs_root(args.docs_root)
     except ValueError as exc:
         raise SystemExit(str(exc)) from exc
-    payload = build_index(docs_root, args.timeout)
 
-    out_json = Path(args.out_json)
-    out_md = Path(args.out_md)
-    out_json.parent.mkdir(parents=True, exist_ok=True)
-    out_md.parent.mkdir(parents=True, exist_ok=True)
-
-    out_json.write_text(json.dumps(payload, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
-    write_index_md(out_md, payload)
+    try:
+        report = refresh(
+            Path(args.out_json),
+            Path(args.out_md),
+            docs_root,
+            args.timeout,
+            incremental=args.incremental,
+            cache=Path(args.cache_dir),
+            cache_policy=args.cache_policy,
+            keep_generations=args.keep_generations,
+            max_pages=args.refetch_pages,
+            max_bytes=args.refetch_bytes,
+            workers=args.refetch_workers,
+        )
+    except RuntimeError as exc:
+        raise SystemExit(str(exc)) from exc
 
-    print(f"Wrote JSON: {out_json}")
-    print(f"Wrote Markdown: {out_md}")
-    print(f"Indexed entries: {payload['stats']['indexed_entries']}")
+    if report["not_modified"]:
+        print(f"Index not modified (HTTP 304): {report['index']}")
+    labels = {"json": "JSON", "lookup": "lookup", "compact": "compact index", "markdown": "Markdown"}
+    for kind, path in report["written"].items():
+        print(f"Wrote {labels.get(kind, kind)}: {path}")
+    if not report["unchanged"]:
+        print(f"Generation: {report['generation']}")
+    for gen in report["pruned"]:
+        print(f"Pruned generation: {gen}")
+    synced = report["cache"]
+    if synced is not None:
+        print(
+            f"Cache: stale={len(synced['stale'])} removed={len(synced['removed'])} "
+            f"refetched={synced['refetched']} failed={synced['failed']}"
+        )
+    if report["unchanged"]:
+        print(f"Index unchanged: {report['index']}")
+    delta = report["delta"]
+    if delta is not None:
+        print(
+            "Delta: "
+            f"added={delta['added']} updated={delta['updated']} "
+            f"removed={delta['removed']} unchanged={delta['unchanged']}"
+        )
+    print(f"Indexed entries: {report['entries']}")
     return 0
 
 
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""Ranked offline search (BM25) over cached and local OpenClaw docs.
+
+Builds a persistent inverted index over the pages in ``references/cache``
+(read from its compressed blob store) plus any local docs roots found by
+``find_local_docs.py``. Each run re-tokenizes only files whose mtime/size
+changed, then answers the query from the index.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import re
+from pathlib import Path
+
+import instrument
+from daemon_client import daemon_call, public_path
+from doc_cache import PageCache, read_blob, write_json_atomic
+from find_local_docs import existing_roots, iter_doc_files, slug_for
+from lookup_index import LookupIndex
+
+SKILL_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_INDEX = SKILL_DIR / "references" / "openclaw-docs-index.json"
+DEFAULT_CACHE_DIR = SKILL_DIR / "references" / "cache"
+DEFAULT_SEARCH_INDEX = SKILL_DIR / "references" / "search-index.json"
+SEARCH_VERSION = 1
+TERM_RE = re.compile(r"[a-z0-9_]{2,}")
+HEADING_RE = re.compile(r"^#\s+(.+?)\s*#*\s*$", re.MULTILINE)
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text: str) -> list[str]:
+    return TERM_RE.findall(text.lower())
+
+
+def read_doc(file: Path) -> str:
+    data = read_blob(file) if file.name.endswith((".gz", ".zst")) else file.read_bytes()
+    return data.decode("utf-8", errors="replace")
+
+
+def iter_root(root: Path, origin: str):
+    """Yield (file, stat, slug).
+
+    Cache roots yield the blob of every stored page, plus plain ``.md`` files
+    that are not views of a stored page (e.g. caches from before the blob store).
+    """
+    stored: set[str] = set()
+    if origin == "cache":
+        for slug, blob in PageCache(root).blobs():
+            try:
+                yield blob, blob.stat(), slug
+            except OSError:
+                continue
+            stored.add(slug)
+    for file, st in iter_doc_files(root):
+        slug = slug_for(file, root)
+        if slug not in stored:
+            yield file, st, slug
+
+
+class SearchIndex:
+    """Inverted index persisted as JSON.
+
+    ``docs`` maps a document id to its file, slug, stat signature, length and
+    unique terms; ``postings`` maps term -> {doc id: term frequency}.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.docs: dict[str, dict] = {}
+        self.postings: dict[str, dict[str, int]] = {}
+        self.next_id = 0
+        self.total_length = 0
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            payload = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if not isinstance(payload, dict) or payload.get("version") != SEARCH_VERSION:
+            return
+        self.docs = payload.get("docs", {})
+        self.postings = payload.get("postings", {})
+        self.next_id = int(payload.get("next_id", 0))
+        self.total_length = sum(int(d["length"]) for d in self.docs.values())
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        write_json_atomic(
+            self.path,
+            {
+                "version": SEARCH_VERSION,
+                "next_id": self.next_id,
+                "docs": self.docs,
+                "postings": self.postings,
+            },
+        )
+        self._dirty = False
+
+    def _remove(self, doc_id: str) -> None:
+        doc = self.docs.pop(doc_id)
+        self.total_length -= int(doc["length"])
+        for term in doc["terms"]:
+            bucket = self.postings.get(term)
+            if bucket is None:
+                continue
+            bucket.pop(doc_id, None)
+            if not bucket:
+                del self.postings[term]
+        self._dirty = True
+
+    def _add(self, file: Path, slug: str, origin: str, signature: list[int]) -> None:
+        try:
+            text = read_doc(file)
+        except (OSError, EOFError, ValueError):
+            return
+        counts: dict[str, int] = {}
+        for term in tokenize(text):
+            counts[term] = counts.get(term, 0) + 1
+        heading = HEADING_RE.search(text)
+        doc_id = str(self.next_id)
+        self.next_id += 1
+        length = sum(counts.values())
+        self.docs[doc_id] = {
+            "file": str(file),
+            "slug": slug,
+            "origin": origin,
+            "heading": heading.group(1) if heading else "",
+            "sig": signature,
+            "length": length,
+            "terms": sorted(counts),
+        }
+        self.total_length += length
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+        self._dirty = True
+
+    def update(self, roots: list[tuple[Path, str]]) -> dict[str, int]:
+        """Sync the index with ``(root, origin)`` pairs by mtime/size."""
+        by_file = {d["file"]: doc_id for doc_id, d in self.docs.items()}
+        seen: set[str] = set()
+        delta = {"added": 0, "updated": 0, "removed": 0}
+        for root, origin in roots:
+            if not root.is_dir():
+                continue
+            for file, st, slug in iter_root(root, origin):
+                key = str(file)
+                if key in seen:
+                    continue
+                seen.add(key)
+                signature = [st.st_mtime_ns, st.st_size]
+                doc_id = by_file.get(key)
+                if doc_id is not None:
+                    if self.docs[doc_id]["sig"] == signature:
+                        continue
+                    self._remove(doc_id)
+                    delta["updated"] += 1
+                else:
+                    delta["added"] += 1
+                self._add(file, slug, origin, signature)
+        for key, doc_id in by_file.items():
+            if key not in seen:
+                self._remove(doc_id)
+                delta["removed"] += 1
+        return delta
+
+    def search(self, query: str, limit: int = 10) -> list[tuple[float, dict]]:
+        terms = [t for t in dict.fromkeys(tokenize(query)) if t in self.postings]
+        n = len(self.docs)
+        if not terms or not n:
+            return []
+        avg_len = self.total_length / n if n else 1.0
+        scores: dict[str, float] = {}
+        for term in terms:
+            bucket = self.postings[term]
+            idf = math.log(1.0 + (n - len(bucket) + 0.5) / (len(bucket) + 0.5))
+            for doc_id, tf in bucket.items():
+                norm = K1 * (1.0 - B + B * int(self.docs[doc_id]["length"]) / avg_len)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (K1 + 1.0) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        out: list[tuple[float, dict]] = []
+        seen_slugs: set[str] = set()
+        for doc_id, score in ranked:
+            doc = self.docs[doc_id]
+            if doc["slug"] in seen_slugs:
+                continue
+            seen_slugs.add(doc["slug"])
+            out.append((score, doc))
+            if len(out) >= limit:
+                break
+        return out
+
+
+def best_snippet(file: Path, query: str, width: int = 240) -> str:
+    """Return the paragraph-ish line window with the most query-term hits."""
+    terms = set(tokenize(query))
+    try:
+        lines = read_doc(file).splitlines()
+    except (OSError, EOFError, ValueError):
+        return ""
+    best_i, best_hits = -1, 0
+    for i, line in enumerate(lines):
+        hits = len(terms.intersection(tokenize(line)))
+        if hits > best_hits:
+            best_i, best_hits = i, hits
+    if best_i < 0:
+        return ""
+    snippet = " ".join(x.strip() for x in lines[best_i : best_i + 3] if x.strip())
+    return snippet if len(snippet) <= width else snippet[: width - 3].rstrip() + "..."
+
+
+def search_results(
+    index: SearchIndex, query: str, limit: int, titles: LookupIndex | None, cache: PageCache | None = None
+) -> list[dict]:
+    """Rank ``query``; cached hits get a readable view written through ``cache``."""
+    results = []
+    for score, doc in index.search(query, limit):
+        entry = titles.get(doc["slug"]) if titles is not None else None
+        file = doc["file"]
+        if doc["origin"] == "cache" and cache is not None:
+            file = str(cache.view(doc["slug"])[0])
+        results.append(
+            {
+                "slug": doc["slug"],
+                "title": (entry or {}).get("title") or doc["heading"] or doc["slug"],
+                "score": round(score, 4),
+                "origin": doc["origin"],
+                "file": file,
+                "snippet": best_snippet(Path(doc["file"]), query),
+            }
+        )
+    return results
+
+
+def print_results(query: str, results: list[dict], as_json: bool, indexed: int) -> int:
+    if as_json:
+        print(json.dumps({"query": query, "results": results}, indent=2, ensure_ascii=False))
+        return 0 if results else 1
+
+    if not results:
+        print(f"No matches for {query!r} in {indexed} indexed docs.")
+        return 1
+    for rank, r in enumerate(results, 1):
+        print(f"{rank}. {r['slug']} - {r['title']} (score {r['score']:.2f}, {r['origin']})")
+        print(f"   {r['file']}")
+        if r["snippet"]:
+            print(f"   {r['snippet']}")
+    return 0
+
+
+def default_roots(cache_dir: Path, include_local: bool) -> list[tuple[Path, str]]:
+    roots = [(cache_dir, "cache")]
+    if include_local:
+        roots.extend((p, "local") for p in existing_roots())
+    return roots
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Ranked offline search over cached/local OpenClaw docs")
+    parser.add_argument("query", help="Search words, e.g. 'gateway auth token'")
+    parser.add_argument("--limit", type=int, default=10, help="Maximum results")
+    parser.add_argument("--index", default=str(DEFAULT_INDEX), help="Docs index JSON path (for titles)")
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR), help="Markdown cache directory")
+    parser.add_argument("--search-index", default=str(DEFAULT_SEARCH_INDEX), help="Search index path")
+    parser.add_argument("--no-local", action="store_true", help="Skip local docs roots")
+    parser.add_argument("--no-update", action="store_true", help="Query the existing index without rescanning")
+    parser.add_argument("--rebuild", action="store_true", help="Discard and rebuild the search index")
+    parser.add_argument("--json", action="store_true", help="Print JSON output")
+    parser.add_argument("--no-daemon", action="store_true", help="Do not use a running docclaw daemon")
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+    instrument.setup(args.profile, args.cprofile)
+
+    if not (args.no_daemon or args.no_local or args.no_update or args.rebuild):
+        with instrument.span("search.daemon"):
+            response = daemon_call(
+                {
+                    "op": "search",
+                    "query": args.query,
+                    "limit": args.limit,
+                    "index": str(public_path(args.index)),
+                    "cache_dir": str(Path(args.cache_dir).resolve()),
+                    "search_index": str(Path(args.search_index).resolve()),
+                }
+            )
+        if response is not None and response.get("ok"):
+            result = response["result"]
+            return print_results(args.query, result["results"], args.json, result["indexed"])
+
+    search_index_path = Path(args.search_index)
+    if args.rebuild and search_index_path.exists():
+        search_index_path.unlink()
+    with instrument.span("search.load_index"):
+        index = SearchIndex(search_index_path)
+    if not args.no_update:
+        with instrument.span("search.update"):
+            delta = index.update(default_roots(Path(args.cache_dir), not args.no_local))
+        for key, value in delta.items():
+            instrument.count(f"search.docs_{key}", value)
+        with instrument.span("search.save_index"):
+            index.save()
+
+    with instrument.span("search.load_titles"):
+        titles = LookupIndex.load(Path(args.index))
+    cache = PageCache(Path(args.cache_dir))
+    with instrument.span("search.query"):
+        results = search_results(index, args.query, args.limit, titles, cache)
+    cache.save()
+    return print_results(args.query, results, args.json, len(index.docs))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
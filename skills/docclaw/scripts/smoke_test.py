@@ -16,6 +16,8 @@ SCRIPTS_DIR = SKILL_DIR / "scripts"
 REFRESH = SCRIPTS_DIR / "refresh_docs_index.py"
 FETCH = SCRIPTS_DIR / "fetch_doc_markdown.py"
 FIND_LOCAL = SCRIPTS_DIR / "find_local_docs.py"
+SEARCH = SCRIPTS_DIR / "search_docs.py"
+SNAPSHOT = SCRIPTS_DIR / "docs_snapshot.py"
 
 
 def run(cmd: list[str], expect_code: int = 0) -> subprocess.CompletedProcess[str]:
@@ -113,6 +115,21 @@ def main() -> int:
             ]
         )
 
+        # 2b) Repeat fetch should be served from the local cache
+        proc = run(
+            [
+                sys.executable,
+                str(FETCH),
+                "cli/docs",
+                "--index",
+                str(index_json),
+                "--cache-dir",
+                str(out_dir),
+            ]
+        )
+        if "Cache: hit" not in proc.stdout:
+            raise RuntimeError("Expected repeat fetch of cli/docs to be a cache hit")
+
         # 3) Full URL input should be rejected (slug-only policy)
         run(
             [
@@ -182,6 +199,67 @@ def main() -> int:
             expect_code=1,
         )
 
+        # 7b) Offline ranked search over the pages cached above
+        run(
+            [
+                sys.executable,
+                str(SEARCH),
+                "hooks",
+                "--index",
+                str(index_json),
+                "--cache-dir",
+                str(out_dir),
+                "--search-index",
+                str(tmp / "search-index.json"),
+                "--no-local",
+            ]
+        )
+
+        # 7c) Snapshot export, then offline import on a "new host" serves from cache
+        snapshot = tmp / "docs-snapshot.tar"
+        run(
+            [
+                sys.executable,
+                str(SNAPSHOT),
+                "--export",
+                str(snapshot),
+                "--index",
+                str(index_json),
+                "--index-md",
+                str(index_md),
+                "--cache-dir",
+                str(out_dir),
+            ]
+        )
+        host = tmp / "new-host"
+        run(
+            [
+                sys.executable,
+                str(SNAPSHOT),
+                "--import",
+                str(snapshot),
+                "--index",
+                str(host / "index.json"),
+                "--index-md",
+                str(host / "index.md"),
+                "--cache-dir",
+                str(host / "cache"),
+            ]
+        )
+        proc = run(
+            [
+                sys.executable,
+                str(FETCH),
+                "cli/docs",
+                "--index",
+                str(host / "index.json"),
+                "--cache-dir",
+                str(host / "cache"),
+            ]
+        )
+        if "Cache: hit" not in proc.stdout:
+            raise RuntimeError("Expected cli/docs to be served from the imported snapshot")
+
         # 8) Local docs discovery script should run (may return 0 or 1 depending host)
         _ = subprocess.run([sys.executable, str(FIND_LOCAL), "--json"], text=True, capture_output=True)
 